@@ -0,0 +1,245 @@
+"""
+Docling文档转换缓存
+
+同一份需求文档（PDF/DOCX）每天会被重复分析很多次，而Docling的一次转换需要数秒到数分钟。
+本模块提供共享的转换层：
+1. 以 文件内容哈希 + Docling版本 + 转换选项 作为缓存键
+2. 将导出的Markdown和Docling文档JSON保存在磁盘缓存中
+3. 按总大小限制进行LRU淘汰（以文件访问时间作为最近使用时间）
+4. 进程内复用同一个DocumentConverter实例
+
+使用方法:
+```python
+from docling_cache import convert_to_markdown
+content = convert_to_markdown("需求文档.docx")
+```
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from docling.document_converter import DocumentConverter
+
+# 默认缓存目录和大小上限，可通过环境变量覆盖
+DEFAULT_CACHE_DIR = os.getenv("DOCLING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".docling_cache"))
+DEFAULT_MAX_CACHE_BYTES = int(os.getenv("DOCLING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# 计算文件哈希时的读取块大小
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_converter: Optional[DocumentConverter] = None
+_converter_lock = threading.Lock()
+
+
+def get_converter() -> DocumentConverter:
+    """
+    获取进程内共享的DocumentConverter实例，避免每次转换都重新加载版面模型
+
+    :return: DocumentConverter实例
+    """
+    global _converter
+    if _converter is None:
+        with _converter_lock:
+            if _converter is None:
+                _converter = DocumentConverter()
+    return _converter
+
+
+def _docling_version() -> str:
+    try:
+        return metadata.version("docling")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    分块计算文件内容的SHA256
+
+    :param file_path: 文件路径
+    :return: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DoclingConversionCache:
+    """
+    Docling转换结果的磁盘缓存
+
+    每个缓存条目由两个文件组成：<key>.md（Markdown）和 <key>.json（Docling文档JSON）。
+    命中时更新文件的访问/修改时间，淘汰时按该时间从旧到新删除，直到总大小低于上限。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_size_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_size_bytes: 缓存总大小上限（字节）
+            options: 转换选项，会参与缓存键计算；修改转换配置时应同步修改此项
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.options = options or {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, file_path: str) -> str:
+        """
+        计算缓存键：文件内容哈希 + Docling版本 + 转换选项
+
+        :param file_path: 文件路径
+        :return: 缓存键
+        """
+        key_source = json.dumps(
+            {
+                "content": file_sha256(file_path),
+                "docling": _docling_version(),
+                "options": self.options,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.cache_dir / f"{key}.md", self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存的Markdown，未命中返回None
+        """
+        md_path, json_path = self._paths(key)
+        try:
+            content = md_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        # 更新时间戳，作为LRU的最近使用时间
+        now = time.time()
+        for path in (md_path, json_path):
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                pass
+        return content
+
+    def get_document_json(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的Docling文档JSON，未命中返回None
+        """
+        _, json_path = self._paths(key)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, markdown: str, document_dict: Optional[Dict[str, Any]] = None):
+        """
+        写入缓存条目并执行淘汰
+
+        先写临时文件再原子替换，避免多个进程同时写入时读到半截内容。
+        """
+        md_path, json_path = self._paths(key)
+        if document_dict is not None:
+            tmp_json = json_path.with_suffix(f".json.{os.getpid()}.tmp")
+            with open(tmp_json, "w", encoding="utf-8") as f:
+                json.dump(document_dict, f, ensure_ascii=False)
+            os.replace(tmp_json, json_path)
+        tmp_md = md_path.with_suffix(f".md.{os.getpid()}.tmp")
+        tmp_md.write_text(markdown, encoding="utf-8")
+        os.replace(tmp_md, md_path)
+        self.evict()
+
+    def evict(self):
+        """
+        按LRU淘汰缓存条目，直到总大小不超过上限
+        """
+        with self._lock:
+            entries: Dict[str, Dict[str, float]] = {}
+            total = 0
+            for path in self.cache_dir.iterdir():
+                if path.suffix not in (".md", ".json"):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entry = entries.setdefault(path.stem, {"size": 0, "mtime": 0.0})
+                entry["size"] += stat.st_size
+                entry["mtime"] = max(entry["mtime"], stat.st_mtime)
+                total += stat.st_size
+
+            if total <= self.max_size_bytes:
+                return
+
+            for key, entry in sorted(entries.items(), key=lambda item: item[1]["mtime"]):
+                for path in self._paths(key):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                total -= entry["size"]
+                if total <= self.max_size_bytes:
+                    break
+
+    def convert(self, file_path: str) -> str:
+        """
+        转换文档为Markdown，优先返回缓存结果
+
+        :param file_path: 文档路径（PDF或DOCX）
+        :return: Markdown文本
+        """
+        key = self.make_key(file_path)
+        content = self.get(key)
+        if content is not None:
+            self.hits += 1
+            print(f"命中Docling转换缓存: {file_path}")
+            return content
+
+        self.misses += 1
+        result = get_converter().convert(file_path)
+        content = result.document.export_to_markdown()
+        self.put(key, content, result.document.export_to_dict())
+        return content
+
+
+_default_cache: Optional[DoclingConversionCache] = None
+
+
+def get_default_cache() -> DoclingConversionCache:
+    """
+    获取默认的共享转换缓存
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DoclingConversionCache()
+    return _default_cache
+
+
+def convert_to_markdown(file_path: str) -> str:
+    """
+    使用共享缓存将PDF/DOCX文档转换为Markdown
+
+    :param file_path: 文档路径
+    :return: Markdown文本
+    """
+    return get_default_cache().convert(file_path)
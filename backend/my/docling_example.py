@@ -1,8 +1,9 @@
 import asyncio
 from pathlib import Path
-from docling.document_converter import DocumentConverter
 from llama_index.core import SimpleDirectoryReader, Document
 
+from docling_cache import convert_to_markdown
+
 async def convert_document_with_docling(file_path: str) -> str:
     """
     使用Docling库将文档转换为Markdown格式
@@ -13,18 +14,13 @@ async def convert_document_with_docling(file_path: str) -> str:
     try:
         print(f"开始处理文件: {file_path}")
         
-        # 创建DocumentConverter实例
-        converter = DocumentConverter()
-        
-        # 转换文档
-        result = converter.convert(file_path)
-        
-        # 将文档导出为Markdown格式
-        markdown_content = result.document.export_to_markdown()
+        # 转换文档并导出为Markdown格式（相同内容的文档直接命中磁盘缓存）
+        # 转换是CPU密集的同步操作，放到线程中执行以免阻塞事件循环
+        markdown_content = await asyncio.to_thread(convert_to_markdown, file_path)
         
         # 打印文档的一些基本信息
         print(f"文档转换成功!")
-        print(f"文档页数: {len(result.document.pages)}")
+        print(f"文档长度: {len(markdown_content)} 字符")
         
         # 返回Markdown内容
         return markdown_content
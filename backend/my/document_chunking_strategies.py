@@ -44,7 +44,8 @@ except ImportError:
     OPENAI_AVAILABLE = False
 
 # 文档处理相关导入
-from docling.document_converter import DocumentConverter
+from docling_cache import convert_to_markdown
+from embedding_cache import CachedEmbedding
 
 # 导入大模型客户端
 from llms import model_client
@@ -100,7 +101,8 @@ class DocumentChunkingDemo:
         """
         if embedding_model_type == "huggingface" and HUGGINGFACE_AVAILABLE and embedding_model_name:
             try:
-                self.embed_model = HuggingFaceEmbedding(model_name=embedding_model_name)
+                # 不同分块策略之间重叠的文本块只需嵌入一次
+                self.embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name=embedding_model_name))
                 Settings.embed_model = self.embed_model
                 print(f"使用HuggingFace嵌入模型: {embedding_model_name}")
             except Exception as e:
@@ -109,10 +111,10 @@ class DocumentChunkingDemo:
             try:
                 # 默认使用text-embedding-3-small模型，如果指定了其他模型名称则使用指定的模型
                 model_name = embedding_model_name if embedding_model_name else "text-embedding-3-small"
-                self.embed_model = OpenAIEmbedding(
+                self.embed_model = CachedEmbedding(OpenAIEmbedding(
                     model=model_name,
                     api_key=openai_api_key
-                )
+                ))
                 Settings.embed_model = self.embed_model
                 print(f"使用OpenAI嵌入模型: {model_name}")
             except Exception as e:
@@ -133,9 +135,7 @@ class DocumentChunkingDemo:
         if self.file_path.endswith(('.pdf', '.docx')):
             # 使用Docling处理PDF或DOCX文件
             print(f"使用Docling处理{'PDF' if self.file_path.endswith('.pdf') else 'Word'}文档")
-            converter = DocumentConverter()
-            result = converter.convert(self.file_path)
-            content = result.document.export_to_markdown()
+            content = convert_to_markdown(self.file_path)
 
             # 创建Document对象
             doc = Document(text=content, metadata={"source": self.file_path})
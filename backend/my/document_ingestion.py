@@ -0,0 +1,189 @@
+"""
+批量文档导入
+
+批量加载项目的需求文档归档时，逐个文件在事件循环上同步转换既会阻塞事件循环，也只能用到一个CPU核心。
+本模块使用进程池并行转换文档：
+1. 每个工作进程启动时创建一个DocumentConverter，版面模型只加载一次
+2. 支持传入文件路径列表或目录
+3. 每个文件转换完成后立即以llama_index的Document对象返回（同步生成器或异步生成器）
+4. 转换结果经过docling_cache共享缓存，已转换过的文件直接命中缓存
+
+使用方法:
+```python
+ingestor = BatchDocumentIngestor(max_workers=4)
+async for doc in ingestor.aingest("./requirements_archive"):
+    print(doc.metadata["source"], len(doc.text))
+ingestor.close()
+```
+"""
+
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+from docling.datamodel.base_models import InputFormat
+from llama_index.core import Document, SimpleDirectoryReader
+
+from docling_cache import convert_to_markdown, get_converter
+
+# 使用Docling转换的文件类型
+DOCLING_EXTENSIONS = (".pdf", ".docx")
+# 默认导入的文件类型
+DEFAULT_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+
+
+def _init_worker():
+    """
+    工作进程初始化：预先创建DocumentConverter并加载模型
+
+    DocumentConverter在首次转换某种格式时才懒加载对应的流水线，这里显式初始化，
+    使第一批文件不必再承担模型加载的开销
+    """
+    converter = get_converter()
+    for input_format in (InputFormat.PDF, InputFormat.DOCX):
+        converter.initialize_pipeline(input_format)
+
+
+def _load_file(file_path: str) -> List[Dict[str, object]]:
+    """
+    在工作进程中转换单个文件
+
+    返回可序列化的字典列表，由主进程组装为Document对象。
+
+    :param file_path: 文件路径
+    :return: [{"text": ..., "metadata": ...}, ...]
+    """
+    if Path(file_path).suffix.lower() in DOCLING_EXTENSIONS:
+        content = convert_to_markdown(file_path)
+        return [{"text": content, "metadata": {"source": file_path}}]
+
+    reader = SimpleDirectoryReader(input_files=[file_path])
+    return [{"text": doc.text, "metadata": dict(doc.metadata)} for doc in reader.load_data()]
+
+
+def collect_files(
+    paths: Union[str, Iterable[str]],
+    extensions: Iterable[str] = DEFAULT_EXTENSIONS
+) -> List[str]:
+    """
+    展开文件路径列表或目录，返回待导入的文件列表
+
+    :param paths: 单个路径、目录或路径列表
+    :param extensions: 目录中需要导入的文件扩展名
+    :return: 文件路径列表
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    extensions = tuple(ext.lower() for ext in extensions)
+
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend(
+                str(p) for p in sorted(path.rglob("*"))
+                if p.is_file() and p.suffix.lower() in extensions
+            )
+        elif path.is_file():
+            files.append(str(path))
+        else:
+            print(f"文件不存在，已跳过: {path}")
+    return files
+
+
+class BatchDocumentIngestor:
+    """
+    基于进程池的批量文档导入器
+
+    进程池在首次使用时创建并在多次导入之间复用，调用close()或使用with语句释放。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        初始化导入器
+
+        Args:
+            max_workers: 工作进程数量，默认为CPU核心数
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker
+            )
+        return self._executor
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _to_documents(items: List[Dict[str, object]]) -> List[Document]:
+        return [Document(text=item["text"], metadata=item["metadata"]) for item in items]
+
+    def ingest(self, paths: Union[str, Iterable[str]]) -> Iterator[Document]:
+        """
+        并行导入文档，按完成顺序逐个返回
+
+        :param paths: 文件路径列表或目录
+        :return: Document生成器
+        """
+        files = collect_files(paths)
+        print(f"开始批量导入 {len(files)} 个文件，工作进程数: {self.max_workers}")
+
+        futures: Dict[Future, str] = {
+            self.executor.submit(_load_file, file_path): file_path for file_path in files
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                documents = self._to_documents(future.result())
+            except Exception as e:
+                print(f"文档转换失败: {file_path}, 错误: {str(e)}")
+                continue
+            yield from documents
+
+    async def aingest(self, paths: Union[str, Iterable[str]]) -> AsyncIterator[Document]:
+        """
+        ingest的异步版本，转换在进程池中执行，不阻塞事件循环
+
+        :param paths: 文件路径列表或目录
+        :return: Document异步生成器
+        """
+        loop = asyncio.get_running_loop()
+        files = collect_files(paths)
+        print(f"开始批量导入 {len(files)} 个文件，工作进程数: {self.max_workers}")
+
+        tasks = {
+            asyncio.ensure_future(loop.run_in_executor(self.executor, _load_file, file_path)): file_path
+            for file_path in files
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        documents = self._to_documents(task.result())
+                    except Exception as e:
+                        print(f"文档转换失败: {tasks[task]}, 错误: {str(e)}")
+                        continue
+                    for doc in documents:
+                        yield doc
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,34 @@
+"""
+嵌入向量持久化缓存
+
+实现位于 refer/testing2/rag_system/utils/embedding_cache.py，这里导入同一份实现，
+只把默认缓存目录改为本目录下的 .embedding_cache（可通过环境变量 EMBEDDING_CACHE_DIR 覆盖）。
+
+使用方法:
+```python
+from embedding_cache import CachedEmbedding
+Settings.embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5"))
+```
+"""
+
+import os
+import sys
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+_RAG_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "refer", "testing2"))
+if _RAG_ROOT not in sys.path:
+    sys.path.append(_RAG_ROOT)
+
+from rag_system.utils.embedding_cache import CachedEmbedding as _CachedEmbedding  # noqa: E402
+from rag_system.utils.embedding_cache import EmbeddingStore, normalize_text, text_key  # noqa: E402,F401
+
+# 默认缓存目录，可通过环境变量覆盖
+DEFAULT_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache"))
+
+
+class CachedEmbedding(_CachedEmbedding):
+    """带持久化缓存的嵌入模型包装器，默认缓存目录为本项目的 DEFAULT_CACHE_DIR"""
+
+    def __init__(self, embed_model: BaseEmbedding, cache_dir: str = DEFAULT_CACHE_DIR, **kwargs):
+        super().__init__(embed_model, cache_dir=cache_dir, **kwargs)
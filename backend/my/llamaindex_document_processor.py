@@ -34,7 +34,8 @@ from llama_index.core.node_parser import (
 )
 
 # 文档处理相关导入
-from docling.document_converter import DocumentConverter
+from docling_cache import convert_to_markdown
+from embedding_cache import CachedEmbedding
 
 # 嵌入模型相关导入
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
@@ -125,8 +126,8 @@ class LlamaIndexDocumentProcessor:
         else:
             raise ValueError(f"不支持的嵌入模型类型: {self.embedding_model_type}")
             
-        # 设置全局嵌入模型
-        Settings.embed_model = embed_model
+        # 设置全局嵌入模型，重复的文本块和查询直接读取嵌入缓存
+        Settings.embed_model = CachedEmbedding(embed_model)
         
     def _setup_llm(self):
         """设置LLM模型"""
@@ -180,9 +181,7 @@ class LlamaIndexDocumentProcessor:
         if file_path.endswith(('.pdf', '.docx')):
             # 使用Docling处理PDF或DOCX文件
             print(f"使用Docling处理{'PDF' if file_path.endswith('.pdf') else 'Word'}文档")
-            converter = DocumentConverter()
-            result = converter.convert(file_path)
-            content = result.document.export_to_markdown()
+            content = convert_to_markdown(file_path)
 
             # 创建Document对象
             doc = Document(text=content, metadata={"source": file_path})
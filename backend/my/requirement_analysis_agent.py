@@ -6,7 +6,7 @@ from autogen_agentchat.conditions import SourceMatchTermination
 from autogen_agentchat.messages import ToolCallSummaryMessage
 from autogen_agentchat.teams import RoundRobinGroupChat
 from autogen_agentchat.ui import Console
-from docling.document_converter import DocumentConverter
+from docling_cache import convert_to_markdown
 from llama_index.core import SimpleDirectoryReader, Document
 
 from llms import model_client
@@ -37,9 +37,7 @@ async def get_document_from_llama_index_file(files: list[str]) -> str:
     try:
         # 如果是PDF文件或Word文档(.docx)，使用DocumentConverter
         if any(file.endswith(('.pdf', '.docx')) for file in files):
-            converter = DocumentConverter()
-            result = converter.convert(files[0])
-            content = result.document.export_to_markdown()
+            content = await asyncio.to_thread(convert_to_markdown, files[0])
             print(f"使用Docling处理{'PDF' if files[0].endswith('.pdf') else 'Word'}文档")
         else:
             # 使用LlamaIndex读取文件
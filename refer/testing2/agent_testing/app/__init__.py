@@ -4,6 +4,9 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from tortoise import Tortoise
 
+from app.core.auditlog import audit_log_writer
+from app.core.auditlog_storage import audit_log_maintainer
+from app.core.dbstats import pool_monitor
 from app.core.exceptions import SettingNotFound
 from app.core.init_app import (
     init_data,
@@ -21,7 +24,13 @@ except ImportError:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_data()
+    audit_log_writer.start()
+    audit_log_maintainer.start()
+    pool_monitor.start()
     yield
+    await pool_monitor.stop()
+    await audit_log_maintainer.stop()
+    await audit_log_writer.stop()
     await Tortoise.close_connections()
 
 
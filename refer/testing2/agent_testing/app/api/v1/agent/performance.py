@@ -1,13 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, Depends, BackgroundTasks, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, Depends, BackgroundTasks, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 import os
 import uuid
 import json
-from typing import Optional
-from datetime import datetime
-import asyncio
+import hashlib
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
 
-from app.api.v1.agent.performance_agents import start_performance_analysis, performance_result_stream
+import aiofiles
+from tortoise import timezone
+from tortoise.expressions import Q
+
+from app.api.v1.agent.performance_agents import run_performance_analysis, performance_result_stream, result_channels
+from app.models.admin import PerformanceReportFile
 from app.schemas.performance import PerformanceReport, PerformanceAnalysisResult
 
 router = APIRouter(prefix="/performance", tags=["performance"])
@@ -20,18 +25,42 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 RESULTS_DIR = "results/performance_analysis"
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-# 内存中暂存的文件信息
-uploaded_files = {}
+# 上传/下载时每次读写的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 分块上传的写入租约时长；写入过程中剩余不足一半时续约，租约过期后其他请求才能接管该位置
+UPLOAD_LEASE = timedelta(seconds=60)
+
+
+async def get_file_info(file_id: str) -> PerformanceReportFile:
+    """
+    从持久化索引中获取已上传完成的文件信息
+    """
+    file_info = await PerformanceReportFile.filter(file_id=file_id, status="uploaded").first()
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return file_info
+
+
+def upload_response(file_info: PerformanceReportFile) -> JSONResponse:
+    return JSONResponse({
+        "success": True,
+        "file_id": file_info.file_id,
+        "message": "文件上传成功",
+        "fileUrl": f"/api/v1/agent/performance/file/{file_info.file_id}",
+        "size": file_info.size,
+        "sha256": file_info.sha256
+    })
 
 
 @router.post("/upload")
 async def upload_performance_report(file: UploadFile = File(...)):
     """
-    上传性能报告文件
+    上传性能报告文件，按块写入磁盘并同时计算哈希
     """
     try:
         # 确保文件是合法的性能报告文件
-        if not is_valid_performance_file(file):
+        if not is_valid_performance_file(file.filename):
             raise HTTPException(status_code=400, detail="无效的性能报告文件格式")
         
         # 生成唯一ID并保存文件
@@ -39,28 +68,30 @@ async def upload_performance_report(file: UploadFile = File(...)):
         file_extension = os.path.splitext(file.filename)[1]
         file_path = os.path.join(UPLOAD_DIR, f"{file_id}{file_extension}")
         
-        # 保存文件
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # 流式保存文件
+        digest = hashlib.sha256()
+        size = 0
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                await f.write(chunk)
         
         # 记录文件信息
-        uploaded_files[file_id] = {
-            "id": file_id,
-            "filename": file.filename,
-            "path": file_path,
-            "upload_time": datetime.now().isoformat(),
-            "size": len(content),
-            "status": "uploaded"
-        }
+        file_info = await PerformanceReportFile.create(
+            file_id=file_id,
+            filename=file.filename,
+            path=file_path,
+            size=size,
+            received=size,
+            sha256=digest.hexdigest(),
+            status="uploaded"
+        )
         
-        return JSONResponse({
-            "success": True,
-            "file_id": file_id,
-            "message": "文件上传成功",
-            "fileUrl": f"/api/v1/agent/performance/file/{file_id}"
-        })
+        return upload_response(file_info)
     
+    except HTTPException as e:
+        raise e
     except Exception as e:
         return JSONResponse({
             "success": False,
@@ -68,24 +99,151 @@ async def upload_performance_report(file: UploadFile = File(...)):
         }, status_code=500)
 
 
+@router.post("/upload/init")
+async def init_resumable_upload(
+        filename: str = Query(..., description="原始文件名"),
+        size: int = Query(..., ge=0, description="文件总大小(字节)")
+):
+    """
+    创建可续传上传，之后通过 PUT /upload/{file_id}?offset= 分块上传
+    """
+    if not is_valid_performance_file(filename):
+        raise HTTPException(status_code=400, detail="无效的性能报告文件格式")
+    
+    file_id = str(uuid.uuid4())
+    file_path = os.path.join(UPLOAD_DIR, f"{file_id}{os.path.splitext(filename)[1]}")
+    async with aiofiles.open(file_path, "wb"):
+        pass
+    
+    await PerformanceReportFile.create(
+        file_id=file_id,
+        filename=filename,
+        path=file_path,
+        size=size,
+        received=0,
+        status="uploading"
+    )
+    return JSONResponse({"success": True, "file_id": file_id, "offset": 0, "chunk_size": CHUNK_SIZE})
+
+
+@router.get("/upload/{file_id}")
+async def get_upload_status(file_id: str):
+    """
+    查询上传进度，客户端据此从offset处继续上传
+    """
+    file_info = await PerformanceReportFile.filter(file_id=file_id).first()
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="上传任务不存在")
+    return JSONResponse({
+        "file_id": file_id,
+        "offset": file_info.received,
+        "size": file_info.size,
+        "status": file_info.status
+    })
+
+
+@router.put("/upload/{file_id}")
+async def upload_chunk(
+    request: Request,
+    file_id: str,
+    offset: int = Query(..., ge=0, description="本块在文件中的起始位置"),
+):
+    """
+    上传一个数据块，请求体为原始字节；offset必须等于已接收大小，否则返回409和当前进度
+
+    写入前先以 offset 为条件领取写入租约，同一时刻只有一个请求能写入该文件；
+    数据块超过声明大小或客户端中途断开时，文件截断回offset并释放租约，客户端可从原位置重传。
+    """
+    file_info = await PerformanceReportFile.filter(file_id=file_id).first()
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="上传任务不存在")
+    if file_info.status == "uploaded":
+        return upload_response(file_info)
+    
+    writer = await claim_upload_lease(file_id, offset)
+    if writer is None:
+        file_info = await PerformanceReportFile.get(file_id=file_id)
+        if file_info.status == "uploaded":
+            return upload_response(file_info)
+        message = "上传位置不匹配" if offset != file_info.received else "该位置正在由其他请求上传"
+        return JSONResponse({"success": False, "offset": file_info.received, "message": message}, status_code=409)
+    
+    lease_until = timezone.now() + UPLOAD_LEASE
+    received = offset
+    async with aiofiles.open(file_info.path, "r+b") as f:
+        try:
+            await f.seek(offset)
+            async for chunk in request.stream():
+                if received + len(chunk) > file_info.size:
+                    raise HTTPException(status_code=413, detail="上传内容超过声明的文件大小")
+                # 租约剩余不足一半时续约，续约失败说明已被其他请求接管，不能再写入
+                if lease_until - timezone.now() < UPLOAD_LEASE / 2:
+                    lease_until = await renew_upload_lease(file_id, writer)
+                    if lease_until is None:
+                        raise HTTPException(status_code=409, detail="上传租约已过期")
+                await f.write(chunk)
+                received += len(chunk)
+            await f.truncate(received)
+        except BaseException:
+            # 413、客户端断开等中止写入时，丢弃本块已写入的部分
+            if await renew_upload_lease(file_id, writer) is not None:
+                await f.truncate(offset)
+                await release_upload_lease(file_id, writer)
+            raise
+    
+    updated = await PerformanceReportFile.filter(file_id=file_id, writer=writer).update(
+        received=received, writer=None, lease_until=None
+    )
+    if not updated:
+        raise HTTPException(status_code=409, detail="上传租约已过期")
+    file_info.received = received
+    
+    if received == file_info.size:
+        file_info.sha256 = await compute_file_sha256(file_info.path)
+        file_info.status = "uploaded"
+        await file_info.save(update_fields=["received", "sha256", "status"])
+        return upload_response(file_info)
+    
+    return JSONResponse({"success": True, "file_id": file_id, "offset": received})
+
+
 @router.get("/file/{file_id}")
-async def get_performance_file(file_id: str):
+async def get_performance_file(file_id: str, request: Request):
     """
-    获取已上传的性能报告文件
+    获取已上传的性能报告文件，按块流式返回，支持Range请求
     """
-    if file_id not in uploaded_files:
-        raise HTTPException(status_code=404, detail="文件不存在")
+    file_info = await get_file_info(file_id)
+    file_size = os.path.getsize(file_info.path)
+    headers = {
+        "Content-Disposition": f"attachment; filename={file_info.filename}",
+        "Accept-Ranges": "bytes"
+    }
     
-    file_info = uploaded_files[file_id]
+    byte_range = parse_range_header(request.headers.get("range"), file_size)
+    if byte_range is None:
+        start, end, status_code = 0, file_size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
     
     async def file_reader():
-        with open(file_info["path"], "rb") as f:
-            yield f.read()
+        remaining = end - start + 1
+        async with aiofiles.open(file_info.path, "rb") as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
     
     return StreamingResponse(
         file_reader(),
+        status_code=status_code,
         media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={file_info['filename']}"}
+        headers=headers
     )
 
 
@@ -93,21 +251,38 @@ async def get_performance_file(file_id: str):
 async def analyze_performance(file_id: str = Query(..., description="上传的文件ID")):
     """
     分析性能报告并返回结果流
+
+    每次分析使用独立的结果通道，运行ID通过响应头X-Run-Id返回，可用于/stream/{run_id}重新订阅
     """
-    if file_id not in uploaded_files:
-        raise HTTPException(status_code=404, detail="文件不存在")
-    
-    file_info = uploaded_files[file_id]
+    file_info = await get_file_info(file_id)
+    run_id = str(uuid.uuid4())
     
     # 启动分析任务
-    analysis_task = asyncio.create_task(
-        start_performance_analysis(file_info["path"])
-    )
+    channel = run_performance_analysis(run_id, file_info.path)
     
     # 创建SSE响应
     return StreamingResponse(
-        performance_result_stream(),
-        media_type="text/event-stream"
+        performance_result_stream(channel),
+        media_type="text/event-stream",
+        headers={"X-Run-Id": run_id}
+    )
+
+
+@router.get("/stream/{run_id}")
+async def stream_performance_analysis(run_id: str):
+    """
+    订阅进行中或刚结束的分析运行，先回放已产生的事件
+
+    运行通道保存在启动分析的工作进程内存中，需以单工作进程部署，见ResultChannelRegistry
+    """
+    channel = result_channels.get(run_id)
+    if channel is None:
+        raise HTTPException(status_code=404, detail="分析任务不存在")
+    
+    return StreamingResponse(
+        performance_result_stream(channel),
+        media_type="text/event-stream",
+        headers={"X-Run-Id": run_id}
     )
 
 
@@ -116,8 +291,7 @@ async def get_analysis_results(file_id: str):
     """
     获取已完成的性能分析结果
     """
-    if file_id not in uploaded_files:
-        raise HTTPException(status_code=404, detail="文件不存在")
+    await get_file_info(file_id)
     
     result_path = os.path.join(RESULTS_DIR, f"{file_id}.json")
     
@@ -132,12 +306,12 @@ async def get_analysis_results(file_id: str):
 
 # 辅助函数
 
-def is_valid_performance_file(file: UploadFile) -> bool:
+def is_valid_performance_file(filename: str) -> bool:
     """
     验证上传的文件是否为有效的性能报告文件
     """
-    valid_extensions = [".json", ".html", ".har", ".csv", ".xml"]
-    file_ext = os.path.splitext(file.filename)[1].lower()
+    valid_extensions = [".json", ".html", ".har", ".csv", ".xml", ".jtl"]
+    file_ext = os.path.splitext(filename or "")[1].lower()
     
     if file_ext not in valid_extensions:
         return False
@@ -145,3 +319,72 @@ def is_valid_performance_file(file: UploadFile) -> bool:
     # 进一步验证文件内容可在此处添加
     
     return True
+
+
+async def compute_file_sha256(file_path: str) -> str:
+    """
+    分块计算文件的SHA256
+    """
+    digest = hashlib.sha256()
+    async with aiofiles.open(file_path, "rb") as f:
+        while chunk := await f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def claim_upload_lease(file_id: str, offset: int) -> Optional[str]:
+    """
+    以已接收大小等于offset、且没有未过期租约为条件领取写入租约
+
+    :return: 写入令牌；位置不匹配或其他请求正在写入时返回None
+    """
+    writer = str(uuid.uuid4())
+    now = timezone.now()
+    claimed = await PerformanceReportFile.filter(
+        Q(writer__isnull=True) | Q(lease_until__lt=now),
+        file_id=file_id,
+        received=offset,
+        status="uploading",
+    ).update(writer=writer, lease_until=now + UPLOAD_LEASE)
+    return writer if claimed else None
+
+
+async def renew_upload_lease(file_id: str, writer: str) -> Optional[datetime]:
+    """续约写入租约，租约已被其他请求接管时返回None"""
+    lease_until = timezone.now() + UPLOAD_LEASE
+    renewed = await PerformanceReportFile.filter(file_id=file_id, writer=writer).update(lease_until=lease_until)
+    return lease_until if renewed else None
+
+
+async def release_upload_lease(file_id: str, writer: str) -> None:
+    await PerformanceReportFile.filter(file_id=file_id, writer=writer).update(writer=None, lease_until=None)
+
+
+def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段Range请求头，返回 (start, end)；无Range头时返回None
+    """
+    if not range_header:
+        return None
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError
+        start_str, _, end_str = spec.strip().partition("-")
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+        else:
+            # bytes=-N 表示最后N个字节
+            start = max(file_size - int(end_str), 0)
+            end = file_size - 1
+    except ValueError:
+        raise HTTPException(status_code=416, detail="无效的Range请求")
+    end = min(end, file_size - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="请求范围超出文件大小",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    return start, end
@@ -13,6 +13,8 @@ from autogen_core import RoutedAgent, type_subscription, message_handler, Messag
 from pydantic import BaseModel, Field
 
 from app.api.v1.agent.api.llms import model_client
+from app.api.v1.agent.performance_report_parser import summarize_performance_file
+from app.api.v1.agent.result_channel import ResultChannel, ResultChannelRegistry
 
 # 定义主题类型
 performance_analyzer_topic_type = "performance_analyzer"
@@ -21,8 +23,8 @@ performance_recommendation_topic_type = "performance_recommendation"
 performance_summary_topic_type = "performance_summary"
 performance_result_topic_type = "performance_result"
 
-# 全局消息队列，用于向前端推送消息
-result_queue = asyncio.Queue()
+# 每次分析运行独立的结果通道，用于向前端推送消息
+result_channels = ResultChannelRegistry()
 
 
 class PerformanceMetric(BaseModel):
@@ -135,7 +137,7 @@ class PerformanceAnalyzerAgent(RoutedAgent):
         
         # 读取性能报告文件
         try:
-            file_content = self._read_performance_file(file_path)
+            file_content = await self._read_performance_file(file_path)
             
             # 创建性能分析智能体
             analyzer_agent = AssistantAgent(
@@ -183,32 +185,13 @@ class PerformanceAnalyzerAgent(RoutedAgent):
                 topic_id=TopicId(type=performance_result_topic_type, source=self.id.key)
             )
     
-    def _read_performance_file(self, file_path: str) -> str:
-        """读取性能报告文件内容"""
+    async def _read_performance_file(self, file_path: str) -> str:
+        """
+        读取性能报告文件，样本类报告流式聚合为统计摘要，避免整体读入内存。
+        解析大文件耗时较长，放到线程中执行，避免阻塞事件循环上的其他分析流和请求。
+        """
         try:
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            if file_ext == '.json' or file_ext == '.har':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return json.dumps(data, indent=2, ensure_ascii=False)
-            
-            elif file_ext == '.html':
-                # 对于HTML文件，可以提取关键内容
-                from bs4 import BeautifulSoup
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    soup = BeautifulSoup(f.read(), 'html.parser')
-                    # 尝试提取性能数据（这里是简化的示例）
-                    performance_data = soup.find_all(class_=['performance', 'metrics', 'results'])
-                    if performance_data:
-                        return '\n'.join([div.get_text() for div in performance_data])
-                    else:
-                        return soup.get_text()
-            
-            else:  # 其他格式文件直接读取文本内容
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-                    
+            return await asyncio.to_thread(summarize_performance_file, file_path)
         except Exception as e:
             return f"文件读取错误: {str(e)}"
 
@@ -563,8 +546,8 @@ class PerformanceSummaryAgent(RoutedAgent):
             )
 
 
-async def start_performance_analysis(file_path: str):
-    """启动性能分析流程"""
+async def start_performance_analysis(file_path: str, channel: ResultChannel):
+    """启动性能分析流程，结果发布到本次运行的结果通道"""
     runtime = SingleThreadedAgentRuntime()
     
     # 注册智能体
@@ -573,6 +556,10 @@ async def start_performance_analysis(file_path: str):
     await PerformanceRecommendationAgent.register(runtime, performance_recommendation_topic_type, lambda: PerformanceRecommendationAgent())
     await PerformanceSummaryAgent.register(runtime, performance_summary_topic_type, lambda: PerformanceSummaryAgent())
     
+    async def collect_result(ctx: ClosureContext, message: ResponseMessage, msg_ctx: MessageContext) -> None:
+        """收集智能体的分析结果消息"""
+        await channel.publish(message.model_dump())
+    
     # 注册结果收集智能体
     await ClosureAgent.register_closure(
         runtime,
@@ -584,30 +571,32 @@ async def start_performance_analysis(file_path: str):
     # 启动运行时
     runtime.start()
     
-    # 发布分析任务消息
-    await runtime.publish_message(
-        file_path,
-        topic_id=DefaultTopicId(type=performance_analyzer_topic_type)
-    )
-    
-    # 等待所有智能体处理完成
-    await runtime.stop_when_idle()
-    await runtime.close()
+    try:
+        # 发布分析任务消息
+        await runtime.publish_message(
+            file_path,
+            topic_id=DefaultTopicId(type=performance_analyzer_topic_type)
+        )
+        
+        # 等待所有智能体处理完成
+        await runtime.stop_when_idle()
+    finally:
+        await runtime.close()
+        await result_channels.close(channel.run_id)
 
 
-async def collect_result(ctx: ClosureContext, message: ResponseMessage, msg_ctx: MessageContext) -> None:
-    """收集智能体的分析结果消息"""
-    # 将消息放入队列
-    await result_queue.put(message.model_dump())
+def run_performance_analysis(run_id: str, file_path: str) -> ResultChannel:
+    """创建结果通道并在后台启动性能分析任务"""
+    channel = result_channels.create(run_id)
+    channel.task = asyncio.create_task(start_performance_analysis(file_path, channel))
+    return channel
 
 
-async def performance_result_stream():
-    """生成用于SSE的事件流"""
+async def performance_result_stream(channel: ResultChannel):
+    """生成用于SSE的事件流，客户端断开时退订（最后一个订阅者在最终结果之前断开会取消分析任务）"""
+    events = channel.subscribe()
     try:
-        while True:
-            # 从队列中获取消息
-            message = await result_queue.get()
-            
+        async for message in events:
             # 格式化为SSE事件
             data = json.dumps(message)
             yield f"data: {data}\n\n"
@@ -619,3 +608,5 @@ async def performance_result_stream():
     except asyncio.CancelledError:
         # 处理取消请求
         pass
+    finally:
+        await events.aclose()
@@ -0,0 +1,530 @@
+"""
+性能报告流式解析
+
+JMeter JTL、HAR等性能报告动辄数百MB，整体读入内存再原样发送给大模型既会耗尽内存，也会超出上下文窗口。
+本模块对报告做一次流式遍历，按接口聚合统计：
+- 请求数、错误率、平均值、最小/最大值
+- 基于可合并分位数草图的 p50/p90/p95/p99
+- 按时间桶统计的吞吐量
+最终生成紧凑的统计摘要文本交给智能体，内存占用与文件大小无关。
+"""
+
+import csv
+import json
+import math
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# 小于该大小的非样本类JSON/HTML报告直接以文本形式交给智能体
+MAX_INLINE_BYTES = 256 * 1024
+# 交给智能体的文本最大长度
+MAX_SUMMARY_CHARS = 30000
+# 摘要中展示的接口数量上限
+MAX_ENDPOINTS_IN_SUMMARY = 50
+# 摘要中展示的时间桶数量上限
+MAX_TIMELINE_ROWS = 60
+# 单独统计的接口数量上限，超出后的新接口合并到OTHER_ENDPOINTS
+MAX_TRACKED_ENDPOINTS = 1000
+OTHER_ENDPOINTS = "(其他接口)"
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# 样本字段的常见命名
+_LABEL_KEYS = ("label", "lb", "name", "endpoint", "url", "path")
+_ELAPSED_KEYS = ("elapsed", "t", "time", "duration", "responseTime", "response_time")
+_TIMESTAMP_KEYS = ("timeStamp", "ts", "timestamp", "startedDateTime", "start_time")
+_SUCCESS_KEYS = ("success", "s")
+_STATUS_KEYS = ("responseCode", "rc", "status", "status_code")
+# URL路径中的ID类片段（数字、UUID、长十六进制串），归一化为 {id}
+_ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$"
+)
+# JTL中表示一次请求的元素，嵌套的同名元素是重定向、内嵌资源等子样本
+_XML_SAMPLE_TAGS = ("httpSample", "sample")
+
+
+class QuantileSketch:
+    """
+    可合并的分位数草图（DDSketch）
+
+    将数值映射到对数间隔的桶中，分位数估计的相对误差不超过relative_accuracy，
+    桶数量只与数值范围有关，与样本数量无关；两个草图可以按桶相加合并。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("只能合并相对精度相同的分位数草图")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class EndpointStats:
+    """单个接口的聚合统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.sketch = QuantileSketch()
+
+    def add(self, elapsed: float, success: bool) -> None:
+        self.count += 1
+        if not success:
+            self.errors += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        self.sketch.add(elapsed)
+
+    def merge(self, other: "EndpointStats") -> None:
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "mean": round(self.mean, 2),
+            "min": round(self.min, 2) if self.count else None,
+            "max": round(self.max, 2),
+        }
+        for q in QUANTILES:
+            value = self.sketch.quantile(q)
+            result[f"p{int(q * 100)}"] = round(value, 2) if value is not None else None
+        return result
+
+
+class ThroughputTimeline:
+    """
+    按时间桶统计请求数
+
+    桶数量超过max_buckets时将桶宽度加倍并合并，保证内存占用有上限。
+    """
+
+    def __init__(self, bucket_seconds: int = 1, max_buckets: int = 720):
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, List[int]] = {}
+
+    def add(self, timestamp: float, success: bool) -> None:
+        key = int(timestamp // self.bucket_seconds)
+        bucket = self.buckets.setdefault(key, [0, 0])
+        bucket[0] += 1
+        if not success:
+            bucket[1] += 1
+        if len(self.buckets) > self.max_buckets:
+            self._coarsen()
+
+    def _coarsen(self) -> None:
+        self.bucket_seconds *= 2
+        merged: Dict[int, List[int]] = {}
+        for key, (count, errors) in self.buckets.items():
+            bucket = merged.setdefault(key // 2, [0, 0])
+            bucket[0] += count
+            bucket[1] += errors
+        self.buckets = merged
+
+    def rows(self, max_rows: int = MAX_TIMELINE_ROWS) -> List[Dict[str, Any]]:
+        """按展示行数重新分桶，返回 [{start, requests, errors, rps}]"""
+        if not self.buckets:
+            return []
+        keys = sorted(self.buckets)
+        span = keys[-1] - keys[0] + 1
+        factor = max(1, math.ceil(span / max_rows))
+        grouped: Dict[int, List[int]] = {}
+        for key in keys:
+            bucket = grouped.setdefault((key - keys[0]) // factor, [0, 0])
+            bucket[0] += self.buckets[key][0]
+            bucket[1] += self.buckets[key][1]
+        width = self.bucket_seconds * factor
+        return [
+            {
+                "start": datetime.fromtimestamp((keys[0] + group * factor) * self.bucket_seconds).isoformat(sep=" "),
+                "requests": count,
+                "errors": errors,
+                "rps": round(count / width, 2),
+            }
+            for group, (count, errors) in sorted(grouped.items())
+        ]
+
+
+class PerformanceReportAggregator:
+    """
+    对流式样本做单次遍历聚合
+
+    URL路径中的ID片段在解析时已归一化；单独统计的接口数超过max_endpoints后，
+    新出现的接口合并到OTHER_ENDPOINTS，保证内存占用有上限。
+    """
+
+    def __init__(self, max_endpoints: int = MAX_TRACKED_ENDPOINTS):
+        self.max_endpoints = max_endpoints
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.overall = EndpointStats()
+        self.timeline = ThroughputTimeline()
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.skipped = 0
+
+    def add(self, label: str, elapsed: float, success: bool, timestamp: Optional[float] = None) -> None:
+        stats = self.endpoints.get(label)
+        if stats is None:
+            if len(self.endpoints) >= self.max_endpoints:
+                label = OTHER_ENDPOINTS
+                stats = self.endpoints.get(label)
+            if stats is None:
+                stats = self.endpoints[label] = EndpointStats()
+        stats.add(elapsed, success)
+        self.overall.add(elapsed, success)
+        if timestamp is not None:
+            self.timeline.add(timestamp, success)
+            self.first_ts = timestamp if self.first_ts is None else min(self.first_ts, timestamp)
+            self.last_ts = timestamp if self.last_ts is None else max(self.last_ts, timestamp)
+
+    def add_sample(self, sample: Optional[Tuple[str, float, bool, Optional[float]]]) -> None:
+        if sample is None:
+            self.skipped += 1
+        else:
+            self.add(*sample)
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = (self.last_ts - self.first_ts) if self.first_ts is not None else 0
+        overall = self.overall.to_dict()
+        overall["duration_seconds"] = round(duration, 2)
+        overall["throughput_rps"] = round(self.overall.count / duration, 2) if duration > 0 else None
+        endpoints = sorted(self.endpoints.items(), key=lambda item: item[1].count, reverse=True)
+        return {
+            "overall": overall,
+            "endpoint_count": len(self.endpoints),
+            "endpoints": {label: stats.to_dict() for label, stats in endpoints[:MAX_ENDPOINTS_IN_SUMMARY]},
+            "timeline": self.timeline.rows(),
+            "skipped_records": self.skipped,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 字段解析
+# ---------------------------------------------------------------------------
+
+def _pick(record: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """解析时间戳，支持毫秒/秒级数值与ISO8601字符串，返回秒级时间戳"""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+        return number / 1000 if number > 1e11 else number
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_success(record: Dict[str, Any]) -> bool:
+    success = _pick(record, _SUCCESS_KEYS)
+    if success is not None:
+        return str(success).lower() in ("true", "1")
+    status = _pick(record, _STATUS_KEYS)
+    if status is None:
+        return True
+    try:
+        return int(status) < 400
+    except (TypeError, ValueError):
+        return False
+
+
+def _normalize_path(path: str) -> str:
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def _normalize_label(label: Any) -> str:
+    """URL只保留路径，路径中的ID片段替换为 {id}，避免 /users/123 这类接口按ID分别统计"""
+    label = str(label)
+    if label.startswith(("http://", "https://")):
+        parts = urlsplit(label)
+        return _normalize_path(parts.path) or "/"
+    if label.startswith("/"):
+        return _normalize_path(label.split("?", 1)[0])
+    return label
+
+
+def parse_record(record: Dict[str, Any]) -> Optional[Tuple[str, float, bool, Optional[float]]]:
+    """将JTL/CSV/JSON样本记录归一化为 (接口, 耗时ms, 是否成功, 时间戳秒)"""
+    label = _pick(record, _LABEL_KEYS)
+    elapsed = _pick(record, _ELAPSED_KEYS)
+    if label is None or elapsed is None:
+        return None
+    try:
+        elapsed = float(elapsed)
+    except (TypeError, ValueError):
+        return None
+    method = record.get("method")
+    label = _normalize_label(label)
+    if method:
+        label = f"{method} {label}"
+    return label, elapsed, _parse_success(record), _parse_timestamp(_pick(record, _TIMESTAMP_KEYS))
+
+
+def parse_har_entry(entry: Dict[str, Any]) -> Optional[Tuple[str, float, bool, Optional[float]]]:
+    """将HAR的entry归一化为 (接口, 耗时ms, 是否成功, 时间戳秒)"""
+    request = entry.get("request") or {}
+    response = entry.get("response") or {}
+    if "url" not in request or entry.get("time") is None:
+        return None
+    label = f"{request.get('method', 'GET')} {_normalize_label(request['url'])}"
+    status = response.get("status", 0)
+    try:
+        success = 0 < int(status) < 400
+    except (TypeError, ValueError):
+        success = False
+    return label, float(entry["time"]), success, _parse_timestamp(entry.get("startedDateTime"))
+
+
+# ---------------------------------------------------------------------------
+# 流式读取
+# ---------------------------------------------------------------------------
+
+def iter_csv_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_xml_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取XML格式的JTL
+
+    只返回顶层的 httpSample/sample 元素，嵌套的子样本不单独计数；
+    每个顶层样本处理完后从父元素中移除，已解析的树不随样本数增长。
+    """
+    parents: List[ElementTree.Element] = []
+    depth = 0  # 当前所在的样本元素嵌套层数
+    for event, elem in ElementTree.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if elem.tag in _XML_SAMPLE_TAGS:
+                depth += 1
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag not in _XML_SAMPLE_TAGS:
+            continue
+        depth -= 1
+        if depth == 0:
+            yield dict(elem.attrib)
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+
+def _first_char(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(1024)
+            if not chunk:
+                return ""
+            stripped = chunk.lstrip("\ufeff \t\r\n")
+            if stripped:
+                return stripped[0]
+
+
+def iter_json_items(file_path: str, prefix: str) -> Iterator[Dict[str, Any]]:
+    """流式读取JSON中prefix路径下的数组元素；未安装ijson时退化为整体加载"""
+    if IJSON_AVAILABLE:
+        with open(file_path, "rb") as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for key in prefix.split(".")[:-1]:
+        data = data.get(key, {}) if isinstance(data, dict) else {}
+    if isinstance(data, list):
+        yield from data
+
+
+def _read_head(file_path: str, max_chars: int = MAX_SUMMARY_CHARS) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read(max_chars + 1)
+    if len(content) > max_chars:
+        content = content[:max_chars] + "\n\n...[文件过大，后续内容已省略]..."
+    return content
+
+
+# ---------------------------------------------------------------------------
+# 对外接口
+# ---------------------------------------------------------------------------
+
+def aggregate_performance_file(file_path: str) -> Optional[PerformanceReportAggregator]:
+    """
+    流式聚合性能报告文件
+
+    :param file_path: 报告路径（.jtl/.csv/.xml/.har/.json）
+    :return: 聚合结果；文件不是样本类报告时返回None
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    aggregator = PerformanceReportAggregator()
+
+    if file_ext in (".jtl", ".csv"):
+        if _first_char(file_path) == "<":
+            records = iter_xml_records(file_path)
+        else:
+            records = iter_csv_records(file_path)
+        for record in records:
+            aggregator.add_sample(parse_record(record))
+    elif file_ext == ".xml":
+        for record in iter_xml_records(file_path):
+            aggregator.add_sample(parse_record(record))
+    elif file_ext == ".har":
+        for entry in iter_json_items(file_path, "log.entries.item"):
+            aggregator.add_sample(parse_har_entry(entry))
+    elif file_ext == ".json":
+        first = _first_char(file_path)
+        if first == "[":
+            for record in iter_json_items(file_path, "item"):
+                aggregator.add_sample(parse_record(record) if isinstance(record, dict) else None)
+        elif first == "{" and os.path.getsize(file_path) > MAX_INLINE_BYTES:
+            # 大型对象结构的JSON，尝试按HAR结构解析
+            for entry in iter_json_items(file_path, "log.entries.item"):
+                aggregator.add_sample(parse_har_entry(entry))
+        else:
+            return None
+    else:
+        return None
+
+    if aggregator.overall.count == 0:
+        return None
+    return aggregator
+
+
+def format_summary(file_path: str, summary: Dict[str, Any]) -> str:
+    """将聚合结果格式化为交给智能体的Markdown摘要"""
+    overall = summary["overall"]
+    lines = [
+        f"# 性能报告统计摘要: {os.path.basename(file_path)}",
+        "",
+        "说明：以下数据由原始报告流式聚合得到，耗时单位为毫秒，分位数相对误差约1%。",
+        "",
+        "## 总体指标",
+        f"- 样本数: {overall['count']}，错误数: {overall['errors']}，错误率: {overall['error_rate']:.2%}",
+        f"- 平均耗时: {overall['mean']}，最小: {overall['min']}，最大: {overall['max']}",
+        f"- P50: {overall['p50']}，P90: {overall['p90']}，P95: {overall['p95']}，P99: {overall['p99']}",
+        f"- 测试时长(秒): {overall['duration_seconds']}，平均吞吐量(请求/秒): {overall['throughput_rps']}",
+        f"- 接口数量: {summary['endpoint_count']}，无法解析的记录数: {summary['skipped_records']}",
+        "",
+        f"## 接口指标（按请求数排序，最多{MAX_ENDPOINTS_IN_SUMMARY}个）",
+        "| 接口 | 请求数 | 错误率 | 平均 | P50 | P90 | P95 | P99 | 最大 |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for label, stats in summary["endpoints"].items():
+        lines.append(
+            f"| {label} | {stats['count']} | {stats['error_rate']:.2%} | {stats['mean']} | {stats['p50']} "
+            f"| {stats['p90']} | {stats['p95']} | {stats['p99']} | {stats['max']} |"
+        )
+    if summary["timeline"]:
+        lines += [
+            "",
+            "## 吞吐量时间分布",
+            "| 开始时间 | 请求数 | 错误数 | 请求/秒 |",
+            "| --- | --- | --- | --- |",
+        ]
+        for row in summary["timeline"]:
+            lines.append(f"| {row['start']} | {row['requests']} | {row['errors']} | {row['rps']} |")
+    return "\n".join(lines)
+
+
+def summarize_performance_file(file_path: str) -> str:
+    """
+    生成交给智能体的性能报告内容
+
+    样本类报告（JTL/CSV/XML/HAR/样本数组JSON）返回统计摘要；
+    其他报告（HTML、汇总类JSON等）返回截断后的文本。
+
+    :param file_path: 报告路径
+    :return: 报告文本
+    """
+    aggregator = aggregate_performance_file(file_path)
+    if aggregator is not None:
+        return format_summary(file_path, aggregator.to_dict())
+
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == ".html":
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(_read_head(file_path, MAX_INLINE_BYTES), "html.parser")
+        # 尝试提取性能数据（这里是简化的示例）
+        performance_data = soup.find_all(class_=["performance", "metrics", "results"])
+        if performance_data:
+            text = "\n".join([div.get_text() for div in performance_data])
+        else:
+            text = soup.get_text()
+        return text[:MAX_SUMMARY_CHARS]
+
+    if file_ext in (".json", ".har") and os.path.getsize(file_path) <= MAX_INLINE_BYTES:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return json.dumps(data, indent=2, ensure_ascii=False)[:MAX_SUMMARY_CHARS]
+
+    return _read_head(file_path)
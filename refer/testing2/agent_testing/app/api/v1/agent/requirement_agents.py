@@ -492,11 +492,8 @@ class RequirementDatabaseAgent(RoutedAgent):
             requirement_data = json.loads(message.content)
             requirement_list = RequirementList(**requirement_data)
 
-            # 保存需求数据到数据库
-            count = 0
-            for requirement in requirement_list.requirements:
-                await requirement_controller.create(obj_in=requirement)
-                count += 1
+            # 保存需求数据到数据库，整批在一个事务中按需求名称去重写入
+            result = await requirement_controller.bulk_upsert(requirement_list.requirements)
 
             # 发送数据库保存结果(非最终消息)
             await self.publish_message(
@@ -511,7 +508,8 @@ class RequirementDatabaseAgent(RoutedAgent):
             await self.publish_message(
                 ResponseMessage(
                     source="数据库智能体",
-                    content=f"需求入库完成，共生成【{count}】条需求。",
+                    content=f"需求入库完成，共生成【{len(requirement_list.requirements)}】条需求，"
+                            f"新增{result['inserted']}条，更新{result['updated']}条，跳过{result['skipped']}条。",
                     is_final=True
                 ),
                 topic_id=TopicId(type=task_result_topic_type, source=self.id.key))
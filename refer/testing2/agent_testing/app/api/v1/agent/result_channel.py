@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 订阅者队列结束标记
+_CLOSED = object()
+
+
+class ResultChannel:
+    """
+    单次智能体运行的结果通道
+
+    - 每个订阅者拥有独立的有界队列，队列满时发布方等待（背压）
+    - 保留已发布的事件，后加入的订阅者会先收到历史事件的回放
+    - 最后一个订阅者断开且运行尚未产出最终结果（is_final）时，取消对应的运行任务；
+      已产出最终结果的运行继续执行到结束，由运行任务自身完成清理
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        max_buffer: int = 256,
+        max_history: int = 10000,
+        cancel_on_disconnect: bool = True,
+    ):
+        self.run_id = run_id
+        self.max_buffer = max_buffer
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+        self.closed = False
+        self.completed = False  # 已发布最终结果
+        self.task: Optional[asyncio.Task] = None
+        self._subscribers: List[asyncio.Queue] = []
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """发布事件到所有订阅者"""
+        if self.closed:
+            return
+        self.history.append(event)
+        if event.get("is_final"):
+            self.completed = True
+        for queue in list(self._subscribers):
+            await queue.put(event)
+
+    async def close(self) -> None:
+        """结束通道，通知所有订阅者"""
+        if self.closed:
+            return
+        self.closed = True
+        for queue in list(self._subscribers):
+            await queue.put(_CLOSED)
+
+    def _unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue not in self._subscribers:
+            return
+        self._subscribers.remove(queue)
+        # 清空队列，释放可能正阻塞在put上的发布方
+        while not queue.empty():
+            queue.get_nowait()
+        if self.cancel_on_disconnect and not self._subscribers and not self.closed and not self.completed \
+                and self.task is not None and not self.task.done():
+            logger.info(f"运行 {self.run_id} 已无订阅者，取消分析任务")
+            self.task.cancel()
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        """订阅通道，先回放历史事件，再持续接收新事件直到通道结束"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_buffer)
+        # 快照与注册之间没有await，保证历史事件与新事件不重不漏
+        replay = list(self.history)
+        closed = self.closed
+        if not closed:
+            self._subscribers.append(queue)
+        try:
+            for event in replay:
+                yield event
+            if closed:
+                return
+            while True:
+                event = await queue.get()
+                if event is _CLOSED:
+                    break
+                yield event
+        finally:
+            self._unsubscribe(queue)
+
+
+class ResultChannelRegistry:
+    """
+    按运行ID管理结果通道，运行结束的通道保留一段时间供后加入的订阅者回放
+
+    注册表保存在进程内存中，运行任务也在创建它的进程中执行，因此服务必须以单个工作进程运行
+    （uvicorn 不指定 --workers 或 --workers 1）；多工作进程部署时 /stream/{run_id} 只有落到
+    启动该运行的进程上才能找到通道，其余请求返回404。
+    """
+
+    def __init__(self, retention_seconds: float = 300):
+        self.retention_seconds = retention_seconds
+        self._channels: Dict[str, ResultChannel] = {}
+
+    def create(self, run_id: str, **kwargs) -> ResultChannel:
+        if run_id in self._channels and not self._channels[run_id].closed:
+            raise ValueError(f"运行 {run_id} 正在进行中")
+        channel = ResultChannel(run_id, **kwargs)
+        self._channels[run_id] = channel
+        return channel
+
+    def get(self, run_id: str) -> Optional[ResultChannel]:
+        return self._channels.get(run_id)
+
+    async def close(self, run_id: str) -> None:
+        """结束通道并在保留期后移除"""
+        channel = self._channels.get(run_id)
+        if channel is None:
+            return
+        await channel.close()
+        asyncio.get_running_loop().call_later(self.retention_seconds, self._discard, run_id, channel)
+
+    def _discard(self, run_id: str, channel: ResultChannel) -> None:
+        if self._channels.get(run_id) is channel:
+            del self._channels[run_id]
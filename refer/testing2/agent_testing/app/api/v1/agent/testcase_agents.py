@@ -12,6 +12,7 @@ from autogen_core import RoutedAgent, type_subscription, message_handler, Messag
 from autogen_core.memory import ListMemory, MemoryContent, MemoryMimeType
 from pydantic import BaseModel, Field
 
+from app.controllers.testcase import testcase_controller
 from app.schemas.testcases import CaseCreate
 from app.schemas.requirements import RequirementSelect
 from app.api.v1.agent.api.llms import model_client
@@ -104,7 +105,7 @@ class TestCaseGeneratorAgent(RoutedAgent):
 
         ### [顺序编号] 用例标题：[动作词]+[测试对象]+[预期行为]
         **用例描述**：[测试用例的详细描述]  
-        **测试类型**：[单元测试/接口测试/功能测试/性能测试/安全测试]  
+        **测试类型**：[单元测试/功能测试/集成测试/系统测试/冒烟测试/版本验证]  
         **优先级**：[高/中/低]
         **用例状态**：[未开始/进行中/通过/失败/阻塞]
         **需求ID**：[[requirement_id]]  
@@ -393,7 +394,7 @@ class TestCaseFinalizeAgent(RoutedAgent):
         2.不使用Markdown代码块
         3.每个测试用例必须包含required字段
         根据用户提供的测试用例及评审报告，根据如下格式生成最终的高质量测试用例。（注意：只输出下面的内容本身，去掉首尾的 ```json 和 ```）：
-        [{"$defs":{"TestStepBase":{"properties":{"description":{"description":"测试步骤的描述。","title":"Description","type":"string"},"expected_result":{"description":"测试步骤的预期结果。","title":"Expected Result","type":"string"}},"required":["description","expected_result"],"title":"TestStepBase","type":"object"}},"properties":{"title":{"description":"测试用例的标题。","maxLength":200,"title":"Title","type":"string"},"desc":{"default":null,"description":"测试用例的详细描述。","maxLength":1000,"title":"Desc","type":"string"},"priority":{"description":"测试用例的优先级：[高/中/低]","title":"Priority","type":"string"},"status":{"default":"未开始","description":"测试用例的当前状态：[未开始/进行中/通过/失败/阻塞]","title":"Status","type":"string"},"preconditions":{"anyOf":[{"type":"string"},{"type":"null"}],"default":null,"description":"测试用例的前置条件。","title":"Preconditions"},"postconditions":{"anyOf":[{"type":"string"},{"type":"null"}],"default":null,"description":"测试用例的后置条件。","title":"Postconditions"},"tags":{"anyOf":[{"type":"string"},{"type":"null"}],"description":"测试类型标签：[单元测试/接口测试/功能测试/性能测试/安全测试]","title":"Tags"},"requirement_id":{"description":"关联需求ID。","title":"Requirement Id","type":"integer","default":"[[requirement_id]]"},"project_id":{"description":"关联项目ID。","title":"Project Id","type":"integer","default":"[[project_id]]"},"creator":{"default":"田威峰","description":"测试用例的创建者姓名。","maxLength":100,"title":"Creator","type":"string"},"steps":{"anyOf":[{"items":{"$ref":"#/$defs/TestStepBase"},"type":"array"},{"type":"null"}],"default":null,"description":"测试步骤列表。","title":"Steps"}},"required":["title","priority","tags","requirement_id","project_id"],"title":"CaseCreate","type":"object"}]
+        [{"$defs":{"TestStepBase":{"properties":{"description":{"description":"测试步骤的描述。","title":"Description","type":"string"},"expected_result":{"description":"测试步骤的预期结果。","title":"Expected Result","type":"string"}},"required":["description","expected_result"],"title":"TestStepBase","type":"object"}},"properties":{"title":{"description":"测试用例的标题。","maxLength":200,"title":"Title","type":"string"},"desc":{"default":null,"description":"测试用例的详细描述。","maxLength":1000,"title":"Desc","type":"string"},"priority":{"description":"测试用例的优先级：[高/中/低]","title":"Priority","type":"string"},"status":{"default":"未开始","description":"测试用例的当前状态：[未开始/进行中/通过/失败/阻塞]","title":"Status","type":"string"},"preconditions":{"anyOf":[{"type":"string"},{"type":"null"}],"default":null,"description":"测试用例的前置条件。","title":"Preconditions"},"postconditions":{"anyOf":[{"type":"string"},{"type":"null"}],"default":null,"description":"测试用例的后置条件。","title":"Postconditions"},"tags":{"anyOf":[{"type":"string"},{"type":"null"}],"description":"测试类型标签：[单元测试/功能测试/集成测试/系统测试/冒烟测试/版本验证]","title":"Tags"},"requirement_id":{"description":"关联需求ID。","title":"Requirement Id","type":"integer","default":"[[requirement_id]]"},"project_id":{"description":"关联项目ID。","title":"Project Id","type":"integer","default":"[[project_id]]"},"creator":{"default":"田威峰","description":"测试用例的创建者姓名。","maxLength":100,"title":"Creator","type":"string"},"steps":{"anyOf":[{"items":{"$ref":"#/$defs/TestStepBase"},"type":"array"},{"type":"null"}],"default":null,"description":"测试步骤列表。","title":"Steps"}},"required":["title","priority","tags","requirement_id","project_id"],"title":"CaseCreate","type":"object"}]
         """
 
     @message_handler
@@ -473,16 +474,16 @@ class TestCaseDatabaseAgent(RoutedAgent):
             await self.publish_message(ResponseMessage(source="数据库智能体", content="正在进行数据验证......"),
                                        topic_id=TopicId(type=task_result_topic_type, source=self.id.key))
             test_case_list = TestCaseList(testcases=json.loads(message.content))
-            for testcase in test_case_list.testcases:
-                print(testcase)
-                # await testcase_controller.create_test_case(testcase)
+            # 整批在一个事务中写入用例、步骤及关联
+            result = await testcase_controller.bulk_upsert(test_case_list.testcases)
 
             await self.publish_message(ResponseMessage(source="database",content=test_case_list.model_dump_json(),
                                                        is_final=False),
                                        topic_id=TopicId(type=task_result_topic_type, source=self.id.key))
 
             await self.publish_message(ResponseMessage(source="数据库智能体",
-                                                       content=f"测试用例入库完成，共生成【{len(test_case_list.testcases)}】条测试用例。",
+                                                       content=f"测试用例入库完成，共生成【{len(test_case_list.testcases)}】条测试用例，"
+                                                               f"新增{result['inserted']}条，更新{result['updated']}条，跳过{result['skipped']}条。",
                                                        is_final=True),
                                        topic_id=TopicId(type=task_result_topic_type, source=self.id.key))
         except Exception as e:
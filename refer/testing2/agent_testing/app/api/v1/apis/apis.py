@@ -63,5 +63,5 @@ async def delete_api(
 
 @router.post("/refresh", summary="刷新API列表")
 async def refresh_api():
-    await api_controller.refresh_api()
-    return Success(msg="OK")
+    changes = await api_controller.refresh_api(force=True)
+    return Success(msg="OK", data=changes)
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Query
 from tortoise.expressions import Q
 
-from app.models.admin import AuditLog
-from app.schemas import SuccessExtra
+from app.core.crud import CRUDBase
+from app.models.admin import AuditLog, AuditLogRollup
+from app.schemas import Success, SuccessExtra
+from app.settings.config import settings
 from app.schemas.apis import *
 
 router = APIRouter()
 
+audit_log_crud = CRUDBase(model=AuditLog)
+
 
 @router.get("/list", summary="查看操作日志")
 async def get_audit_log_list(
@@ -19,7 +23,12 @@ async def get_audit_log_list(
     status: int = Query(None, description="状态码"),
     start_time: str = Query("", description="开始时间"),
     end_time: str = Query("", description="结束时间"),
+    cursor: str = Query(None, description="分页游标，传入上一页返回的 next_cursor 时按游标翻页，忽略 page"),
 ):
+    """
+    查询主表中的操作日志。开启分区（AUDIT_LOG_PARTITION）后，早于最近 AUDIT_LOG_HOT_PERIODS 个周期的日志
+    会移入分区表或被归档，不在本接口的结果中，只能通过 /rollup 查看统计或从归档文件中查询。
+    """
     q = Q()
     if username:
         q &= Q(username__icontains=username)
@@ -38,7 +47,62 @@ async def get_audit_log_list(
     elif end_time:
         q &= Q(created_at__lte=end_time)
 
-    audit_log_objs = await AuditLog.filter(q).offset((page - 1) * page_size).limit(page_size).order_by("-created_at")
-    total = await AuditLog.filter(q).count()
-    data = [await audit_log.to_dict() for audit_log in audit_log_objs]
-    return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+    if cursor:
+        total, audit_log_objs, next_cursor = await audit_log_crud.list_keyset(
+            page_size=page_size, search=q, order_field="-created_at", cursor=cursor
+        )
+    else:
+        total, audit_log_objs = await audit_log_crud.list(
+            page=page, page_size=page_size, search=q, order=["-created_at", "-id"],
+            count_ttl=settings.LIST_COUNT_CACHE_TTL,
+        )
+        next_cursor = (
+            audit_log_crud.encode_cursor(audit_log_objs[-1], "-created_at")
+            if len(audit_log_objs) == page_size else None
+        )
+    data = await AuditLog.bulk_to_dict(audit_log_objs)
+    return SuccessExtra(data=data, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
+
+
+@router.get("/rollup", summary="查看操作日志统计")
+async def get_audit_log_rollup(
+    group_by: str = Query("module", description="分组方式：module / status / hour / day"),
+    module: str = Query("", description="功能模块"),
+    start_time: str = Query("", description="开始时间"),
+    end_time: str = Query("", description="结束时间"),
+):
+    """
+    从预聚合的统计表查询请求数、平均/最大响应时间和慢请求数，不扫描原始日志。
+    """
+    q = Q()
+    if module:
+        q &= Q(module=module)
+    if start_time:
+        q &= Q(bucket__gte=start_time)
+    if end_time:
+        q &= Q(bucket__lte=end_time)
+    rows = await AuditLogRollup.filter(q).values_list(
+        "bucket", "module", "status", "count", "total_response_time", "max_response_time", "slow_count"
+    )
+
+    groups: dict = {}
+    for bucket, row_module, status, count, total, maximum, slow in rows:
+        if group_by == "status":
+            key = status
+        elif group_by == "hour":
+            key = bucket.strftime("%Y-%m-%d %H:00")
+        elif group_by == "day":
+            key = bucket.strftime("%Y-%m-%d")
+        else:
+            key = row_module
+        item = groups.setdefault(
+            key, {"key": key, "count": 0, "total_response_time": 0, "max_response_time": 0, "slow_count": 0}
+        )
+        item["count"] += count
+        item["total_response_time"] += total
+        item["max_response_time"] = max(item["max_response_time"], maximum)
+        item["slow_count"] += slow
+    data = sorted(groups.values(), key=lambda item: item["key"])
+    for item in data:
+        item["avg_response_time"] = round(item.pop("total_response_time") / item["count"], 2) if item["count"] else 0
+    return Success(data=data)
@@ -2,10 +2,14 @@ from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter
 
+from app.controllers.menu import menu_controller
 from app.controllers.user import user_controller
+from app.core.auditlog import audit_log_writer
 from app.core.ctx import CTX_USER_ID
+from app.core.dbstats import pool_monitor
 from app.core.dependency import DependAuth
-from app.models.admin import Api, Menu, Role, User
+from app.core.permission import permission_cache
+from app.models.admin import Api, Role, User
 from app.schemas.base import Fail, Success
 from app.schemas.login import *
 from app.schemas.users import UpdatePassword
@@ -49,28 +53,11 @@ async def get_userinfo():
 @router.get("/usermenu", summary="查看用户菜单", dependencies=[DependAuth])
 async def get_user_menu():
     user_id = CTX_USER_ID.get()
-    user_obj = await User.filter(id=user_id).first()
-    menus: list[Menu] = []
+    user_obj = await permission_cache.get_user(user_id)
     if user_obj.is_superuser:
-        menus = await Menu.all()
+        res = await menu_controller.get_menu_tree()
     else:
-        role_objs: list[Role] = await user_obj.roles
-        for role_obj in role_objs:
-            menu = await role_obj.menus
-            menus.extend(menu)
-        menus = list(set(menus))
-    parent_menus: list[Menu] = []
-    for menu in menus:
-        if menu.parent_id == 0:
-            parent_menus.append(menu)
-    res = []
-    for parent_menu in parent_menus:
-        parent_menu_dict = await parent_menu.to_dict()
-        parent_menu_dict["children"] = []
-        for menu in menus:
-            if menu.parent_id == parent_menu.id:
-                parent_menu_dict["children"].append(await menu.to_dict())
-        res.append(parent_menu_dict)
+        res = await menu_controller.get_role_menu_tree(await permission_cache.get_role_ids(user_id))
     return Success(data=res)
 
 
@@ -100,4 +87,10 @@ async def update_user_password(req_in: UpdatePassword):
         return Fail(msg="旧密码验证错误！")
     user.password = get_password_hash(req_in.new_password)
     await user.save()
+    permission_cache.invalidate_user(user_id)
     return Success(msg="修改成功")
+
+
+@router.get("/dbstats", summary="查看数据库连接池状态", dependencies=[DependAuth])
+async def get_db_stats():
+    return Success(data={"pool": pool_monitor.stats(), "audit_log_writer": audit_log_writer.stats()})
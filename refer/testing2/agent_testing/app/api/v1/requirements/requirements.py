@@ -7,6 +7,7 @@ from app.schemas.requirements import (
     REQUIREMENT_CATEGORIES, RequirementBase, RequirementSelect
 )
 from app.schemas.base import Success, SuccessExtra
+from app.settings.config import settings
 from tortoise.expressions import Q
 from fastapi.exceptions import HTTPException
 import logging
@@ -52,13 +53,15 @@ async def list_requirements(
         limit: int = Query(100, ge=1, le=1000, description="最大数量"),
         project_id: int = Query(None, gt=0, description="项目ID精准筛选"),
         category: REQUIREMENT_CATEGORIES = Query(None, description="需求类别筛选"),
-        keyword: str = Query(None, min_length=1, description="关键词模糊搜索")
+        keyword: str = Query(None, min_length=1, description="关键词模糊搜索"),
+        cursor: str = Query(None, description="分页游标，传入上一页返回的 next_cursor 时按游标翻页，忽略 page")
 ):
     """
     多条件分页查询需求
     - 支持项目ID精准筛选
     - 支持需求类别过滤
     - 支持关键词模糊匹配（名称/描述/备注）
+    - 支持游标分页，深分页耗时不随页码增加
     """
     query = Q()
     if project_id:
@@ -70,13 +73,27 @@ async def list_requirements(
                    Q(description__icontains=keyword) |
                    Q(remark__icontains=keyword))
 
-    total, req_objs = await requirement_controller.list_limit(
-        page=page,
-        page_size=page_size,
-        search=query,
-        order=["-created_at"],  # 按创建时间倒序
-        limit=limit
-    )
+    # limit 限制单页最多返回的条数，偏移分页、游标翻页和 next_cursor 判断使用同一页大小
+    size = min(page_size, limit)
+    if cursor:
+        total, req_objs, next_cursor = await requirement_controller.list_keyset(
+            page_size=size,
+            search=query,
+            order_field="-created_at",  # 按创建时间倒序
+            cursor=cursor
+        )
+    else:
+        total, req_objs = await requirement_controller.list(
+            page=page,
+            page_size=size,
+            search=query,
+            order=["-created_at", "-id"],  # 按创建时间倒序
+            count_ttl=settings.LIST_COUNT_CACHE_TTL
+        )
+        next_cursor = (
+            requirement_controller.encode_cursor(req_objs[-1], "-created_at")
+            if len(req_objs) == size else None
+        )
 
     # 使用 Pydantic 模型序列化结果
     # data1 = [await obj.to_dict() for obj in req_objs]
@@ -85,7 +102,8 @@ async def list_requirements(
         data=data,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=size,
+        next_cursor=next_cursor
     )
 
 
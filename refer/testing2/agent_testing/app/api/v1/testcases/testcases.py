@@ -4,6 +4,7 @@ from app.controllers.requirement import requirement_controller
 from app.controllers.project import project_controller
 from app.schemas.testcases import *
 from app.schemas.base import Success, SuccessExtra
+from app.settings.config import settings
 from tortoise.expressions import Q
 import logging
 
@@ -29,6 +30,7 @@ async def list_testcase(
     page_size: int = Query(10, description="每页数量"),
     project_id: int = Query(None, description="项目名称，用于查询"),
     requirement_id: int = Query(None, description="需求ID，用于查询"),
+    cursor: str = Query(None, description="分页游标，传入上一页返回的 next_cursor 时按游标翻页，忽略 page"),
 ):
     """
     获取测试用例列表。
@@ -38,22 +40,31 @@ async def list_testcase(
         q &= Q(project_id=project_id)
     if requirement_id is not None:
         q &= Q(requirement_id=requirement_id)
+    if cursor:
+        # 按 ID 游标翻页
+        total, testcase_objs, next_cursor = await testcase_controller.list_keyset(
+            page_size=page_size, search=q, order_field="id", cursor=cursor
+        )
+    else:
         # 调用控制器的 list 方法
-        total, testcase_objs = await testcase_controller.list(page=page, page_size=page_size, search=q)
+        total, testcase_objs = await testcase_controller.list(
+            page=page, page_size=page_size, search=q, order=["id"], count_ttl=settings.LIST_COUNT_CACHE_TTL
+        )
+        next_cursor = (
+            testcase_controller.encode_cursor(testcase_objs[-1], "id") if len(testcase_objs) == page_size else None
+        )
 
-        # 将结果转换为字典格式，并处理外键字段
-        data = [await obj.to_dict(m2m=True) for obj in testcase_objs]
-        for item in data:
-            # 替换 project_id 为项目详情
-            project_id = item.pop("project_id", None)
-            item["project"] = await (await project_controller.get(id=project_id)).to_dict() if project_id else {}
+    # 批量序列化，测试步骤对整页用例一次查询预取
+    data = await testcase_controller.model.bulk_to_dict(testcase_objs, m2m=True)
 
-            # 替换 requirement_id 为需求详情
-            requirement_id = item.pop("requirement_id", None)
-            item["requirement"] = await (
-                await requirement_controller.get(id=requirement_id)).to_dict() if requirement_id else {}
+    # 项目和需求各用一次 id__in 查询，在内存中替换外键字段
+    projects = await project_controller.get_dicts_by_ids(item["project_id"] for item in data)
+    requirements = await requirement_controller.get_dicts_by_ids(item["requirement_id"] for item in data)
+    for item in data:
+        item["project"] = projects.get(item.pop("project_id", None), {})
+        item["requirement"] = requirements.get(item.pop("requirement_id", None), {})
 
-        return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
+    return SuccessExtra(data=data, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
 
 
 @router.get("/get", summary="查看测试用例详情")
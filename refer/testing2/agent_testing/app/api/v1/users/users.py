@@ -5,6 +5,7 @@ from tortoise.expressions import Q
 
 from app.controllers.dept import dept_controller
 from app.controllers.user import user_controller
+from app.models.admin import User
 from app.schemas.base import Fail, Success, SuccessExtra
 from app.schemas.users import *
 
@@ -29,10 +30,10 @@ async def list_user(
     if dept_id is not None:
         q &= Q(dept_id=dept_id)
     total, user_objs = await user_controller.list(page=page, page_size=page_size, search=q)
-    data = [await obj.to_dict(m2m=True, exclude_fields=["password"]) for obj in user_objs]
+    data = await User.bulk_to_dict(user_objs, m2m=True, exclude_fields=["password"])
+    depts = await dept_controller.get_dicts_by_ids(item["dept_id"] for item in data)
     for item in data:
-        dept_id = item.pop("dept_id", None)
-        item["dept"] = await (await dept_controller.get(id=dept_id)).to_dict() if dept_id else {}
+        item["dept"] = depts.get(item.pop("dept_id", None), {})
 
     return SuccessExtra(data=data, total=total, page=page, page_size=page_size)
 
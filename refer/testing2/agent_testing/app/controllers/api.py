@@ -1,11 +1,20 @@
 # 导入必要的模块
+import hashlib  # 用于计算路由表指纹
+import json  # 用于序列化路由表
+from typing import Any, Dict, Union  # 用于类型提示
+
 from fastapi.routing import APIRoute  # FastAPI 的路由类
+from tortoise.transactions import in_transaction  # 数据库事务
 
 from app.core.crud import CRUDBase  # CRUD 基类，提供通用的增删改查方法
+from app.core.permission import permission_cache  # 权限缓存
 from app.log import logger  # 日志记录器
-from app.models.admin import Api  # 定义 API 模型的 Tortoise ORM 类
+from app.models.admin import Api, SystemConfig  # 定义 API 和系统配置模型的 Tortoise ORM 类
 from app.schemas.apis import ApiCreate, ApiUpdate  # 定义 API 创建和更新的 Pydantic 模型
 
+# 路由表指纹在系统配置表中的键
+API_FINGERPRINT_KEY = "api_route_fingerprint"
+
 
 class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
     """
@@ -14,44 +23,83 @@ class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
     def __init__(self):
         super().__init__(model=Api)  # 初始化父类，指定模型为 Api
 
-    async def refresh_api(self):
+    async def refresh_api(self, force: bool = False) -> dict:
         """
         同步 FastAPI 路由中的 API 数据到数据库中。
+        路由表计算一次，与一次查询出的数据库记录做差集，在同一个事务中批量删除、新增和更新。
+        路由表指纹与上次同步时一致且 API 数量不变时直接跳过。
+        参数:
+            force (bool): 是否忽略指纹强制同步
+        返回:
+            dict: 删除、新增、更新的 API 数量，跳过时 skipped 为 True
         """
         from app import app  # 导入 FastAPI 应用实例
 
-        # 删除废弃的 API 数据
-        all_api_list = []  # 存储所有需要保留的 API 列表
-        for route in app.routes:  # 遍历 FastAPI 应用的所有路由
-            # 只处理有鉴权依赖的 API（即需要认证的 API）
+        # 需要保留的 API：(method, path) -> (summary, tags)，只处理有鉴权依赖的 API（即需要认证的 API）
+        desired: dict[tuple[str, str], tuple[str, str]] = {}
+        for route in app.routes:
             if isinstance(route, APIRoute) and len(route.dependencies) > 0:
-                all_api_list.append((list(route.methods)[0], route.path_format))  # 提取方法和路径
+                method = list(route.methods)[0]  # 提取请求方法
+                tags = list(route.tags)[0] if route.tags else ""  # 提取标签
+                desired[(method, route.path_format)] = (route.summary, tags)
 
-        delete_api = []  # 存储需要删除的 API 列表
-        for api in await Api.all():  # 遍历数据库中的所有 API
-            if (api.method, api.path) not in all_api_list:  # 如果数据库中的 API 不在需要保留的列表中
-                delete_api.append((api.method, api.path))  # 添加到删除列表
+        fingerprint = hashlib.sha256(
+            json.dumps(sorted([*key, *value] for key, value in desired.items()), ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        if not force:
+            stored = await SystemConfig.filter(key=API_FINGERPRINT_KEY).first()
+            if stored and stored.value == fingerprint and await Api.all().count() == len(desired):
+                return {"skipped": True, "deleted": 0, "created": 0, "updated": 0}
 
-        for item in delete_api:  # 删除废弃的 API
-            method, path = item
-            logger.debug(f"API Deleted {method} {path}")  # 记录日志
-            await Api.filter(method=method, path=path).delete()  # 删除数据库中的对应记录
+        async with in_transaction():
+            existing: dict[tuple[str, str], Api] = {}
+            delete_ids = []
+            for api in await Api.all():
+                key = (str(api.method), api.path)
+                if key not in desired or key in existing:  # 废弃的 API 或重复的记录
+                    delete_ids.append(api.id)
+                else:
+                    existing[key] = api
 
-        # 更新或创建新的 API 数据
-        for route in app.routes:  # 再次遍历 FastAPI 应用的所有路由
-            if isinstance(route, APIRoute) and len(route.dependencies) > 0:  # 只处理有鉴权依赖的 API
-                method = list(route.methods)[0]  # 提取请求方法
-                path = route.path_format  # 提取路径
-                summary = route.summary  # 提取简介
-                tags = list(route.tags)[0] if route.tags else ""  # 提取标签
+            to_update = []
+            for key, api in existing.items():
+                summary, tags = desired[key]
+                if api.summary != summary or api.tags != tags:
+                    api.summary, api.tags = summary, tags
+                    to_update.append(api)
+            to_create = [
+                Api(method=method, path=path, summary=summary, tags=tags)
+                for (method, path), (summary, tags) in desired.items()
+                if (method, path) not in existing
+            ]
+
+            if delete_ids:
+                await Api.filter(id__in=delete_ids).delete()
+            if to_create:
+                await Api.bulk_create(to_create)
+            if to_update:
+                await Api.bulk_update(to_update, fields=["summary", "tags"])
+            await SystemConfig.update_or_create(key=API_FINGERPRINT_KEY, defaults={"value": fingerprint})
 
-                # 查询数据库中是否存在对应的 API
-                api_obj = await Api.filter(method=method, path=path).first()
-                if api_obj:  # 如果存在，则更新
-                    await api_obj.update_from_dict(dict(method=method, path=path, summary=summary, tags=tags)).save()
-                else:  # 如果不存在，则创建
-                    logger.debug(f"API Created {method} {path}")  # 记录日志
-                    await Api.create(**dict(method=method, path=path, summary=summary, tags=tags))
+        logger.debug(f"API refreshed: deleted {len(delete_ids)}, created {len(to_create)}, updated {len(to_update)}")
+        if delete_ids or to_create or to_update:
+            permission_cache.invalidate_role()  # API 数据已变更，使所有角色的权限缓存失效
+        return {"skipped": False, "deleted": len(delete_ids), "created": len(to_create), "updated": len(to_update)}
+
+    async def update(self, id: int, obj_in: Union[ApiUpdate, Dict[str, Any]]) -> Api:
+        """
+        更新 API，并使角色权限缓存失效。
+        """
+        obj = await super().update(id=id, obj_in=obj_in)
+        permission_cache.invalidate_role()
+        return obj
+
+    async def remove(self, id: int) -> None:
+        """
+        删除 API，并使角色权限缓存失效。
+        """
+        await super().remove(id=id)
+        permission_cache.invalidate_role()
 
 
 # 实例化 API 控制器
@@ -1,7 +1,8 @@
 # 导入必要的模块
-from typing import Optional  # 用于类型提示
+from typing import Any, Dict, Iterable, Optional, Union  # 用于类型提示
 
 from app.core.crud import CRUDBase  # CRUD 基类，提供通用的增删改查方法
+from app.core.tree import build_tree, tree_cache  # 树结构构建工具和缓存
 from app.models.admin import Menu  # 定义菜单模型的 Tortoise ORM 类
 from app.schemas.menus import MenuCreate, MenuUpdate  # 定义菜单创建和更新的 Pydantic 模型
 
@@ -23,6 +24,65 @@ class MenuController(CRUDBase[Menu, MenuCreate, MenuUpdate]):
         """
         return await self.model.filter(path=path).first()  # 使用 Tortoise ORM 的 filter 方法查询菜单
 
+    async def get_menu_tree(self) -> list[dict]:
+        """
+        获取全部菜单的树结构，一次查询取出所有菜单，结果按 order 排序并缓存。
+        返回:
+            list[dict]: 顶级菜单列表，每个菜单包含 children 字段
+        """
+        async def build():
+            menus = await self.model.all().order_by("order")
+            return build_tree(await self.model.bulk_to_dict(menus))
+
+        return await tree_cache.get(("menu",), build)
+
+    async def get_role_menu_tree(self, role_ids: Iterable[int]) -> list[dict]:
+        """
+        获取一组角色可见菜单的树结构，一次查询取出所有角色的菜单，按角色组合缓存。
+        参数:
+            role_ids (Iterable[int]): 角色 ID
+        返回:
+            list[dict]: 顶级菜单列表，每个菜单包含 children 字段
+        """
+        role_ids = tuple(sorted(set(role_ids)))
+
+        async def build():
+            if not role_ids:
+                return []
+            menus = await self.model.filter(role_menus__id__in=role_ids).distinct().order_by("order")
+            return build_tree(await self.model.bulk_to_dict(menus))
+
+        return await tree_cache.get(("role_menu", role_ids), build)
+
+    @staticmethod
+    def invalidate_tree():
+        """使全部菜单树和角色菜单树缓存失效"""
+        tree_cache.invalidate("menu")
+        tree_cache.invalidate("role_menu")
+
+    async def create(self, obj_in: Union[MenuCreate, Dict[str, Any]]) -> Menu:
+        """
+        创建菜单，并使菜单树缓存失效。
+        """
+        obj = await super().create(obj_in=obj_in)
+        self.invalidate_tree()
+        return obj
+
+    async def update(self, id: int, obj_in: Union[MenuUpdate, Dict[str, Any]]) -> Menu:
+        """
+        更新菜单，并使菜单树缓存失效。
+        """
+        obj = await super().update(id=id, obj_in=obj_in)
+        self.invalidate_tree()
+        return obj
+
+    async def remove(self, id: int) -> None:
+        """
+        删除菜单，并使菜单树缓存失效。
+        """
+        await super().remove(id=id)
+        self.invalidate_tree()
+
 
 # 实例化菜单控制器
 menu_controller = MenuController()
\ No newline at end of file
@@ -1,5 +1,8 @@
+from typing import List
+
+from tortoise import timezone
 from tortoise.expressions import Q
-from tortoise.transactions import atomic
+from tortoise.transactions import atomic, in_transaction
 from app.core.crud import CRUDBase
 from app.models.admin import Requirement
 from app.schemas.requirements import (
@@ -40,6 +43,43 @@ class RequirementController(CRUDBase[Requirement, RequirementCreate, Requirement
         """增强存在性检查，支持复合条件查询"""
         return await self.model.filter(*expressions).exists()
 
+    async def bulk_upsert(self, requirements: List[RequirementCreate]) -> dict:
+        """
+        批量保存需求（智能体生成的结果），按唯一的需求名称去重：
+        名称已存在且内容有变化的更新，内容相同的跳过，批次内重名的只保留第一条。
+        查询已有需求、批量插入、批量更新在同一个事务中完成，语句数与需求条数无关。
+        返回:
+            dict: {"inserted": 新增条数, "updated": 更新条数, "skipped": 跳过条数}
+        """
+        rows: dict[str, dict] = {}  # 需求名称 -> 字段
+        skipped = 0
+        for requirement in requirements:
+            data = requirement.model_dump(exclude={"created_at", "updated_at"})
+            if data["name"] in rows:
+                skipped += 1
+                continue
+            rows[data["name"]] = data
+
+        async with in_transaction():
+            existing = {obj.name: obj for obj in await self.model.filter(name__in=list(rows))}
+            to_create, to_update = [], []
+            for name, data in rows.items():
+                obj = existing.get(name)
+                if obj is None:
+                    to_create.append(self.model(**data))
+                elif any(getattr(obj, field) != value for field, value in data.items()):
+                    obj.update_from_dict(data)
+                    obj.updated_at = timezone.now()  # bulk_update 不会自动刷新 auto_now 字段
+                    to_update.append(obj)
+                else:
+                    skipped += 1
+            if to_create:
+                await self.model.bulk_create(to_create)
+            if to_update:
+                fields = [field for field in next(iter(rows.values())) if field != "name"] + ["updated_at"]
+                await self.model.bulk_update(to_update, fields=fields)
+        return {"inserted": len(to_create), "updated": len(to_update), "skipped": skipped}
+
     async def list_with_project(self, search: Q, order_by: list = None):
         """带项目信息的联表查询"""
         query = self.model.filter(search).prefetch_related("project")
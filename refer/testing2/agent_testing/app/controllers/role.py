@@ -1,7 +1,11 @@
 # 导入必要的模块
 from typing import List  # 用于类型提示
 
+from tortoise.transactions import in_transaction  # 数据库事务
+
 from app.core.crud import CRUDBase  # CRUD 基类，提供通用的增删改查方法
+from app.core.permission import permission_cache  # 权限缓存
+from app.core.tree import tree_cache  # 树结构缓存
 from app.models.admin import Api, Menu, Role  # 定义 API、菜单和角色模型的 Tortoise ORM 类
 from app.schemas.roles import RoleCreate, RoleUpdate  # 定义角色创建和更新的 Pydantic 模型
 
@@ -23,27 +27,64 @@ class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
         """
         return await self.model.filter(name=name).exists()  # 使用 Tortoise ORM 的 exists 方法检查角色名称是否存在
 
-    async def update_roles(self, role: Role, menu_ids: List[int], api_infos: List[dict]) -> None:
+    async def update_roles(self, role: Role, menu_ids: List[int], api_infos: List[dict]) -> dict:
         """
         更新角色的菜单和 API 权限。
+        菜单和 API 各用一次查询取出，与角色当前的关联做差集，只在同一个事务中批量增删变化的部分。
         参数:
             role (Role): 角色对象
             menu_ids (List[int]): 菜单 ID 列表
             api_infos (List[dict]): API 信息列表，包含 path 和 method 字段
+        返回:
+            dict: 变更内容，包含新增和删除的菜单 ID、API ID
+        """
+        async with in_transaction():
+            # 目标菜单及角色当前的菜单
+            target_menus = {menu.id: menu for menu in await Menu.filter(id__in=set(menu_ids))}
+            current_menus = {menu.id: menu for menu in await role.menus.all()}
+            menus_added = [menu for menu_id, menu in target_menus.items() if menu_id not in current_menus]
+            menus_removed = [menu for menu_id, menu in current_menus.items() if menu_id not in target_menus]
+
+            # 目标 API 按路径一次查出，再按 (path, method) 过滤
+            api_keys = {(item.get("path"), item.get("method")) for item in api_infos}
+            target_apis = {
+                api.id: api
+                for api in await Api.filter(path__in={path for path, _ in api_keys})
+                if (api.path, str(api.method)) in api_keys
+            }
+            current_apis = {api.id: api for api in await role.apis.all()}
+            apis_added = [api for api_id, api in target_apis.items() if api_id not in current_apis]
+            apis_removed = [api for api_id, api in current_apis.items() if api_id not in target_apis]
+
+            if menus_removed:
+                await role.menus.remove(*menus_removed)
+            if menus_added:
+                await role.menus.add(*menus_added)
+            if apis_removed:
+                await role.apis.remove(*apis_removed)
+            if apis_added:
+                await role.apis.add(*apis_added)
+
+        permission_cache.invalidate_role(role.id)  # 角色权限已变更，使缓存失效
+        if menus_added or menus_removed:
+            tree_cache.invalidate("role_menu")  # 角色菜单已变更，使角色菜单树缓存失效
+        return {
+            "menus_added": [menu.id for menu in menus_added],
+            "menus_removed": [menu.id for menu in menus_removed],
+            "apis_added": [api.id for api in apis_added],
+            "apis_removed": [api.id for api in apis_removed],
+        }
+
+    async def remove(self, id: int) -> None:
+        """
+        删除角色，并使权限缓存失效。
+        参数:
+            id (int): 角色 ID
         """
-        # 清空角色的菜单权限
-        await role.menus.clear()
-        for menu_id in menu_ids:  # 遍历菜单 ID 列表
-            menu_obj = await Menu.filter(id=menu_id).first()  # 查询对应的菜单对象
-            if menu_obj:  # 如果菜单对象存在
-                await role.menus.add(menu_obj)  # 将菜单添加到角色的菜单权限中
-
-        # 清空角色的 API 权限
-        await role.apis.clear()
-        for item in api_infos:  # 遍历 API 信息列表
-            api_obj = await Api.filter(path=item.get("path"), method=item.get("method")).first()  # 查询对应的 API 对象
-            if api_obj:  # 如果 API 对象存在
-                await role.apis.add(api_obj)  # 将 API 添加到角色的 API 权限中
+        await super().remove(id=id)
+        permission_cache.invalidate_role(id)
+        permission_cache.invalidate_user()  # 用户缓存中的角色 ID 可能包含已删除的角色
+        tree_cache.invalidate("role_menu")
 
 
 # 实例化角色控制器
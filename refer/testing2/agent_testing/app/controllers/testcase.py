@@ -1,8 +1,21 @@
+from typing import List
+
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
 from tortoise.expressions import Q
-from tortoise.transactions import atomic
+from tortoise.transactions import atomic, in_transaction
 from app.core.crud import CRUDBase
-from app.models.admin import TestCase
 from app.schemas.testcases import *
+# 模型放在 schemas 之后导入，避免被 schemas 中同名的 TestCase、TestStep 覆盖
+from app.models.admin import SystemConfig, TestCase, TestStep
+from app.models.enums import Priority as PriorityEnum, Status as StatusEnum, TestCaseTag as TestCaseTagEnum
+
+try:  # tortoise-orm 0.22 起使用 pypika_tortoise
+    from pypika_tortoise import Table
+except ImportError:
+    from pypika import Table
+
+TEST_CASE_NO_KEY = "testcase_last_no"  # 已分配的最大用例编号
 
 
 class TestCaseController(CRUDBase[TestCase, CaseCreate, CaseUpdate]):
@@ -53,6 +66,136 @@ class TestCaseController(CRUDBase[TestCase, CaseCreate, CaseUpdate]):
         """
         await self.remove(id=case_id)
 
+    async def bulk_upsert(self, cases: List[CaseCreate]) -> dict:
+        """
+        批量保存测试用例及其步骤（智能体生成的结果）。
+        先校验整批数据，任何一条不合法都不写入（无法识别的标签归为功能测试）；按 (项目ID, 需求ID, 标题) 去重：
+        已存在且字段或步骤有变化的更新（步骤整体替换），完全相同的跳过，批次内重复的只保留第一条。
+        用例、步骤、多对多关联表都使用批量插入，在同一个事务中完成，语句数与用例条数无关。
+        新用例的编号从计数器记录中分配，记录在事务内加行锁，并发保存不会产生重复编号。
+        返回:
+            dict: {"inserted": 新增条数, "updated": 更新条数, "skipped": 跳过条数}
+        """
+        rows: dict[tuple, tuple[dict, list]] = {}  # (项目ID, 需求ID, 标题) -> (用例字段, [(步骤描述, 预期结果)])
+        skipped = 0
+        for case in cases:
+            data = case.model_dump(mode="json", exclude={"steps"})
+            data["priority"] = PriorityEnum(data["priority"])
+            data["status"] = StatusEnum(data["status"])
+            data["tags"] = TestCaseTagEnum._value2member_map_.get(data["tags"], TestCaseTagEnum.FUNCTIONAL_TEST)
+            key = (data["project_id"], data["requirement_id"], data["title"])
+            if key in rows:
+                skipped += 1
+                continue
+            rows[key] = (data, [(step.description, step.expected_result) for step in case.steps or []])
+        if not rows:
+            return {"inserted": 0, "updated": 0, "skipped": skipped}
+
+        await self._ensure_number_counter()
+        async with in_transaction() as conn:
+            existing = {
+                (obj.project_id, obj.requirement_id, obj.title): obj
+                for obj in await self.model.filter(
+                    project_id__in={key[0] for key in rows},
+                    requirement_id__in={key[1] for key in rows},
+                    title__in={key[2] for key in rows},
+                )
+            }
+            existing_steps: dict[int, list] = {}  # 用例ID -> 已有步骤
+            if existing:
+                old_steps = TestStep.filter(test_case_id__in=[obj.id for obj in existing.values()])
+                for step in await old_steps.order_by("step_id"):
+                    existing_steps.setdefault(step.test_case_id, []).append((step.description, step.expected_result))
+
+            to_create, to_update = [], []
+            step_rows: dict[int, list] = {}  # 需要写入步骤的用例ID -> 步骤
+            for key, (data, steps) in rows.items():
+                obj = existing.get(key)
+                if obj is None:
+                    to_create.append((data, steps))
+                    continue
+                fields_changed = any(getattr(obj, field) != value for field, value in data.items())
+                steps_changed = existing_steps.get(obj.id, []) != steps
+                if not fields_changed and not steps_changed:
+                    skipped += 1
+                    continue
+                obj.update_from_dict(data)
+                obj.updated_at = timezone.now()  # bulk_update 不会自动刷新 auto_now 字段
+                to_update.append(obj)
+                if steps_changed:
+                    step_rows[obj.id] = steps
+
+            if to_update:
+                await self.model.bulk_update(to_update, fields=list(next(iter(rows.values()))[0]) + ["updated_at"])
+                if step_rows:
+                    await self._delete_steps(conn, list(step_rows))
+
+            if to_create:
+                # 新用例的编号接在已分配的最大编号之后，插入后按编号取回数据库ID
+                next_no = await self._allocate_numbers(len(to_create))
+                numbered = {next_no + i: (data, steps) for i, (data, steps) in enumerate(to_create)}
+                await self.model.bulk_create(
+                    [self.model(test_case_id=no, **data) for no, (data, _) in numbered.items()]
+                )
+                created = await self.model.filter(test_case_id__in=list(numbered)).values_list(
+                    "id", "test_case_id", "project_id", "requirement_id", "title"
+                )
+                for case_id, no, *key in created:
+                    data, steps = numbered[no]
+                    if tuple(key) == (data["project_id"], data["requirement_id"], data["title"]):
+                        step_rows[case_id] = steps
+
+            await self._create_steps(conn, step_rows)
+        return {"inserted": len(to_create), "updated": len(to_update), "skipped": skipped}
+
+    async def _ensure_number_counter(self):
+        """创建用例编号计数器，初始值为当前最大编号"""
+        if await SystemConfig.exists(key=TEST_CASE_NO_KEY):
+            return
+        last = await self.model.all().order_by("-test_case_id").first()
+        try:
+            await SystemConfig.create(key=TEST_CASE_NO_KEY, value=str(last.test_case_id if last else 0))
+        except IntegrityError:  # 其他进程同时创建了计数器
+            pass
+
+    async def _allocate_numbers(self, count: int) -> int:
+        """
+        在当前事务中分配 count 个连续的用例编号，计数器记录加行锁直到事务结束。
+        返回:
+            int: 第一个编号
+        """
+        counter = await SystemConfig.select_for_update().get(key=TEST_CASE_NO_KEY)
+        last = int(counter.value)
+        counter.value = str(last + count)
+        await counter.save(update_fields=["value"])
+        return last + 1
+
+    async def _create_steps(self, conn, step_rows: dict[int, list]):
+        """批量插入步骤，再用一条 INSERT 写入用例与步骤的多对多关联"""
+        steps = [
+            TestStep(step_id=index + 1, test_case_id=case_id, description=description, expected_result=expected_result)
+            for case_id, items in step_rows.items()
+            for index, (description, expected_result) in enumerate(items)
+        ]
+        if not steps:
+            return
+        await TestStep.bulk_create(steps)
+        field = self.model._meta.fields_map["steps"]
+        through = Table(field.through)
+        query = conn.query_class.into(through).columns(through[field.forward_key], through[field.backward_key])
+        links = await TestStep.filter(test_case_id__in=list(step_rows)).values_list("id", "test_case_id")
+        for step_id, case_id in links:
+            query = query.insert(step_id, case_id)
+        await conn.execute_query(query.get_sql())
+
+    async def _delete_steps(self, conn, case_ids: list[int]):
+        """删除用例的全部步骤及多对多关联"""
+        field = self.model._meta.fields_map["steps"]
+        through = Table(field.through)
+        query = conn.query_class.from_(through).where(through[field.backward_key].isin(case_ids)).delete()
+        await conn.execute_query(query.get_sql())
+        await TestStep.filter(test_case_id__in=case_ids).delete()
+
 
 # 实例化项目控制器
 testcase_controller = TestCaseController()
\ No newline at end of file
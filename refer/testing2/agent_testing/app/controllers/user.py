@@ -1,10 +1,11 @@
 # 导入必要的模块
 from datetime import datetime  # 用于处理日期和时间
-from typing import List, Optional  # 用于类型提示
+from typing import Any, Dict, List, Optional, Union  # 用于类型提示
 
 from fastapi.exceptions import HTTPException  # FastAPI 的异常类
 
 from app.core.crud import CRUDBase  # CRUD 基类，提供通用的增删改查方法
+from app.core.permission import permission_cache  # 权限缓存
 from app.models.admin import User  # 定义用户模型的 Tortoise ORM 类
 from app.schemas.login import CredentialsSchema  # 定义登录凭据的 Pydantic 模型
 from app.schemas.users import UserCreate, UserUpdate  # 定义用户创建和更新的 Pydantic 模型
@@ -52,6 +53,28 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         obj = await self.create(obj_in)  # 调用父类的 create 方法创建用户
         return obj
 
+    async def update(self, id: int, obj_in: Union[UserUpdate, Dict[str, Any]]) -> User:
+        """
+        更新用户，并使该用户的权限缓存失效。
+        参数:
+            id (int): 用户 ID
+            obj_in (Union[UserUpdate, Dict[str, Any]]): 用户更新模型或字典
+        返回:
+            User: 更新后的用户对象
+        """
+        obj = await super().update(id=id, obj_in=obj_in)
+        permission_cache.invalidate_user(id)
+        return obj
+
+    async def remove(self, id: int) -> None:
+        """
+        删除用户，并使该用户的权限缓存失效。
+        参数:
+            id (int): 用户 ID
+        """
+        await super().remove(id=id)
+        permission_cache.invalidate_user(id)
+
     async def update_last_login(self, id: int) -> None:
         """
         更新用户的最后登录时间。
@@ -61,6 +84,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.model.get(id=id)  # 获取用户对象
         user.last_login = datetime.now()  # 设置最后登录时间为当前时间
         await user.save()  # 保存更新
+        permission_cache.invalidate_user(id)  # 缓存中的用户对象已过期
 
     async def authenticate(self, credentials: CredentialsSchema) -> Optional["User"]:
         """
@@ -91,6 +115,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         for role_id in role_ids:  # 遍历角色 ID 列表
             role_obj = await role_controller.get(id=role_id)  # 获取角色对象
             await user.roles.add(role_obj)  # 将角色添加到用户的角色列表中
+        permission_cache.invalidate_user(user.id)  # 用户角色已变更，使缓存失效
 
     async def reset_password(self, user_id: int):
         """
@@ -103,6 +128,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
             raise HTTPException(status_code=403, detail="不允许重置超级管理员密码")  # 抛出异常
         user_obj.password = get_password_hash(password="123456")  # 重置密码为默认值 "123456"
         await user_obj.save()  # 保存更新
+        permission_cache.invalidate_user(user_id)  # 缓存中的用户对象已过期
 
 
 # 实例化用户控制器
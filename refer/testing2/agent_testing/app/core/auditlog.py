@@ -0,0 +1,159 @@
+import asyncio  # 异步任务
+import re  # 正则表达式模块，用于路径匹配
+from typing import Optional
+
+from fastapi import FastAPI  # FastAPI 框架
+from fastapi.routing import APIRoute  # 路由对象
+
+from app.log import logger  # 日志记录器
+from app.models.admin import AuditLog  # 数据库模型
+from app.settings.config import settings  # 配置文件
+
+
+class RouteIndex:
+    """
+    路由索引，启动后首次使用时根据 app.routes 构建一次，用于查找请求对应的模块和接口描述。
+    无路径参数的路由直接按 (方法, 路径) 查字典，带参数的路由才做正则匹配。
+    与原逐个路由匹配的逻辑一致：多个路由匹配时取注册顺序最后的一个。
+    """
+
+    def __init__(self, app: FastAPI):
+        self.route_count = len(app.routes)
+        self.static: dict[tuple[str, str], tuple[int, str, str]] = {}  # (方法, 路径) -> (顺序, 模块, 描述)
+        self.dynamic: list[tuple[int, re.Pattern, set, str, str]] = []  # 按注册顺序倒序
+        for order, route in enumerate(app.routes):
+            if not isinstance(route, APIRoute):
+                continue
+            module = ",".join(route.tags)
+            if route.param_convertors:
+                self.dynamic.append((order, route.path_regex, route.methods, module, route.summary))
+            else:
+                for method in route.methods:
+                    self.static[(method, route.path)] = (order, module, route.summary)
+        self.dynamic.reverse()
+
+    def resolve(self, method: str, path: str) -> Optional[tuple[str, str]]:
+        """
+        查找请求对应的 (模块, 接口描述)，未匹配到路由时返回 None
+        """
+        found = self.static.get((method, path))
+        for order, path_regex, methods, module, summary in self.dynamic:
+            if found is not None and order < found[0]:
+                break
+            if method in methods and path_regex.match(path):
+                found = (order, module, summary)
+                break
+        return (found[1], found[2]) if found else None
+
+
+class AuditLogWriter:
+    """
+    审计日志批量写入器。
+    请求线程只把日志数据放入有界内存缓冲区，由后台任务按数量或时间触发 bulk_create 批量写入。
+    缓冲区满时丢弃新日志并计数。
+    """
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        """
+        参数:
+            max_size (int): 缓冲区最大日志条数
+            batch_size (int): 达到该条数时立即触发写入，同时也是单次 bulk_create 的批大小
+            flush_interval (float): 定时写入间隔（秒）
+        """
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[dict] = []
+        self._event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # 统计指标
+        self.enqueued = 0  # 入队条数
+        self.written = 0  # 已写入条数
+        self.dropped = 0  # 缓冲区满丢弃的条数
+        self.failed = 0  # 写入失败的条数
+        self.flushes = 0  # 写入次数
+        self.max_depth = 0  # 缓冲区历史最大深度
+        self._reported_dropped = 0
+
+    def start(self):
+        """启动后台写入任务"""
+        if self._task is None or self._task.done():
+            self._event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台写入任务，并写入剩余日志"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def enqueue(self, data: dict) -> bool:
+        """
+        将一条日志放入缓冲区，不等待数据库。
+        返回:
+            bool: 缓冲区已满被丢弃时返回 False
+        """
+        if self._task is None or self._task.done():
+            self.start()
+        if len(self._buffer) >= self.max_size:
+            self.dropped += 1
+            return False
+        self._buffer.append(data)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._buffer))
+        if len(self._buffer) >= self.batch_size:
+            self._event.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+            # 停止时不中断正在进行的写入
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """将缓冲区中的日志批量写入数据库"""
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        try:
+            await AuditLog.bulk_create([AuditLog(**data) for data in records], batch_size=self.batch_size)
+            self.written += len(records)
+        except Exception as e:
+            self.failed += len(records)
+            logger.error(f"审计日志批量写入失败，丢弃 {len(records)} 条: {repr(e)}")
+        self.flushes += 1
+        if self.dropped > self._reported_dropped:
+            logger.warning(
+                f"审计日志缓冲区已满，新丢弃 {self.dropped - self._reported_dropped} 条，累计丢弃 {self.dropped} 条"
+            )
+            self._reported_dropped = self.dropped
+
+    def stats(self) -> dict:
+        """返回写入器统计指标"""
+        return {
+            "buffered": len(self._buffer),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "max_depth": self.max_depth,
+        }
+
+
+# 全局审计日志写入器
+audit_log_writer = AuditLogWriter(
+    max_size=settings.AUDIT_LOG_BUFFER_SIZE,
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+)
@@ -0,0 +1,362 @@
+import asyncio  # 异步任务
+import gzip  # 归档文件压缩
+import json  # 归档文件按行写入 JSON
+import os
+import re  # 分区表名解析
+from datetime import datetime, timedelta
+from typing import Optional
+
+from tortoise import connections, timezone
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction  # 数据库事务
+
+from app.log import logger  # 日志记录器
+from app.models.admin import AuditLog, AuditLogRollup, SystemConfig  # 数据库模型
+from app.settings.config import settings  # 配置文件
+
+ROLLUP_CHECKPOINT_KEY = "audit_log_rollup_checkpoint"  # 已统计的最大日志 ID，存放在 system_config 表
+PARTITION_PREFIX = "audit_log_p"  # 分区表名前缀，后接 YYYYMM 或 YYYYMMDD
+_PARTITION_NAME = re.compile(r"^audit_log_p(\d{8}|\d{6})$")
+_ARCHIVE_PAGE_SIZE = 5000  # 归档时每次读取的行数
+
+
+class _CheckpointMoved(Exception):
+    """统计进度已被其他进程推进"""
+
+
+def period_start(dt: datetime, partition: str) -> datetime:
+    """dt 所在分区周期的起点"""
+    if partition == "day":
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period(start: datetime, partition: str) -> datetime:
+    """下一个分区周期的起点"""
+    if partition == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: datetime, partition: str) -> str:
+    """分区周期对应的表名"""
+    return PARTITION_PREFIX + start.strftime("%Y%m%d" if partition == "day" else "%Y%m")
+
+
+def _parse_partition(name: str) -> Optional[tuple[datetime, datetime]]:
+    """解析分区表名，返回 (周期起点, 周期终点)，不是分区表时返回 None"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    digits = match.group(1)
+    partition = "day" if len(digits) == 8 else "month"
+    start = datetime.strptime(digits, "%Y%m%d" if partition == "day" else "%Y%m")
+    return start, next_period(start, partition)
+
+
+def _now() -> datetime:
+    """与数据库中 created_at 一致的当前时间（use_tz 关闭时为本地时区的无时区时间）"""
+    return timezone.now().replace(tzinfo=None)
+
+
+def _naive(dt: datetime) -> datetime:
+    """数据库读出的时间转为与 _now() 一致的无时区本地时间（SQLite 可能以带 +08:00 的文本存储）"""
+    return timezone.make_naive(dt) if timezone.is_aware(dt) else dt
+
+
+def _literal(dt: datetime) -> str:
+    """内部生成的整点时间转换为 SQL 字面量"""
+    return dt.strftime("'%Y-%m-%d %H:%M:%S'")
+
+
+class AuditLogMaintainer:
+    """
+    审计日志存储维护任务，按固定间隔在后台依次执行：
+    1. 统计：把新增日志按 (小时, 模块, 状态码) 聚合到 audit_log_rollup，统计进度（已统计的最大 ID）记录在
+       system_config，多个进程同时执行时只有一个能推进进度，不会重复计数。多个工作进程批量写入时，
+       ID 较小的日志可能晚于 ID 较大的日志提交，因此只统计 created_at 早于 rollup_lag 秒的连续日志，
+       保证进度越过的 ID 都已提交
+    2. 分区：partition 为 day/month 时，主表只保留最近 hot_periods 个周期的日志，
+       更早且已统计的日志按周期移入 audit_log_pYYYYMM(DD) 分区表。/auditlog/list 只查询主表，
+       移入分区表的日志不再出现在列表中，只计入 /auditlog/rollup 的统计
+    3. 归档：超过保留天数的分区表和主表中的日志写入 gzip 压缩的 JSON Lines 文件后删除
+    """
+
+    def __init__(self, partition: str = "none", hot_periods: int = 2, retention_days: int = 180,
+                 archive_dir: str = "", interval: float = 300, batch_size: int = 5000, slow_ms: int = 1000,
+                 rollup_lag: float = 60):
+        """
+        参数:
+            partition (str): 分区方式，none / day / month
+            hot_periods (int): 主表保留最近的分区周期数
+            retention_days (int): 日志保留天数，0 表示永久保留
+            archive_dir (str): 归档文件目录
+            interval (float): 执行间隔（秒），0 表示不启动后台任务
+            batch_size (int): 统计时每批读取的日志条数
+            slow_ms (int): 慢请求阈值（毫秒）
+            rollup_lag (float): 统计的安全延迟（秒），只统计早于该时间的日志
+        """
+        if partition not in ("none", "day", "month"):
+            raise ValueError(f"不支持的审计日志分区方式: {partition}")
+        self.partition = partition
+        self.hot_periods = max(1, hot_periods)
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.slow_ms = slow_ms
+        self.rollup_lag = rollup_lag
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台维护任务"""
+        if self.interval and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台维护任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # 停止时不中断正在进行的维护，避免归档文件写完但数据未删除
+                await asyncio.shield(self.run_once())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"审计日志维护任务失败: {repr(e)}")
+
+    async def run_once(self):
+        """依次执行统计、分区、归档"""
+        await self.rollup()
+        if self.partition != "none":
+            await self.rotate()
+        if self.retention_days:
+            await self.archive_expired()
+
+    async def _get_checkpoint(self) -> int:
+        config, _ = await SystemConfig.get_or_create(key=ROLLUP_CHECKPOINT_KEY, defaults={"value": "0"})
+        return int(config.value)
+
+    async def rollup(self) -> int:
+        """
+        统计新增日志。
+        返回:
+            int: 本次统计的日志条数
+        """
+        try:
+            checkpoint = await self._get_checkpoint()
+        except IntegrityError:  # 其他进程同时创建了进度记录
+            checkpoint = await self._get_checkpoint()
+        processed = 0
+        cutoff = _now() - timedelta(seconds=self.rollup_lag)
+        while True:
+            rows = await AuditLog.filter(id__gt=checkpoint).order_by("id").limit(self.batch_size).values_list(
+                "id", "created_at", "module", "status", "response_time"
+            )
+            # 在第一条过新的日志处截断：它之前可能还有未提交的较小 ID，进度不能越过
+            for index, row in enumerate(rows):
+                if _naive(row[1]) >= cutoff:
+                    rows = rows[:index]
+                    break
+            if not rows:
+                break
+            stats: dict[tuple, list[int]] = {}  # (时段, 模块, 状态码) -> [请求数, 响应时间总和, 最大响应时间, 慢请求数]
+            for _, created_at, module, status, response_time in rows:
+                bucket = _naive(created_at).replace(minute=0, second=0, microsecond=0)
+                item = stats.setdefault((bucket, module, status), [0, 0, 0, 0])
+                item[0] += 1
+                item[1] += response_time
+                item[2] = max(item[2], response_time)
+                item[3] += response_time >= self.slow_ms
+            new_checkpoint = rows[-1][0]
+            try:
+                await self._save_rollups(checkpoint, new_checkpoint, stats)
+            except _CheckpointMoved:
+                logger.info("审计日志统计进度已被其他进程推进，跳过本次统计")
+                break
+            checkpoint = new_checkpoint
+            processed += len(rows)
+        return processed
+
+    async def _save_rollups(self, checkpoint: int, new_checkpoint: int, stats: dict[tuple, list[int]]):
+        async with in_transaction():
+            # 先以比较并交换的方式推进进度，失败说明这批日志已被其他进程统计
+            updated = await SystemConfig.filter(key=ROLLUP_CHECKPOINT_KEY, value=str(checkpoint)).update(
+                value=str(new_checkpoint)
+            )
+            if not updated:
+                raise _CheckpointMoved()
+            # 按时段范围查询再在内存中按规范化的时段匹配：SQLite 中时段可能以带时区后缀的文本存储，
+            # 用无时区的值做等值 / IN 查询匹配不到，会导致重复插入
+            buckets = [key[0] for key in stats]
+            existing = {
+                (_naive(rollup.bucket), rollup.module, rollup.status): rollup
+                for rollup in await AuditLogRollup.filter(
+                    bucket__gte=min(buckets), bucket__lt=max(buckets) + timedelta(hours=1)
+                )
+            }
+            to_create, to_update = [], []
+            for key, (count, total, maximum, slow) in stats.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    to_create.append(AuditLogRollup(
+                        bucket=key[0], module=key[1], status=key[2], count=count,
+                        total_response_time=total, max_response_time=maximum, slow_count=slow,
+                    ))
+                    continue
+                rollup.count += count
+                rollup.total_response_time += total
+                rollup.max_response_time = max(rollup.max_response_time, maximum)
+                rollup.slow_count += slow
+                to_update.append(rollup)
+            if to_create:
+                await AuditLogRollup.bulk_create(to_create)
+            if to_update:
+                await AuditLogRollup.bulk_update(
+                    to_update, fields=["count", "total_response_time", "max_response_time", "slow_count"]
+                )
+
+    def _quote(self, name: str) -> str:
+        quote = "`" if connections.get("default").capabilities.dialect == "mysql" else '"'
+        return f"{quote}{name}{quote}"
+
+    async def list_partitions(self) -> list[str]:
+        """列出数据库中已有的分区表名，按周期排序"""
+        conn = connections.get("default")
+        dialect = conn.capabilities.dialect
+        if dialect == "sqlite":
+            sql = "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'audit_log_p%'"
+        elif dialect == "mysql":
+            sql = ("SELECT table_name AS name FROM information_schema.tables "
+                   "WHERE table_schema = DATABASE() AND table_name LIKE 'audit_log_p%'")
+        else:
+            sql = "SELECT tablename AS name FROM pg_tables WHERE tablename LIKE 'audit_log_p%'"
+        rows = await conn.execute_query_dict(sql)
+        return sorted(row["name"] for row in rows if _parse_partition(row["name"]))
+
+    async def _create_partition(self, name: str):
+        conn = connections.get("default")
+        dialect = conn.capabilities.dialect
+        table, source = self._quote(name), self._quote(AuditLog._meta.db_table)
+        if dialect == "mysql":
+            await conn.execute_script(f"CREATE TABLE IF NOT EXISTS {table} LIKE {source}")
+        elif dialect == "sqlite":
+            await conn.execute_script(
+                f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {source} WHERE 0;"
+                f"CREATE INDEX IF NOT EXISTS {self._quote('idx_' + name + '_created_at')} ON {table} (created_at)"
+            )
+        else:
+            await conn.execute_script(f"CREATE TABLE IF NOT EXISTS {table} (LIKE {source} INCLUDING ALL)")
+
+    async def rotate(self) -> int:
+        """
+        把主表中早于最近 hot_periods 个周期且已统计的日志按周期移入分区表。
+        返回:
+            int: 移动的日志条数
+        """
+        boundary = period_start(_now(), self.partition)
+        for _ in range(self.hot_periods - 1):
+            boundary = period_start(boundary - timedelta(days=1), self.partition)
+        checkpoint = await self._get_checkpoint()
+        moved = 0
+        while True:
+            oldest = await AuditLog.filter(created_at__lt=boundary, id__lte=checkpoint).order_by("created_at").first()
+            if oldest is None:
+                break
+            start = period_start(oldest.created_at.replace(tzinfo=None), self.partition)
+            end = next_period(start, self.partition)
+            name = partition_name(start, self.partition)
+            await self._create_partition(name)  # MySQL 的 DDL 会隐式提交，放在事务之外
+            async with in_transaction() as conn:
+                await conn.execute_query(
+                    f"INSERT INTO {self._quote(name)} SELECT * FROM {self._quote(AuditLog._meta.db_table)} "
+                    f"WHERE created_at >= {_literal(start)} AND created_at < {_literal(end)} "
+                    f"AND id <= {int(checkpoint)}"
+                )
+                count = await AuditLog.filter(created_at__gte=start, created_at__lt=end, id__lte=checkpoint).delete()
+            moved += count
+            logger.info(f"审计日志分区: {count} 条日志移入 {name}")
+        return moved
+
+    async def _archive_query(self, file_name: str, table: str, where: str = "1 = 1") -> int:
+        """按 ID 分页读取日志写入压缩归档文件，先写临时文件，写完后改名，不覆盖已有的归档文件"""
+        conn = connections.get("default")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        base = file_name[:-len(".jsonl.gz")]
+        path, n = os.path.join(self.archive_dir, file_name), 1
+        while os.path.exists(path):
+            path = os.path.join(self.archive_dir, f"{base}.{n}.jsonl.gz")
+            n += 1
+        tmp_path = f"{path}.tmp"
+        last_id, count = 0, 0
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            while True:
+                rows = await conn.execute_query_dict(
+                    f"SELECT * FROM {self._quote(table)} WHERE {where} AND id > {last_id} "
+                    f"ORDER BY id LIMIT {_ARCHIVE_PAGE_SIZE}"
+                )
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                count += len(rows)
+                if len(rows) < _ARCHIVE_PAGE_SIZE:
+                    break
+                last_id = rows[-1]["id"]
+        os.replace(tmp_path, path)
+        return count
+
+    async def archive_expired(self) -> int:
+        """
+        归档超过保留天数的日志：整个周期都已过期的分区表归档后删除，
+        主表中过期且已统计的日志按天归档后删除。
+        返回:
+            int: 归档的日志条数
+        """
+        cutoff = period_start(_now() - timedelta(days=self.retention_days), "day")
+        archived = 0
+        for name in await self.list_partitions():
+            _, end = _parse_partition(name)
+            if end > cutoff:
+                continue
+            count = await self._archive_query(f"{name}.jsonl.gz", name)
+            await connections.get("default").execute_script(f"DROP TABLE {self._quote(name)}")
+            archived += count
+            logger.info(f"审计日志归档: 分区 {name} 的 {count} 条日志已归档")
+
+        checkpoint = await self._get_checkpoint()
+        while True:
+            oldest = await AuditLog.filter(created_at__lt=cutoff, id__lte=checkpoint).order_by("created_at").first()
+            if oldest is None:
+                break
+            start = period_start(oldest.created_at.replace(tzinfo=None), "day")
+            end = next_period(start, "day")
+            count = await self._archive_query(
+                f"{AuditLog._meta.db_table}_{start.strftime('%Y%m%d')}.jsonl.gz",
+                AuditLog._meta.db_table,
+                f"created_at >= {_literal(start)} AND created_at < {_literal(end)} AND id <= {int(checkpoint)}",
+            )
+            await AuditLog.filter(created_at__gte=start, created_at__lt=end, id__lte=checkpoint).delete()
+            archived += count
+            logger.info(f"审计日志归档: {start:%Y-%m-%d} 的 {count} 条日志已归档")
+        return archived
+
+
+# 全局审计日志维护任务
+audit_log_maintainer = AuditLogMaintainer(
+    partition=settings.AUDIT_LOG_PARTITION,
+    hot_periods=settings.AUDIT_LOG_HOT_PERIODS,
+    retention_days=settings.AUDIT_LOG_RETENTION_DAYS,
+    archive_dir=settings.AUDIT_LOG_ARCHIVE_DIR,
+    interval=settings.AUDIT_LOG_MAINTENANCE_INTERVAL,
+    batch_size=settings.AUDIT_LOG_ROLLUP_BATCH_SIZE,
+    slow_ms=settings.AUDIT_LOG_SLOW_MS,
+    rollup_lag=settings.AUDIT_LOG_ROLLUP_LAG,
+)
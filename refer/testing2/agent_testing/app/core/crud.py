@@ -1,9 +1,16 @@
-from typing import Any, Dict, Generic, List, NewType, Tuple, Type, TypeVar, Union
+import base64  # 游标编码
+import json  # 游标编码
+import time  # 用于计算总数缓存的过期时间
+from datetime import datetime  # 游标中的时间字段
+from typing import Any, Dict, Generic, List, NewType, Optional, Tuple, Type, TypeVar, Union
 
+from fastapi.exceptions import HTTPException  # FastAPI 的异常类
 from pydantic import BaseModel  # Pydantic 的数据验证模型
 from tortoise.expressions import Q  # Tortoise ORM 的查询条件构造工具
 from tortoise.models import Model  # Tortoise ORM 的模型基类
 
+from app.settings.config import settings  # 配置文件
+
 
 # 定义类型别名
 Total = NewType("Total", int)  # 总数类型
@@ -11,6 +18,31 @@ ModelType = TypeVar("ModelType", bound=Model)  # 数据库模型类型
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)  # 创建时的 Pydantic 模型类型
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)  # 更新时的 Pydantic 模型类型
 
+Cursor = NewType("Cursor", str)  # 游标类型
+
+# 总数缓存：(模型, 查询条件) -> (过期时间, 总数)
+_count_cache: Dict[tuple, Tuple[float, int]] = {}
+_COUNT_CACHE_MAX_ENTRIES = 1024  # 缓存条目上限，超出时整体清空
+
+
+def _q_key(q: Q) -> tuple:
+    """
+    将查询条件转换为可哈希的键，用于缓存总数。
+    """
+    return (
+        q.join_type,
+        q._is_negated,
+        tuple(sorted((key, repr(value)) for key, value in q.filters.items())),
+        tuple(_q_key(child) for child in q.children),
+    )
+
+
+def _split_order(order_field: str) -> Tuple[str, bool]:
+    """
+    将 "-created_at" 形式的排序字段拆分为 (字段名, 是否倒序)
+    """
+    return (order_field[1:], True) if order_field.startswith("-") else (order_field, False)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
@@ -35,12 +67,48 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         return await self.model.get(id=id)  # 使用 Tortoise ORM 的 get 方法查询对象
 
+    async def get_dicts_by_ids(self, ids) -> Dict[int, dict]:
+        """
+        用一次 id__in 查询批量获取对象并序列化，供列表接口在内存中关联外键。
+        参数:
+            ids: 主键 ID 集合，None 会被忽略
+        返回:
+            Dict[int, dict]: {ID: 对象字典}
+        """
+        ids = {id for id in ids if id is not None}  # 去重并去掉空值
+        if not ids:
+            return {}
+        objs = await self.model.filter(id__in=ids)  # 一次查询取出全部对象
+        return {d["id"]: d for d in await self.model.bulk_to_dict(objs)}
+
+    async def count(self, search: Q = Q(), count_ttl: Optional[float] = None) -> Total:
+        """
+        统计符合条件的记录数。
+        参数:
+            search (Q): 查询条件，默认为空
+            count_ttl (float): 总数缓存有效期（秒），None 或 0 时每次都执行 count 查询
+        返回:
+            Total: 总记录数，启用缓存时最多滞后 count_ttl 秒
+        """
+        if not count_ttl:
+            return Total(await self.model.filter(search).count())
+        key = (self.model.__name__, _q_key(search))
+        entry = _count_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return Total(entry[1])
+        total = await self.model.filter(search).count()
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (time.monotonic() + count_ttl, total)
+        return Total(total)
+
     async def list(
         self,
         page: int = 1,
         page_size: int = 10,
         search: Q = Q(),  # 默认空查询条件
         order: list = [],  # 默认无排序
+        count_ttl: Optional[float] = None,  # 默认每次都统计总数
     ) -> Tuple[Total, List[ModelType]]:
         """
         分页查询对象列表。
@@ -49,14 +117,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             page_size (int): 每页大小
             search (Q): 查询条件，默认为空
             order (list): 排序字段，默认无排序
+            count_ttl (float): 总数缓存有效期（秒），见 count
         返回:
             Tuple[Total, List[ModelType]]: (总记录数, 查询结果列表)
         """
-        print(type(self.model))  # 应该输出 <class 'tortoise.models.Model'>
         query = self.model.filter(search)  # 构造查询条件
-        total = await query.count()  # 计算总记录数
+        total = await self.count(search, count_ttl=count_ttl)  # 计算总记录数
         results = await query.offset((page - 1) * page_size).limit(page_size).order_by(*order)  # 分页查询
-        return Total(total), results  # 返回总数和结果列表
+        return total, results  # 返回总数和结果列表
 
     async def list_limit(
             self,
@@ -64,7 +132,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             page_size: int = 10,
             search: Q = Q(),  # 默认空查询条件
             order: list = [],  # 默认无排序
-            limit: int = 100
+            limit: int = 100,
+            count_ttl: Optional[float] = None,  # 默认每次都统计总数
     ) -> Tuple[Total, List[ModelType]]:
         """
         分页查询对象列表。
@@ -73,14 +142,85 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             page_size (int): 每页大小
             search (Q): 查询条件，默认为空
             order (list): 排序字段，默认无排序
+            count_ttl (float): 总数缓存有效期（秒），见 count
         返回:
             Tuple[Total, List[ModelType]]: (总记录数, 查询结果列表)
         """
-        print(type(self.model))  # 应该输出 <class 'tortoise.models.Model'>
         query = self.model.filter(search)  # 构造查询条件
-        total = await query.count()  # 计算总记录数
+        total = await self.count(search, count_ttl=count_ttl)  # 计算总记录数
         results = await query.offset((page - 1) * page_size).limit(page_size).order_by(*order).limit(limit)  # 分页查询
-        return Total(total), results  # 返回总数和结果列表
+        return total, results  # 返回总数和结果列表
+
+    def encode_cursor(self, obj: ModelType, order_field: str = "-id") -> Cursor:
+        """
+        根据一页的最后一个对象生成下一页的游标，游标对调用方不透明。
+        参数:
+            obj (ModelType): 当前页最后一个对象
+            order_field (str): 排序字段，与 list_keyset 一致
+        返回:
+            Cursor: 游标字符串
+        """
+        field, _ = _split_order(order_field)
+        value = getattr(obj, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([order_field, value, obj.id], ensure_ascii=False, separators=(",", ":"))
+        return Cursor(base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("="))
+
+    def decode_cursor(self, cursor: str, order_field: str = "-id") -> Tuple[Any, int]:
+        """
+        解析游标，返回 (排序字段值, ID)。游标无效或与排序字段不一致时抛出 400 异常。
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_order, value, id = json.loads(raw)
+            if cursor_order != order_field:
+                raise ValueError(cursor_order)
+            field, _ = _split_order(order_field)
+            if isinstance(value, str) and self.model._meta.fields_map[field].field_type is datetime:
+                value = datetime.fromisoformat(value)
+            return value, int(id)
+        except (ValueError, TypeError, KeyError):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+
+    async def list_keyset(
+        self,
+        page_size: int = 10,
+        search: Q = Q(),  # 默认空查询条件
+        order_field: str = "-id",  # 默认按 ID 倒序
+        cursor: Optional[str] = None,  # 默认从第一页开始
+        count_ttl: Optional[float] = settings.LIST_COUNT_CACHE_TTL,
+    ) -> Tuple[Total, List[ModelType], Optional[Cursor]]:
+        """
+        基于游标（keyset）的分页查询，按 (order_field, id) 定位上一页的末尾，
+        不使用 OFFSET，页面深度不影响查询耗时。order_field 应为带索引的字段，如 id、created_at。
+        参数:
+            page_size (int): 每页大小
+            search (Q): 查询条件，默认为空
+            order_field (str): 排序字段，"-" 前缀表示倒序，相同值按 id 同方向排序
+            cursor (str): 上一页返回的游标，为空时查询第一页
+            count_ttl (float): 总数缓存有效期（秒），见 count
+        返回:
+            Tuple[Total, List[ModelType], Optional[Cursor]]: (总记录数, 查询结果列表, 下一页游标)，
+            没有下一页时游标为 None
+        """
+        field, desc = _split_order(order_field)
+        query = self.model.filter(search)  # 构造查询条件
+        if cursor:
+            value, id = self.decode_cursor(cursor, order_field)
+            op = "lt" if desc else "gt"
+            if field == "id":
+                query = query.filter(**{f"id__{op}": id})
+            else:
+                query = query.filter(Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": id}))
+        order = [order_field] if field == "id" else [order_field, "-id" if desc else "id"]
+        results = await query.order_by(*order).limit(page_size + 1)  # 多取一条判断是否还有下一页
+        next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            next_cursor = self.encode_cursor(results[-1], order_field)
+        total = await self.count(search, count_ttl=count_ttl)  # 计算总记录数
+        return total, results, next_cursor
 
     async def create(self, obj_in: CreateSchemaType) -> ModelType:
         """
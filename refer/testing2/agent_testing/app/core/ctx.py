@@ -11,6 +11,14 @@ CTX_USER_ID 是一个上下文变量，用于存储当前用户的 ID。
 - 默认值: 0（表示未登录或匿名用户）
 """
 
+# 定义上下文变量 CTX_USERNAME，用于存储当前用户的用户名
+CTX_USERNAME: contextvars.ContextVar[str] = contextvars.ContextVar("username", default="")
+"""
+CTX_USERNAME 是一个上下文变量，用于存储当前用户的用户名，由认证依赖设置，审计日志直接读取。
+- 类型: str
+- 默认值: ""（表示未登录或匿名用户）
+"""
+
 # 定义上下文变量 CTX_BG_TASKS，用于存储当前请求的后台任务实例
 CTX_BG_TASKS: contextvars.ContextVar[BackgroundTasks] = contextvars.ContextVar("bg_task", default=None)
 """
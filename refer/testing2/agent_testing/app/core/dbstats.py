@@ -0,0 +1,103 @@
+import asyncio  # 异步任务
+from typing import Optional
+
+from tortoise import connections
+
+from app.log import logger  # 日志记录器
+from app.settings.config import settings  # 配置文件
+
+
+def pool_stats(connection_name: str = "default") -> dict:
+    """
+    读取数据库连接池当前的使用情况。
+    SQLite 只有一个连接，所有查询串行执行，in_use 表示该连接是否正被占用。
+    返回:
+        dict: engine、size（已建立连接数）、idle、in_use、min_size、max_size、saturation（in_use / max_size）
+    """
+    conn = connections.get(connection_name)
+    dialect = conn.capabilities.dialect
+    stats = {"engine": dialect}
+    if dialect == "sqlite":
+        lock = getattr(conn, "_lock", None)
+        in_use = int(bool(lock is not None and lock.locked()))
+        stats.update(size=1, idle=1 - in_use, in_use=in_use, min_size=1, max_size=1)
+    else:
+        pool = getattr(conn, "_pool", None)
+        if pool is None:  # 尚未建立连接池
+            stats.update(size=0, idle=0, in_use=0, min_size=0, max_size=0, saturation=0.0)
+            return stats
+        if dialect == "mysql":  # asyncmy 连接池
+            size, idle, min_size, max_size = pool.size, pool.freesize, pool.minsize, pool.maxsize
+        else:  # asyncpg 连接池
+            size, idle = pool.get_size(), pool.get_idle_size()
+            min_size, max_size = pool.get_min_size(), pool.get_max_size()
+        stats.update(size=size, idle=idle, in_use=size - idle, min_size=min_size, max_size=max_size)
+    stats["saturation"] = round(stats["in_use"] / stats["max_size"], 3) if stats["max_size"] else 0.0
+    return stats
+
+
+class PoolMonitor:
+    """
+    定时采样连接池使用情况，记录峰值和饱和（所有连接都被占用）的采样次数。
+    连接池持续饱和说明 DB_POOL_MAX_SIZE 偏小或存在慢查询，请求会排队等待连接。
+    """
+
+    def __init__(self, interval: float = 5):
+        """
+        参数:
+            interval (float): 采样间隔（秒），0 表示不采样
+        """
+        self.interval = interval
+        self.samples = 0  # 采样次数
+        self.saturated_samples = 0  # 连接池饱和的采样次数
+        self.peak_in_use = 0  # 使用中连接数的峰值
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台采样任务"""
+        if self.interval and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台采样任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def sample(self) -> dict:
+        """采样一次并更新统计"""
+        stats = pool_stats()
+        self.samples += 1
+        self.peak_in_use = max(self.peak_in_use, stats["in_use"])
+        if stats["max_size"] and stats["in_use"] >= stats["max_size"]:
+            self.saturated_samples += 1
+            # SQLite 只有一个连接，被占用是常态，不告警
+            if stats["engine"] != "sqlite":
+                logger.warning(f"数据库连接池已饱和: {stats}")
+        return stats
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"数据库连接池采样失败: {repr(e)}")
+
+    def stats(self) -> dict:
+        """返回当前连接池状态和采样统计"""
+        return {
+            **pool_stats(),
+            "samples": self.samples,
+            "saturated_samples": self.saturated_samples,
+            "saturated_ratio": round(self.saturated_samples / self.samples, 3) if self.samples else 0.0,
+            "peak_in_use": self.peak_in_use,
+        }
+
+
+# 全局连接池监控
+pool_monitor = PoolMonitor(interval=settings.DB_POOL_MONITOR_INTERVAL)
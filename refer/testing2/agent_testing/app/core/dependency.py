@@ -3,8 +3,9 @@ from typing import Optional
 import jwt  # 用于解析 JWT Token
 from fastapi import Depends, Header, HTTPException, Request  # FastAPI 相关模块
 
-from app.core.ctx import CTX_USER_ID  # 上下文变量，存储当前用户 ID
-from app.models import Role, User  # 数据库模型
+from app.core.ctx import CTX_USER_ID, CTX_USERNAME  # 上下文变量，存储当前用户 ID 和用户名
+from app.core.permission import permission_cache  # 权限缓存
+from app.models import User  # 数据库模型
 from app.settings import settings  # 配置文件
 
 
@@ -29,10 +30,11 @@ class AuthControl:
             else:  # 正常模式下解析 JWT Token
                 decode_data = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.JWT_ALGORITHM)
                 user_id = decode_data.get("user_id")  # 从解码数据中提取用户 ID
-            user = await User.filter(id=user_id).first()  # 查询用户
+            user = await permission_cache.get_user(user_id)  # 查询用户（带缓存）
             if not user:  # 如果用户不存在
                 raise HTTPException(status_code=401, detail="Authentication failed")
             CTX_USER_ID.set(int(user_id))  # 将用户 ID 设置到上下文中
+            CTX_USERNAME.set(user.username)  # 将用户名设置到上下文中，供审计日志使用
             return user  # 返回用户对象
         except jwt.DecodeError:  # Token 解码错误
             raise HTTPException(status_code=401, detail="无效的Token")
@@ -63,12 +65,9 @@ class PermissionControl:
             return
         method = request.method  # 获取请求方法（如 GET、POST 等）
         path = request.url.path  # 获取请求路径
-        roles: list[Role] = await current_user.roles  # 获取用户的角色列表
-        if not roles:  # 如果用户没有绑定角色
+        if not await permission_cache.get_role_ids(current_user.id):  # 如果用户没有绑定角色
             raise HTTPException(status_code=403, detail="The user is not bound to a role")
-        apis = [await role.apis for role in roles]  # 获取角色对应的 API 权限列表
-        permission_apis = list(set((api.method, api.path) for api in sum(apis, [])))  # 去重后的权限列表
-        if (method, path) not in permission_apis:  # 如果当前请求不在权限范围内
+        if not await permission_cache.has_permission(current_user.id, method, path):  # 如果当前请求不在权限范围内
             raise HTTPException(
                 status_code=403, detail=f"Permission denied method:{method} path:{path}"
             )
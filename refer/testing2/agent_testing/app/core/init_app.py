@@ -172,11 +172,9 @@ async def init_menus():
 async def init_apis():
     """
     初始化 API。
-    如果数据库中没有 API，则刷新 API 列表。
+    每次启动时同步 API 列表，路由表未变化时根据指纹直接跳过。
     """
-    apis = await api_controller.model.exists()  # 检查是否存在 API
-    if not apis:
-        await api_controller.refresh_api()
+    await api_controller.refresh_api()
 
 
 async def init_db():
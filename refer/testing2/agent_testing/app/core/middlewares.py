@@ -1,16 +1,14 @@
 import re  # 正则表达式模块，用于路径匹配
-from datetime import datetime  # 日期时间模块，用于计算请求处理时间
+import time  # 用于计算请求处理时间
+from datetime import datetime  # 日期时间模块，用于记录请求时间
 
 from fastapi import FastAPI  # FastAPI 框架
-from fastapi.responses import Response  # 响应对象
-from fastapi.routing import APIRoute  # 路由对象
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint  # Starlette 中间件基类
 from starlette.requests import Request  # 请求对象
-from starlette.types import ASGIApp, Receive, Scope, Send  # ASGI 相关类型定义
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # ASGI 相关类型定义
 
-from app.core.dependency import AuthControl  # 用户认证控制类
-from app.models.admin import AuditLog, User  # 数据库模型
+from .auditlog import RouteIndex, audit_log_writer  # 路由索引和审计日志批量写入器
 from .bgtask import BgTasks  # 后台任务管理工具
+from .ctx import CTX_USER_ID, CTX_USERNAME  # 上下文变量，由认证依赖设置
 
 
 class SimpleBaseMiddleware:
@@ -81,12 +79,14 @@ class BackGroundTaskMiddleware(SimpleBaseMiddleware):
         await BgTasks.execute_tasks()  # 执行所有后台任务
 
 
-class HttpAuditLogMiddleware(BaseHTTPMiddleware):
+class HttpAuditLogMiddleware:
     """
     HTTP 请求审计日志中间件。
+    模块和接口描述从启动后构建一次的路由索引中查找，用户信息直接读取认证依赖设置的上下文，
+    日志只放入内存缓冲区，由 audit_log_writer 在后台批量写入数据库。
     """
 
-    def __init__(self, app, methods: list, exclude_paths: list):
+    def __init__(self, app: ASGIApp, methods: list, exclude_paths: list):
         """
         初始化审计日志中间件。
         参数:
@@ -94,85 +94,67 @@ class HttpAuditLogMiddleware(BaseHTTPMiddleware):
             methods (list): 需要记录的日志请求方法
             exclude_paths (list): 不需要记录日志的路径
         """
-        super().__init__(app)
+        self.app = app
         self.methods = methods  # 需要记录日志的请求方法
-        self.exclude_paths = exclude_paths  # 不需要记录日志的路径
+        self.exclude_paths = [re.compile(path, re.I) for path in exclude_paths]  # 不需要记录日志的路径
+        self.route_index: RouteIndex | None = None  # 路由索引，首次请求时构建
+
+    def get_route_index(self, app: FastAPI) -> RouteIndex:
+        """
+        获取路由索引，路由数量发生变化（如运行中新增路由）时重新构建。
+        """
+        if self.route_index is None or self.route_index.route_count != len(app.routes):
+            self.route_index = RouteIndex(app)
+        return self.route_index
 
-    async def get_request_log(self, request: Request, response: Response) -> dict:
+    def get_request_log(self, scope: Scope, status: int, process_time: int) -> dict:
         """
-        根据请求和响应对象获取对应的日志记录数据。
+        根据请求和响应状态获取对应的日志记录数据。
         参数:
-            request (Request): 当前请求对象
-            response (Response): 当前响应对象
+            scope (Scope): 请求范围
+            status (int): 响应状态码
+            process_time (int): 请求处理时间（毫秒）
         返回:
             dict: 日志记录数据
         """
         data: dict = {
-            "path": request.url.path,  # 请求路径
-            "status": response.status_code,  # 响应状态码
-            "method": request.method,  # 请求方法
+            "path": scope["path"],  # 请求路径
+            "status": status,  # 响应状态码
+            "method": scope["method"],  # 请求方法
+            "response_time": process_time,  # 响应时间
+            "user_id": CTX_USER_ID.get(),  # 用户 ID，未登录为 0
+            "username": CTX_USERNAME.get(),  # 用户名，未登录为空
+            "created_at": datetime.now(),  # 请求时间，不使用批量写入时的时间
         }
 
         # 获取路由信息
-        app: FastAPI = request.app
-        for route in app.routes:
-            if (
-                isinstance(route, APIRoute)  # 确保是 API 路由
-                and route.path_regex.match(request.url.path)  # 匹配路径
-                and request.method in route.methods  # 匹配请求方法
-            ):
-                data["module"] = ",".join(route.tags)  # 获取模块标签
-                data["summary"] = route.summary  # 获取接口描述
-
-        # 获取用户信息
-        try:
-            token = request.headers.get("token")  # 获取 Token
-            user_obj: User = None
-            if token:
-                user_obj: User = await AuthControl.is_authed(token)  # 验证用户身份
-            data["user_id"] = user_obj.id if user_obj else 0  # 用户 ID
-            data["username"] = user_obj.username if user_obj else ""  # 用户名
-        except Exception as e:
-            data["user_id"] = 0  # 默认用户 ID
-            data["username"] = ""  # 默认用户名
-
+        route = self.get_route_index(scope["app"]).resolve(scope["method"], scope["path"])
+        if route:
+            data["module"], data["summary"] = route  # 模块标签和接口描述
         return data
 
-    async def before_request(self, request: Request):
-        """
-        在请求处理之前执行的逻辑。
-        """
-        pass
-
-    async def after_request(self, request: Request, response: Response, process_time: int):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        在请求处理之后记录日志。
+        中间件的调用方法，在响应开始时记录日志。
         参数:
-            request (Request): 当前请求对象
-            response (Response): 当前响应对象
-            process_time (int): 请求处理时间（毫秒）
+            scope (Scope): 请求范围
+            receive (Receive): 接收消息的函数
+            send (Send): 发送消息的函数
         """
-        if request.method in self.methods:  # 如果请求方法在记录范围内
-            for path in self.exclude_paths:
-                if re.search(path, request.url.path, re.I):  # 如果路径在排除范围内
-                    return
-            data: dict = await self.get_request_log(request=request, response=response)  # 获取日志数据
-            data["response_time"] = process_time  # 添加响应时间
-            await AuditLog.create(**data)  # 创建日志记录
+        if scope["type"] != "http" or scope["method"] not in self.methods or any(
+            path.search(scope["path"]) for path in self.exclude_paths
+        ):
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """
-        中间件的调度方法。
-        参数:
-            request (Request): 当前请求对象
-            call_next (RequestResponseEndpoint): 下一个中间件或应用的调用方法
-        返回:
-            Response: 响应对象
-        """
-        start_time: datetime = datetime.now()  # 记录请求开始时间
-        await self.before_request(request)  # 执行 before_request 方法
-        response = await call_next(request)  # 调用下一个中间件或应用
-        end_time: datetime = datetime.now()  # 记录请求结束时间
-        process_time = int((end_time.timestamp() - start_time.timestamp()) * 1000)  # 计算请求处理时间
-        await self.after_request(request, response, process_time)  # 执行 after_request 方法
-        return response
\ No newline at end of file
+        CTX_USER_ID.set(0)  # 同一连接上的多个请求不复用上一个请求的用户
+        CTX_USERNAME.set("")
+        start_time = time.perf_counter()  # 记录请求开始时间
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = int((time.perf_counter() - start_time) * 1000)  # 计算请求处理时间
+                audit_log_writer.enqueue(self.get_request_log(scope, message["status"], process_time))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
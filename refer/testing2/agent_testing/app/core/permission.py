@@ -0,0 +1,94 @@
+import time  # 用于计算缓存过期时间
+from typing import Optional
+
+from app.models.admin import Api, User  # 数据库模型
+from app.settings.config import settings  # 配置文件
+
+
+class PermissionCache:
+    """
+    RBAC 权限缓存。
+    - 用户对象及其角色 ID 按用户缓存
+    - 每个角色的 API 权限编译为 (method, path) 的 frozenset 按角色缓存
+    两类缓存都有 TTL，角色、用户、API 数据变更时由对应的控制器主动失效，
+    多进程部署时其他进程的缓存最迟在 TTL 后刷新。
+    """
+
+    def __init__(self, ttl: float = 60):
+        """
+        参数:
+            ttl (float): 缓存有效期（秒）
+        """
+        self.ttl = ttl
+        self._users: dict[int, tuple[float, User, tuple[int, ...]]] = {}  # 用户 ID -> (过期时间, 用户, 角色 ID)
+        self._roles: dict[int, tuple[float, frozenset]] = {}  # 角色 ID -> (过期时间, API 权限集合)
+
+    async def _load_user(self, user_id: int) -> Optional[tuple[float, User, tuple[int, ...]]]:
+        entry = self._users.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry
+        user = await User.filter(id=user_id).first()
+        if not user:
+            self._users.pop(user_id, None)
+            return None
+        role_ids = tuple(await user.roles.all().values_list("id", flat=True))
+        entry = (time.monotonic() + self.ttl, user, role_ids)
+        self._users[user_id] = entry
+        return entry
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """
+        获取用户对象，用户不存在时返回 None。
+        """
+        entry = await self._load_user(user_id)
+        return entry[1] if entry else None
+
+    async def get_role_ids(self, user_id: int) -> tuple[int, ...]:
+        """
+        获取用户绑定的角色 ID。
+        """
+        entry = await self._load_user(user_id)
+        return entry[2] if entry else ()
+
+    async def get_role_grants(self, role_id: int) -> frozenset:
+        """
+        获取角色的 API 权限集合，元素为 (method, path)。
+        """
+        entry = self._roles.get(role_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        rows = await Api.filter(role_apis__id=role_id).values_list("method", "path")
+        grants = frozenset((str(method), path) for method, path in rows)
+        self._roles[role_id] = (time.monotonic() + self.ttl, grants)
+        return grants
+
+    async def has_permission(self, user_id: int, method: str, path: str) -> bool:
+        """
+        检查用户的任一角色是否拥有 (method, path) 的权限。
+        """
+        for role_id in await self.get_role_ids(user_id):
+            if (method, path) in await self.get_role_grants(role_id):
+                return True
+        return False
+
+    def invalidate_user(self, user_id: Optional[int] = None):
+        """
+        使用户缓存失效，不传 user_id 时清空所有用户。
+        """
+        if user_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(user_id, None)
+
+    def invalidate_role(self, role_id: Optional[int] = None):
+        """
+        使角色权限缓存失效，不传 role_id 时清空所有角色。
+        """
+        if role_id is None:
+            self._roles.clear()
+        else:
+            self._roles.pop(role_id, None)
+
+
+# 全局权限缓存
+permission_cache = PermissionCache(ttl=settings.PERMISSION_CACHE_TTL)
@@ -0,0 +1,73 @@
+import time  # 用于计算缓存过期时间
+from typing import Awaitable, Callable, Hashable, Optional
+
+from app.settings.config import settings  # 配置文件
+
+
+def build_tree(rows: list[dict], root_id: int = 0) -> list[dict]:
+    """
+    根据 id / parent_id 构建树结构，时间复杂度 O(n)。
+    先按 parent_id 建立索引，再为每个节点挂上子节点列表，子节点保持 rows 中的顺序。
+    父节点不存在的节点不会出现在树中。
+    参数:
+        rows (list[dict]): 节点字典列表，需包含 id 和 parent_id 字段，会被原地添加 children 字段
+        root_id (int): 顶级节点的 parent_id
+    返回:
+        list[dict]: 顶级节点列表
+    """
+    children: dict[int, list[dict]] = {}  # parent_id -> 子节点列表
+    for row in rows:
+        children.setdefault(row["parent_id"], []).append(row)
+    for row in rows:
+        row["children"] = children.get(row["id"], [])
+    return children.get(root_id, [])
+
+
+class TreeCache:
+    """
+    序列化后的树结构缓存，键的第一个元素为树的类型（如 "menu"、"dept"）。
+    菜单、部门、角色数据变更时由对应的控制器按类型主动失效，
+    多进程部署时其他进程的缓存最迟在 TTL 后刷新。
+    缓存的树由多个请求共享，调用方不能修改。
+    """
+
+    def __init__(self, ttl: float = 60):
+        """
+        参数:
+            ttl (float): 缓存有效期（秒）
+        """
+        self.ttl = ttl
+        self._trees: dict[tuple, tuple[float, list[dict]]] = {}  # 键 -> (过期时间, 树)
+        self._version = 0  # 失效次数，用于丢弃失效前开始构建的结果
+
+    async def get(self, key: tuple, builder: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        """
+        获取缓存的树，未命中或已过期时调用 builder 构建并缓存。
+        参数:
+            key (tuple): 缓存键，第一个元素为树的类型
+            builder: 构建树的异步函数
+        """
+        entry = self._trees.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        version = self._version
+        tree = await builder()
+        # 构建期间发生过失效时不写入缓存，避免缓存旧数据
+        if self._version == version:
+            self._trees[key] = (time.monotonic() + self.ttl, tree)
+        return tree
+
+    def invalidate(self, kind: Optional[Hashable] = None):
+        """
+        使某一类型的树缓存失效，不传 kind 时清空所有缓存。
+        """
+        self._version += 1
+        if kind is None:
+            self._trees.clear()
+            return
+        for key in [key for key in self._trees if key[0] == kind]:
+            del self._trees[key]
+
+
+# 全局树结构缓存
+tree_cache = TreeCache(ttl=settings.TREE_CACHE_TTL)
@@ -99,18 +99,39 @@ class DeptClosure(BaseModel, TimestampMixin):
 class AuditLog(BaseModel, TimestampMixin):
     """
     审计日志模型，用于存储系统操作日志。
-    """
-    user_id = fields.IntField(description="用户ID", index=True)  # 用户 ID 字段，添加索引
-    username = fields.CharField(max_length=64, default="", description="用户名称", index=True)  # 用户名称字段，默认值为空字符串
-    module = fields.CharField(max_length=64, default="", description="功能模块", index=True)  # 功能模块字段，默认值为空字符串
-    summary = fields.CharField(max_length=128, default="", description="请求描述", index=True)  # 请求描述字段，默认值为空字符串
-    method = fields.CharField(max_length=10, default="", description="请求方法", index=True)  # 请求方法字段，默认值为空字符串
-    path = fields.CharField(max_length=255, default="", description="请求路径", index=True)  # 请求路径字段，默认值为空字符串
-    status = fields.IntField(default=-1, description="状态码", index=True)  # 状态码字段，默认值为 -1
-    response_time = fields.IntField(default=0, description="响应时间(单位ms)", index=True)  # 响应时间字段，默认值为 0
+    用户名、模块、描述按 icontains 模糊查询，无法使用 B 树索引，因此不单独建索引；
+    只保留与查询条件匹配的组合索引，减少每次写入需要维护的索引数量。
+    """
+    user_id = fields.IntField(description="用户ID")  # 用户 ID 字段
+    username = fields.CharField(max_length=64, default="", description="用户名称")  # 用户名称字段，默认值为空字符串
+    module = fields.CharField(max_length=64, default="", description="功能模块")  # 功能模块字段，默认值为空字符串
+    summary = fields.CharField(max_length=128, default="", description="请求描述")  # 请求描述字段，默认值为空字符串
+    method = fields.CharField(max_length=10, default="", description="请求方法")  # 请求方法字段，默认值为空字符串
+    path = fields.CharField(max_length=255, default="", description="请求路径")  # 请求路径字段，默认值为空字符串
+    status = fields.IntField(default=-1, description="状态码")  # 状态码字段，默认值为 -1
+    response_time = fields.IntField(default=0, description="响应时间(单位ms)")  # 响应时间字段，默认值为 0
 
     class Meta:
         table = "audit_log"  # 数据库表名为 "audit_log"
+        indexes = (("status", "created_at"), ("user_id", "created_at"))  # 状态码、用户与时间范围的组合查询
+
+
+class AuditLogRollup(BaseModel):
+    """
+    审计日志按小时、模块、状态码预聚合的统计，供统计看板查询，不扫描原始日志。
+    """
+    bucket = fields.DatetimeField(description="统计时段起点（整点）")  # 统计时段
+    module = fields.CharField(max_length=64, default="", description="功能模块")  # 功能模块
+    status = fields.IntField(default=-1, description="状态码")  # 状态码
+    count = fields.IntField(default=0, description="请求数")  # 请求数
+    total_response_time = fields.BigIntField(default=0, description="响应时间总和(单位ms)")  # 用于计算平均响应时间
+    max_response_time = fields.IntField(default=0, description="最大响应时间(单位ms)")  # 最大响应时间
+    slow_count = fields.IntField(default=0, description="慢请求数")  # 响应时间超过阈值的请求数
+
+    class Meta:
+        table = "audit_log_rollup"
+        unique_together = (("bucket", "module", "status"),)
+
 
 class Project(BaseModel, TimestampMixin):
     """
@@ -173,3 +194,32 @@ class TestCase(BaseModel, TimestampMixin):
 
     class Meta:
         table = "test_cases"
+
+
+class PerformanceReportFile(BaseModel, TimestampMixin):
+    """
+    性能报告文件模型，记录上传的性能报告元数据，多个工作进程共享。
+    """
+    file_id = fields.CharField(max_length=36, unique=True, description="文件ID")
+    filename = fields.CharField(max_length=255, description="原始文件名")
+    path = fields.CharField(max_length=500, description="存储路径")
+    size = fields.BigIntField(default=0, description="文件总大小(字节)")
+    received = fields.BigIntField(default=0, description="已接收大小(字节)")
+    sha256 = fields.CharField(max_length=64, null=True, description="文件SHA256")
+    status = fields.CharField(max_length=20, default="uploading", description="状态：uploading、uploaded")
+    writer = fields.CharField(max_length=36, null=True, description="正在写入数据块的请求令牌")
+    lease_until = fields.DatetimeField(null=True, description="写入租约到期时间，过期后其他请求可以接管")
+
+    class Meta:
+        table = "performance_report_file"
+
+
+class SystemConfig(BaseModel, TimestampMixin):
+    """
+    系统配置模型，以键值形式存储系统内部状态（如 API 路由表指纹）。
+    """
+    key = fields.CharField(max_length=64, unique=True, description="配置键", index=True)
+    value = fields.TextField(description="配置值")
+
+    class Meta:
+        table = "system_config"
@@ -70,10 +70,53 @@ class BaseModel(models.Model):
 
         return field, formatted_values  # 返回字段名和格式化后的值
 
+    @classmethod
+    async def bulk_to_dict(cls, objs: list, m2m: bool = False, exclude_fields: list[str] | None = None) -> list[dict]:
+        """
+        批量将模型对象转换为字典，结果与逐个调用 to_dict 一致。
+        字段列表只计算一次，多对多字段对整页对象各用一次查询预取，查询数与对象个数无关。
+
+        参数:
+            objs (list): 同一模型的对象列表。
+            m2m (bool): 是否包含多对多字段，默认为 False。
+            exclude_fields (list[str]): 需要排除的字段列表，默认为空。
+
+        返回:
+            list[dict]: 与 objs 顺序一致的字典列表。
+        """
+        exclude = set(exclude_fields or [])  # 转为集合加快查找
+        names = [field for field in cls._meta.db_fields if field not in exclude]  # 需要输出的字段
+        m2m_names = [field for field in cls._meta.m2m_fields if field not in exclude] if m2m else []
+        if objs and m2m_names:
+            await cls.fetch_for_list(objs, *m2m_names)  # 每个多对多字段一次查询，预取整页对象的关联数据
+        related_names = {  # 多对多关联模型需要输出的字段
+            field: [name for name in cls._meta.fields_map[field].related_model._meta.db_fields if name not in exclude]
+            for field in m2m_names
+        }
+
+        result = []  # 初始化结果列表
+        for obj in objs:
+            d = _row_to_dict(obj, names)
+            for field in m2m_names:
+                d[field] = [_row_to_dict(related, related_names[field]) for related in getattr(obj, field)]
+            result.append(d)
+        return result
+
     class Meta:
         abstract = True  # 声明这是一个抽象类，不能直接实例化
 
 
+def _row_to_dict(obj, names: list[str]) -> dict:
+    """
+    按给定字段列表读取对象的字段值，datetime 按配置格式化。
+    """
+    d = {}
+    for name in names:
+        value = getattr(obj, name)
+        d[name] = value.strftime(settings.DATETIME_FORMAT) if isinstance(value, datetime) else value
+    return d
+
+
 class UUIDModel:
     """
     UUID 模型类，提供一个唯一的 UUID 字段。
@@ -31,64 +31,126 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"  # JWT 签名算法
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # JWT Token 的过期时间，默认为 7 天
 
-    # 数据库配置（使用 Tortoise ORM）
-    TORTOISE_ORM: dict = {
-        "connections": {  # 数据库连接配置
-            "default": f"sqlite:///{os.path.join(BASE_DIR,  'db.sqlite3')}",
-            # SQLite 配置
-            # "sqlite": {
-            #     "engine": "tortoise.backends.sqlite",  # 使用 SQLite 引擎
-            #     "credentials": {"file_path": f"{BASE_DIR}/db.sqlite3"},  # SQLite 数据库文件路径
-            # },
-            # MySQL/MariaDB 配置（示例，未启用）
-            # Install with: tortoise-orm[asyncmy]
-            # "mysql": {
-            #     "engine": "tortoise.backends.mysql",  # 使用 MySQL 引擎
-            #     "credentials": {
-            #         "host": "localhost",  # 数据库主机地址
-            #         "port": 3306,  # 数据库端口
-            #         "user": "yourusername",  # 数据库用户名
-            #         "password": "yourpassword",  # 数据库密码
-            #         "database": "yourdatabase",  # 数据库名称
-            #     },
-            # },
-            # PostgreSQL 配置（示例，未启用）
-            # Install with: tortoise-orm[asyncpg]
-            # "postgres": {
-            #     "engine": "tortoise.backends.asyncpg",  # 使用 PostgreSQL 引擎
-            #     "credentials": {
-            #         "host": "localhost",  # 数据库主机地址
-            #         "port": 5432,  # 数据库端口
-            #         "user": "yourusername",  # 数据库用户名
-            #         "password": "yourpassword",  # 数据库密码
-            #         "database": "yourdatabase",  # 数据库名称
-            #     },
-            # },
-            # MSSQL/Oracle 配置（示例，未启用）
-            # Install with: tortoise-orm[asyncodbc]
-            # "oracle": {
-            #     "engine": "tortoise.backends.asyncodbc",  # 使用 Oracle 引擎
-            #     "credentials": {
-            #         "host": "localhost",  # 数据库主机地址
-            #         "port": 1433,  # 数据库端口
-            #         "user": "yourusername",  # 数据库用户名
-            #         "password": "yourpassword",  # 数据库密码
-            #         "database": "yourdatabase",  # 数据库名称
-            #     },
-            # },
-            # SQLServer 配置（示例，未启用）
-            # Install with: tortoise-orm[asyncodbc]
-            # "sqlserver": {
-            #     "engine": "tortoise.backends.asyncodbc",  # 使用 SQLServer 引擎
-            #     "credentials": {
-            #         "host": "localhost",  # 数据库主机地址
-            #         "port": 1433,  # 数据库端口
-            #         "user": "yourusername",  # 数据库用户名
-            #         "password": "yourpassword",  # 数据库密码
-            #         "database": "yourdatabase",  # 数据库名称
-            #     },
-            # },
-        },
+    # 数据库配置（使用 Tortoise ORM），均可通过同名环境变量覆盖
+    DB_ENGINE: str = "sqlite"  # 数据库类型：sqlite / mysql / postgres
+    DB_HOST: str = "localhost"  # 数据库主机地址（MySQL/PostgreSQL）
+    DB_PORT: int = 0  # 数据库端口，0 表示使用默认端口（MySQL 3306，PostgreSQL 5432）
+    DB_USER: str = ""  # 数据库用户名
+    DB_PASSWORD: str = ""  # 数据库密码
+    DB_NAME: str = "testing_ai"  # 数据库名称
+    DB_POOL_MIN_SIZE: int = 2  # 连接池最小连接数
+    DB_POOL_MAX_SIZE: int = 20  # 连接池最大连接数，应不小于并发执行的智能体任务数
+    DB_POOL_RECYCLE: int = 1800  # 连接回收时间（秒），MySQL 为连接最长使用时间，PostgreSQL 为空闲连接最长保留时间
+    DB_CONNECT_TIMEOUT: int = 10  # 建立连接的超时时间（秒）
+    DB_STATEMENT_CACHE_SIZE: int = 256  # PostgreSQL 每个连接缓存的预编译语句数量，0 表示关闭
+    DB_MAX_QUERIES: int = 50000  # PostgreSQL 单个连接执行该数量的查询后重建
+    DB_POOL_MONITOR_INTERVAL: float = 5  # 连接池使用情况的采样间隔（秒），0 表示不采样
+
+    # SQLite 配置（DB_ENGINE=sqlite 时生效，均以 PRAGMA 形式在建立连接时设置）
+    SQLITE_PATH: str = os.path.join(BASE_DIR, "db.sqlite3")  # SQLite 数据库文件路径
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL 模式下读不阻塞写
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # WAL 模式下 NORMAL 即可保证一致性，减少 fsync
+    SQLITE_BUSY_TIMEOUT: int = 5000  # 数据库被锁定时的等待时间（毫秒），避免直接报 database is locked
+    SQLITE_CACHE_SIZE: int = -64000  # 页缓存大小，负数表示 KB（约 64MB）
+    SQLITE_MMAP_SIZE: int = 268435456  # 内存映射读取的大小（字节）
+    SQLITE_WAL_AUTOCHECKPOINT: int = 1000  # WAL 文件达到该页数时自动检查点
+
+    # 由上面的数据库配置生成，见 build_tortoise_orm；直接设置时以设置的值为准
+    TORTOISE_ORM: dict = {}
+
+    def model_post_init(self, context: typing.Any, /) -> None:
+        if not self.TORTOISE_ORM:
+            self.TORTOISE_ORM = build_tortoise_orm(self)
+
+    # 审计日志批量写入配置
+    AUDIT_LOG_BUFFER_SIZE: int = 10000  # 内存缓冲区最大日志条数，超出后丢弃
+    AUDIT_LOG_BATCH_SIZE: int = 200  # 缓冲区达到该条数时立即批量写入
+    AUDIT_LOG_FLUSH_INTERVAL: float = 1.0  # 定时批量写入间隔（秒）
+
+    # 审计日志存储维护配置
+    AUDIT_LOG_PARTITION: str = "none"  # 分区方式：none 不分区，day 按天分表，month 按月分表
+    AUDIT_LOG_HOT_PERIODS: int = 2  # 主表保留最近的分区周期数，更早的日志移入分区表
+    AUDIT_LOG_RETENTION_DAYS: int = 180  # 日志保留天数，更早的日志压缩归档后删除，0 表示永久保留
+    AUDIT_LOG_ARCHIVE_DIR: str = os.path.join(BASE_DIR, "app/archives/audit_log")  # 归档文件目录
+    AUDIT_LOG_MAINTENANCE_INTERVAL: float = 300  # 统计、分区、归档任务的执行间隔（秒），0 表示不执行
+    AUDIT_LOG_ROLLUP_BATCH_SIZE: int = 5000  # 统计任务每批读取的日志条数
+    AUDIT_LOG_SLOW_MS: int = 1000  # 慢请求阈值（毫秒）
+    AUDIT_LOG_ROLLUP_LAG: float = 60  # 统计任务只处理早于该秒数的日志，需大于写入缓冲和事务提交的最长延迟
+
+    # 权限缓存配置
+    PERMISSION_CACHE_TTL: float = 60  # 用户角色和角色权限的缓存有效期（秒）
+
+    # 列表分页配置
+    LIST_COUNT_CACHE_TTL: float = 10  # 列表总数缓存有效期（秒），总数最多滞后该时间，0 表示不缓存
+
+    # 菜单、部门树缓存配置
+    TREE_CACHE_TTL: float = 300  # 序列化后的菜单树、部门树的缓存有效期（秒）
+
+    # 日期格式
+    DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"  # 日期时间格式
+
+
+def build_tortoise_orm(config: Settings) -> dict:
+    """
+    根据数据库配置生成 Tortoise ORM 配置。
+    - sqlite: 单文件数据库，WAL 模式 + busy_timeout，适合单机开发和小规模部署
+    - mysql: asyncmy 连接池（需安装 tortoise-orm[asyncmy]），超过 DB_POOL_RECYCLE 的连接会被重建
+    - postgres: asyncpg 连接池（需安装 tortoise-orm[asyncpg]），开启预编译语句缓存
+    """
+    engine = config.DB_ENGINE.lower()
+    if engine == "sqlite":
+        connection = {
+            "engine": "tortoise.backends.sqlite",
+            "credentials": {
+                "file_path": config.SQLITE_PATH,
+                # 以下参数由 Tortoise 在建立连接时以 PRAGMA 设置
+                "journal_mode": config.SQLITE_JOURNAL_MODE,
+                "synchronous": config.SQLITE_SYNCHRONOUS,
+                "busy_timeout": config.SQLITE_BUSY_TIMEOUT,
+                "cache_size": config.SQLITE_CACHE_SIZE,
+                "mmap_size": config.SQLITE_MMAP_SIZE,
+                "wal_autocheckpoint": config.SQLITE_WAL_AUTOCHECKPOINT,
+                "temp_store": "MEMORY",
+                "foreign_keys": "ON",
+            },
+        }
+    elif engine == "mysql":
+        connection = {
+            "engine": "tortoise.backends.mysql",
+            "credentials": {
+                "host": config.DB_HOST,
+                "port": config.DB_PORT or 3306,
+                "user": config.DB_USER,
+                "password": config.DB_PASSWORD,
+                "database": config.DB_NAME,
+                "minsize": config.DB_POOL_MIN_SIZE,
+                "maxsize": config.DB_POOL_MAX_SIZE,
+                "pool_recycle": config.DB_POOL_RECYCLE,
+                "connect_timeout": config.DB_CONNECT_TIMEOUT,
+                "charset": "utf8mb4",
+            },
+        }
+    elif engine in ("postgres", "postgresql"):
+        connection = {
+            "engine": "tortoise.backends.asyncpg",
+            "credentials": {
+                "host": config.DB_HOST,
+                "port": config.DB_PORT or 5432,
+                "user": config.DB_USER,
+                "password": config.DB_PASSWORD,
+                "database": config.DB_NAME,
+                "minsize": config.DB_POOL_MIN_SIZE,
+                "maxsize": config.DB_POOL_MAX_SIZE,
+                "max_inactive_connection_lifetime": config.DB_POOL_RECYCLE,
+                "max_queries": config.DB_MAX_QUERIES,
+                "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+                "timeout": config.DB_CONNECT_TIMEOUT,
+            },
+        }
+    else:
+        raise ValueError(f"不支持的数据库类型: {config.DB_ENGINE}")
+    return {
+        "connections": {"default": connection},  # 数据库连接配置
         "apps": {  # 定义应用及其对应的模型
             "models": {
                 "models": ["app.models", "aerich.models"],  # 包含的模型模块
@@ -99,9 +161,6 @@ class Settings(BaseSettings):
         "timezone": "Asia/Shanghai",  # 时区设置，默认为上海时区
     }
 
-    # 日期格式
-    DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"  # 日期时间格式
-
 
 # 实例化配置对象，加载所有配置
 settings = Settings()
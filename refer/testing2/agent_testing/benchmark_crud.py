@@ -0,0 +1,107 @@
+"""
+CRUD 接口压测脚本，用于比较不同数据库配置（DB_ENGINE=sqlite / mysql / postgres）下的吞吐量。
+
+先用要测试的数据库配置启动服务，例如:
+    DB_ENGINE=mysql DB_USER=root DB_PASSWORD=xxx DB_NAME=testing_ai python run.py
+再运行:
+    python benchmark_crud.py --base-url http://127.0.0.1:9999 --concurrency 32 --duration 30
+
+每个并发任务循环执行 项目的 创建 -> 按名称查询列表 -> 查看详情 -> 更新 -> 删除，
+结束后输出各接口的请求数、吞吐量和延迟分位数，以及服务端的连接池状态。
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+OPERATIONS = ["create", "list", "get", "update", "delete"]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    resp = await client.post("/api/v1/base/access_token", json={"username": username, "password": password})
+    resp.raise_for_status()
+    return resp.json()["data"]["access_token"]
+
+
+async def timed(latencies: dict, errors: dict, op: str, request):
+    started = time.perf_counter()
+    try:
+        resp = await request
+        ok = resp.status_code < 400 and resp.json().get("code", 200) < 400
+    except httpx.HTTPError:
+        resp, ok = None, False
+    latencies[op].append((time.perf_counter() - started) * 1000)
+    if not ok:
+        errors[op] += 1
+    return resp if ok else None
+
+
+async def worker(client: httpx.AsyncClient, deadline: float, latencies: dict, errors: dict):
+    while time.monotonic() < deadline:
+        name = f"bench-{uuid.uuid4().hex[:12]}"
+        if not await timed(latencies, errors, "create", client.post(
+                "/api/v1/project/create", json={"name": name, "desc": "benchmark"})):
+            continue
+        resp = await timed(latencies, errors, "list", client.get(
+            "/api/v1/project/list", params={"project_name": name, "page_size": 1}))
+        if not resp or not resp.json()["data"]:
+            continue
+        project_id = resp.json()["data"][0]["id"]
+        await timed(latencies, errors, "get", client.get("/api/v1/project/get", params={"id": project_id}))
+        await timed(latencies, errors, "update", client.post(
+            "/api/v1/project/update", json={"id": project_id, "name": name, "desc": "benchmark updated"}))
+        await timed(latencies, errors, "delete", client.delete(
+            "/api/v1/project/delete", params={"proj_id": project_id}))
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="CRUD 接口压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:9999")
+    parser.add_argument("--token", default="", help="访问令牌，不指定时使用用户名密码登录")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发任务数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+        token = args.token or await login(client, args.username, args.password)
+        client.headers["token"] = token
+
+        latencies = {op: [] for op in OPERATIONS}
+        errors = {op: 0 for op in OPERATIONS}
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(client, deadline, latencies, errors) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+
+        db_stats = (await client.get("/api/v1/base/dbstats")).json().get("data", {})
+
+    engine = db_stats.get("pool", {}).get("engine", "unknown")
+    print(f"数据库: {engine}  并发: {args.concurrency}  时长: {elapsed:.1f}s")
+    print(f"{'接口':<8}{'请求数':>8}{'错误':>6}{'req/s':>10}{'avg(ms)':>10}{'p50':>8}{'p95':>8}{'p99':>8}")
+    total = 0
+    for op in OPERATIONS:
+        values = latencies[op]
+        total += len(values)
+        print(f"{op:<8}{len(values):>8}{errors[op]:>6}{len(values) / elapsed:>10.1f}"
+              f"{(statistics.mean(values) if values else 0):>10.1f}{percentile(values, 0.5):>8.1f}"
+              f"{percentile(values, 0.95):>8.1f}{percentile(values, 0.99):>8.1f}")
+    print(f"{'total':<8}{total:>8}{sum(errors.values()):>6}{total / elapsed:>10.1f}")
+    print(f"连接池: {db_stats.get('pool')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+
+@pytest.fixture
+def run_db():
+    """在内存SQLite数据库上执行协程函数，返回其结果"""
+
+    def runner(scenario, *args):
+        async def main():
+            # 与项目配置一致，使用无时区的本地时间
+            await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]},
+                                use_tz=False, timezone="Asia/Shanghai")
+            await Tortoise.generate_schemas()
+            try:
+                return await scenario(*args)
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(main())
+
+    return runner
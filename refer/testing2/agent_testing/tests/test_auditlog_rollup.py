@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from app.core import auditlog_storage
+from app.core.auditlog_storage import ROLLUP_CHECKPOINT_KEY, AuditLogMaintainer
+from app.models.admin import AuditLog, AuditLogRollup, SystemConfig
+
+
+async def add_log(age_seconds: float, module: str = "用户模块", status: int = 200, response_time: int = 100) -> int:
+    log = await AuditLog.create(user_id=1, module=module, status=status, response_time=response_time)
+    created_at = auditlog_storage._now() - timedelta(seconds=age_seconds)
+    await AuditLog.filter(id=log.id).update(created_at=created_at)
+    return log.id
+
+
+async def checkpoint() -> int:
+    return int((await SystemConfig.get(key=ROLLUP_CHECKPOINT_KEY)).value)
+
+
+async def rollup_counts() -> dict:
+    """按 (模块, 状态码) 汇总各时段的请求数"""
+    counts = {}
+    for rollup in await AuditLogRollup.all():
+        counts[(rollup.module, rollup.status)] = counts.get((rollup.module, rollup.status), 0) + rollup.count
+    return counts
+
+
+def test_rollup_aggregates_by_module_and_status(run_db):
+    async def scenario():
+        maintainer = AuditLogMaintainer(interval=0, slow_ms=500, rollup_lag=60)
+        await add_log(3600, response_time=100)
+        await add_log(3600, response_time=900)
+        await add_log(3600, status=500, response_time=50)
+
+        assert await maintainer.rollup() == 3
+        rollups = {(r.module, r.status): r for r in await AuditLogRollup.all()}
+        assert len(rollups) == 2
+        ok = rollups[("用户模块", 200)]
+        assert (ok.count, ok.total_response_time, ok.max_response_time, ok.slow_count) == (2, 1000, 900, 1)
+        assert rollups[("用户模块", 500)].count == 1
+
+        # 已统计的日志不会重复计数
+        assert await maintainer.rollup() == 0
+        assert (await rollup_counts())[("用户模块", 200)] == 2
+
+    run_db(scenario)
+
+
+def test_rollup_stops_before_recent_logs(run_db):
+    async def scenario():
+        maintainer = AuditLogMaintainer(interval=0, rollup_lag=60)
+        old_id = await add_log(3600)
+        recent_id = await add_log(5)
+        # ID 更大但 created_at 更早的日志：模拟其他进程先提交的批次
+        later_id = await add_log(3600)
+
+        assert await maintainer.rollup() == 1
+        assert await checkpoint() == old_id
+        assert recent_id < later_id
+
+        # 超过安全延迟后，之前跳过的日志都会被统计
+        await AuditLog.filter(id=recent_id).update(created_at=auditlog_storage._now() - timedelta(seconds=120))
+        assert await maintainer.rollup() == 2
+        assert await checkpoint() == later_id
+        assert (await rollup_counts())[("用户模块", 200)] == 3
+
+    run_db(scenario)
+
+
+def test_rollup_checkpoint_moved_by_other_process(run_db):
+    async def scenario():
+        maintainer = AuditLogMaintainer(interval=0, rollup_lag=0)
+        await add_log(3600)
+        await maintainer._get_checkpoint()
+
+        async def moved(*args):
+            raise auditlog_storage._CheckpointMoved()
+
+        maintainer._save_rollups = moved
+        assert await maintainer.rollup() == 0
+        assert await AuditLogRollup.all().count() == 0
+
+    run_db(scenario)
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from app.api.v1.agent import performance_report_parser as parser
+from app.api.v1.agent.performance_report_parser import (
+    OTHER_ENDPOINTS,
+    PerformanceReportAggregator,
+    QuantileSketch,
+    aggregate_performance_file,
+    iter_xml_records,
+    summarize_performance_file,
+)
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    def write(name: str, content: str):
+        path = tmp_path / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    return write
+
+
+def test_csv_jtl(write_file):
+    path = write_file("report.jtl", "\n".join([
+        "timeStamp,elapsed,label,responseCode,success",
+        "1700000000000,100,login,200,true",
+        "1700000000500,300,login,500,false",
+        "1700000001000,50,https://shop.example.com/orders/42?page=1,200,true",
+        "1700000002000,,broken,200,true",
+    ]))
+    summary = aggregate_performance_file(path).to_dict()
+
+    assert summary["overall"]["count"] == 3
+    assert summary["overall"]["errors"] == 1
+    assert summary["skipped_records"] == 1
+    assert summary["overall"]["duration_seconds"] == 1.0
+    assert summary["endpoints"]["login"]["count"] == 2
+    assert summary["endpoints"]["login"]["max"] == 300
+    assert summary["endpoints"]["/orders/{id}"]["count"] == 1
+
+
+def test_xml_jtl_counts_top_level_samples_only(write_file):
+    path = write_file("report.xml", """<?xml version="1.0" encoding="UTF-8"?>
+<testResults version="1.2">
+  <httpSample t="120" ts="1700000000000" lb="GET /home" rc="200" s="true">
+    <httpSample t="40" ts="1700000000010" lb="GET /home-redirect" rc="302" s="true"/>
+    <assertionResult><name>ok</name></assertionResult>
+  </httpSample>
+  <sample t="80" ts="1700000001000" lb="checkout" rc="500" s="false"/>
+</testResults>
+""")
+    records = list(iter_xml_records(path))
+
+    assert [record["lb"] for record in records] == ["GET /home", "checkout"]
+    summary = aggregate_performance_file(path).to_dict()
+    assert summary["overall"]["count"] == 2
+    assert summary["overall"]["errors"] == 1
+    assert set(summary["endpoints"]) == {"GET /home", "checkout"}
+
+
+def test_har(write_file):
+    entries = [
+        {"startedDateTime": "2024-01-01T00:00:00Z", "time": 10,
+         "request": {"method": "GET", "url": "https://x.com/users/123"}, "response": {"status": 200}},
+        {"startedDateTime": "2024-01-01T00:00:02Z", "time": 30,
+         "request": {"method": "GET", "url": "https://x.com/users/456"}, "response": {"status": 503}},
+        {"request": {"method": "GET", "url": "https://x.com/users"}, "response": {"status": 200}},
+    ]
+    path = write_file("report.har", json.dumps({"log": {"entries": entries}}))
+    summary = aggregate_performance_file(path).to_dict()
+
+    assert summary["overall"]["count"] == 2
+    assert summary["skipped_records"] == 1
+    assert summary["endpoints"]["GET /users/{id}"]["errors"] == 1
+    assert summary["overall"]["duration_seconds"] == 2.0
+
+
+def test_json_sample_array(write_file):
+    samples = [
+        {"name": "search", "duration": 20, "status": 200, "timestamp": 1700000000},
+        {"name": "search", "duration": 40, "status": 404, "timestamp": 1700000001},
+        "not a sample",
+    ]
+    path = write_file("report.json", json.dumps(samples))
+    summary = aggregate_performance_file(path).to_dict()
+
+    assert summary["overall"]["count"] == 2
+    assert summary["overall"]["errors"] == 1
+    assert summary["overall"]["mean"] == 30
+    assert summary["skipped_records"] == 1
+
+
+def test_small_summary_json_is_inlined(write_file):
+    path = write_file("summary.json", json.dumps({"throughput": 12.5}))
+
+    assert aggregate_performance_file(path) is None
+    assert "12.5" in summarize_performance_file(path)
+
+
+def test_endpoint_count_is_bounded():
+    aggregator = PerformanceReportAggregator(max_endpoints=3)
+    for i in range(10):
+        aggregator.add(f"endpoint-{i}", 10, True)
+
+    assert len(aggregator.endpoints) == 4
+    assert aggregator.endpoints[OTHER_ENDPOINTS].count == 7
+    assert aggregator.overall.count == 10
+
+
+def test_label_normalization():
+    assert parser._normalize_label("https://x.com/orders/42/items/7?x=1") == "/orders/{id}/items/{id}"
+    assert parser._normalize_label("/files/3f2504e0-4f89-11d3-9a0c-0305e82c3301") == "/files/{id}"
+    assert parser._normalize_label("/v1/users") == "/v1/users"
+    assert parser._normalize_label("Login 2") == "Login 2"
+
+
+def test_quantile_sketch_relative_error():
+    sketch = QuantileSketch()
+    for value in range(1, 10001):
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.99):
+        expected = q * 9999 + 1
+        assert abs(sketch.quantile(q) - expected) / expected <= 0.011
@@ -0,0 +1,132 @@
+import hashlib
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from tortoise import timezone
+
+from app.api.v1.agent import performance
+from app.models.admin import PerformanceReportFile
+
+CONTENT = b"timeStamp,elapsed,label\n" + b"1700000000000,12,login\n" * 100
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch, run_db):
+    """在内存SQLite上运行上传接口，scenario接收httpx客户端"""
+    monkeypatch.setattr(performance, "UPLOAD_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(performance.router)
+
+    async def with_client(scenario):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+
+    return lambda scenario: run_db(with_client, scenario)
+
+
+async def init_upload(client, size=len(CONTENT)):
+    resp = await client.post("/performance/upload/init", params={"filename": "report.jtl", "size": size})
+    assert resp.status_code == 200
+    return resp.json()["file_id"]
+
+
+async def put_chunk(client, file_id, offset, data):
+    return await client.put(f"/performance/upload/{file_id}", params={"offset": offset}, content=data)
+
+
+def test_resumable_upload_in_chunks(run):
+    async def scenario(client):
+        file_id = await init_upload(client)
+
+        resp = await put_chunk(client, file_id, 0, CONTENT[:1000])
+        assert resp.json() == {"success": True, "file_id": file_id, "offset": 1000}
+
+        status = (await client.get(f"/performance/upload/{file_id}")).json()
+        assert status["offset"] == 1000
+        assert status["status"] == "uploading"
+
+        resp = await put_chunk(client, file_id, 1000, CONTENT[1000:])
+        body = resp.json()
+        assert body["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+        assert body["size"] == len(CONTENT)
+
+        file_info = await PerformanceReportFile.get(file_id=file_id)
+        assert file_info.status == "uploaded"
+        assert file_info.writer is None
+        with open(file_info.path, "rb") as f:
+            assert f.read() == CONTENT
+
+        # 上传完成后重复提交直接返回结果
+        resp = await put_chunk(client, file_id, 0, CONTENT[:10])
+        assert resp.json()["sha256"] == body["sha256"]
+
+    run(scenario)
+
+
+def test_offset_mismatch_returns_current_offset(run):
+    async def scenario(client):
+        file_id = await init_upload(client)
+        await put_chunk(client, file_id, 0, CONTENT[:500])
+
+        for offset in (0, 800):
+            resp = await put_chunk(client, file_id, offset, CONTENT[offset:offset + 100])
+            assert resp.status_code == 409
+            assert resp.json()["offset"] == 500
+
+    run(scenario)
+
+
+def test_oversized_chunk_is_rolled_back(run):
+    async def scenario(client):
+        file_id = await init_upload(client, size=100)
+        await put_chunk(client, file_id, 0, CONTENT[:60])
+
+        resp = await put_chunk(client, file_id, 60, CONTENT[60:200])
+        assert resp.status_code == 413
+
+        file_info = await PerformanceReportFile.get(file_id=file_id)
+        assert file_info.received == 60
+        assert file_info.writer is None
+        with open(file_info.path, "rb") as f:
+            assert f.read() == CONTENT[:60]
+
+        resp = await put_chunk(client, file_id, 60, CONTENT[60:100])
+        assert resp.json()["size"] == 100
+
+    run(scenario)
+
+
+def test_offset_is_claimed_by_one_writer(run):
+    async def scenario(client):
+        file_id = await init_upload(client)
+
+        writer = await performance.claim_upload_lease(file_id, 0)
+        assert writer is not None
+        assert await performance.claim_upload_lease(file_id, 0) is None
+
+        resp = await put_chunk(client, file_id, 0, CONTENT[:100])
+        assert resp.status_code == 409
+        assert resp.json()["offset"] == 0
+
+        await performance.release_upload_lease(file_id, writer)
+        resp = await put_chunk(client, file_id, 0, CONTENT[:100])
+        assert resp.json()["offset"] == 100
+
+    run(scenario)
+
+
+def test_expired_lease_can_be_taken_over(run):
+    async def scenario(client):
+        file_id = await init_upload(client)
+        stale = await performance.claim_upload_lease(file_id, 0)
+        await PerformanceReportFile.filter(file_id=file_id).update(lease_until=timezone.now() - timedelta(seconds=1))
+
+        resp = await put_chunk(client, file_id, 0, CONTENT[:100])
+        assert resp.json()["offset"] == 100
+        # 原持有者无法再续约
+        assert await performance.renew_upload_lease(file_id, stale) is None
+
+    run(scenario)
@@ -0,0 +1,50 @@
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1.requirements import requirements
+from app.models.admin import Requirement
+
+
+async def seed(count: int):
+    await Requirement.bulk_create([
+        Requirement(
+            name=f"需求{i}", description="描述", category="功能", module="登录", level="高", reviewer="张三",
+            keywords="登录", estimate=4, criteria="通过", remark="", project_id=1,
+        )
+        for i in range(count)
+    ])
+
+
+async def list_requirements(client, **params):
+    resp = await client.get("/list", params=params)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_page_size_cursor_and_limit_agree(run_db):
+    app = FastAPI()
+    app.include_router(requirements.router)
+
+    async def scenario():
+        await seed(25)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await list_requirements(client, page_size=10)
+            assert len(first["data"]) == 10
+            assert first["next_cursor"]
+
+            second = await list_requirements(client, page_size=10, cursor=first["next_cursor"])
+            assert len(second["data"]) == 10
+            assert not {item["id"] for item in first["data"]} & {item["id"] for item in second["data"]}
+
+            # limit 小于 page_size 时，两种分页都按 limit 返回
+            limited = await list_requirements(client, page_size=10, limit=4)
+            assert len(limited["data"]) == 4
+            after = await list_requirements(client, page_size=10, limit=4, cursor=limited["next_cursor"])
+            assert len(after["data"]) == 4
+
+            last = await list_requirements(client, page=3, page_size=10)
+            assert len(last["data"]) == 5
+            assert last["next_cursor"] is None
+
+    run_db(scenario)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.controllers.testcase import testcase_controller
+from app.models import admin
+from app.models.enums import TestCaseTag as CaseTag
+from app.schemas.testcases import CaseCreate
+
+
+def make_case(title: str, tags: str | None = "功能测试", priority: str = "高", steps=None) -> CaseCreate:
+    if steps is None:
+        steps = [("打开页面", "页面正常显示")]
+    return CaseCreate(
+        title=title, priority=priority, tags=tags, requirement_id=1, project_id=1, creator="tester",
+        steps=[{"description": description, "expected_result": expected} for description, expected in steps],
+    )
+
+
+async def case_steps(title: str) -> list:
+    case = await admin.TestCase.get(title=title)
+    return [(step.description, step.expected_result) for step in await case.steps.all().order_by("step_id")]
+
+
+def test_insert_update_skip_counts(run_db):
+    async def scenario():
+        result = await testcase_controller.bulk_upsert([make_case("登录"), make_case("注册"), make_case("登录")])
+        assert result == {"inserted": 2, "updated": 0, "skipped": 1}
+        assert await case_steps("登录") == [("打开页面", "页面正常显示")]
+
+        result = await testcase_controller.bulk_upsert([
+            make_case("登录"),
+            make_case("注册", priority="低"),
+            make_case("登录2", steps=[("输入密码", "提示错误"), ("提交", "停留在登录页")]),
+        ])
+        assert result == {"inserted": 1, "updated": 1, "skipped": 1}
+        assert (await admin.TestCase.get(title="注册")).priority == "低"
+        assert await case_steps("登录2") == [("输入密码", "提示错误"), ("提交", "停留在登录页")]
+
+        # 只修改步骤时整体替换原有步骤
+        result = await testcase_controller.bulk_upsert([make_case("登录", steps=[("刷新", "仍在登录页")])])
+        assert result == {"inserted": 0, "updated": 1, "skipped": 0}
+        assert await case_steps("登录") == [("刷新", "仍在登录页")]
+        assert await admin.TestStep.all().count() == 4
+
+    run_db(scenario)
+
+
+def test_unknown_tag_defaults_to_functional(run_db):
+    async def scenario():
+        await testcase_controller.bulk_upsert([
+            make_case("接口", tags="接口测试"), make_case("冒烟", tags="冒烟测试"), make_case("空", tags=None),
+        ])
+        tags = {case.title: case.tags for case in await admin.TestCase.all()}
+        assert tags == {"接口": CaseTag.FUNCTIONAL_TEST, "冒烟": CaseTag.SMOKE_TEST, "空": CaseTag.FUNCTIONAL_TEST}
+
+    run_db(scenario)
+
+
+def test_concurrent_batches_get_distinct_numbers(run_db):
+    async def scenario():
+        await testcase_controller.bulk_upsert([make_case("已有")])
+        await asyncio.gather(*(
+            testcase_controller.bulk_upsert([make_case(f"批次{batch}-{i}") for i in range(3)]) for batch in range(3)
+        ))
+        numbers = await admin.TestCase.all().order_by("test_case_id").values_list("test_case_id", flat=True)
+        assert numbers == list(range(1, 11))
+
+    run_db(scenario)
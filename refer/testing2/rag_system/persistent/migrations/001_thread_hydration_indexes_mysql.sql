@@ -0,0 +1,5 @@
+-- Indexes behind thread hydration (get_thread / list_threads).
+-- Apply to existing databases with: mysql <database> < 001_thread_hydration_indexes_mysql.sql
+ALTER TABLE `steps` ADD INDEX `steps_thread_created_idx`(`threadId`, `createdAt`), ALGORITHM = INPLACE, LOCK = NONE;
+ALTER TABLE `elements` ADD INDEX `elements_thread_idx`(`threadId`), ALGORITHM = INPLACE, LOCK = NONE;
+ALTER TABLE `feedbacks` ADD INDEX `feedbacks_for_idx`(`forId`), ALGORITHM = INPLACE, LOCK = NONE;
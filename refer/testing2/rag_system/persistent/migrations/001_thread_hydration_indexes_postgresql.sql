@@ -0,0 +1,6 @@
+-- Indexes behind thread hydration (get_thread / list_threads).
+-- Apply to existing databases with: psql <conninfo> -f 001_thread_hydration_indexes_postgresql.sql
+-- CONCURRENTLY does not block writes; run outside of a transaction block.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS steps_thread_created_idx ON steps ("threadId", "createdAt");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS elements_thread_idx ON elements ("threadId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS feedbacks_for_idx ON feedbacks ("forId");
@@ -0,0 +1,5 @@
+-- Indexes behind thread hydration (get_thread / list_threads).
+-- Apply to existing databases with: sqlite3 <db file> < 001_thread_hydration_indexes_sqllite.sql
+CREATE INDEX IF NOT EXISTS steps_thread_created_idx ON steps ("threadId", "createdAt");
+CREATE INDEX IF NOT EXISTS elements_thread_idx ON elements ("threadId");
+CREATE INDEX IF NOT EXISTS feedbacks_for_idx ON feedbacks ("forId");
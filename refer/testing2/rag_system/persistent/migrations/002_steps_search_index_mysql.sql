@@ -0,0 +1,5 @@
+-- Keyword search index over step outputs (list_threads search filter).
+-- Apply to existing databases with: mysql <database> < 002_steps_search_index_mysql.sql
+-- InnoDB cannot add a FULLTEXT index with LOCK = NONE: writes to steps wait until the
+-- build finishes, so run this in a quiet period. Until then, search falls back to LIKE.
+ALTER TABLE `steps` ADD FULLTEXT INDEX `steps_output_ft`(`output`) WITH PARSER `ngram`, ALGORITHM = INPLACE, LOCK = SHARED;
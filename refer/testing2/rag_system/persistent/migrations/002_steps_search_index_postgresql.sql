@@ -0,0 +1,6 @@
+-- Keyword search index over step outputs (list_threads search filter).
+-- Apply to existing databases with: psql <conninfo> -f 002_steps_search_index_postgresql.sql
+-- CONCURRENTLY does not block writes; run outside of a transaction block.
+-- If the build fails it leaves an INVALID index: drop it and run this file again.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS steps_output_tsv_idx
+ON steps USING GIN (to_tsvector('simple', COALESCE("output", '')));
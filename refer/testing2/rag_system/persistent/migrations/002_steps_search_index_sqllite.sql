@@ -0,0 +1,22 @@
+-- Keyword search index over step outputs (list_threads search filter).
+-- Apply to existing databases with: sqlite3 <db file> < 002_steps_search_index_sqllite.sql
+-- The trigram tokenizer needs SQLite >= 3.34. Until this runs, search falls back to LIKE.
+CREATE VIRTUAL TABLE IF NOT EXISTS steps_fts USING fts5(
+    "output", content='steps', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_ai AFTER INSERT ON steps BEGIN
+    INSERT INTO steps_fts(rowid, "output") VALUES (new.rowid, new."output");
+END;
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_ad AFTER DELETE ON steps BEGIN
+    INSERT INTO steps_fts(steps_fts, rowid, "output") VALUES ('delete', old.rowid, old."output");
+END;
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_au AFTER UPDATE OF "output" ON steps BEGIN
+    INSERT INTO steps_fts(steps_fts, rowid, "output") VALUES ('delete', old.rowid, old."output");
+    INSERT INTO steps_fts(rowid, "output") VALUES (new.rowid, new."output");
+END;
+
+-- Backfill existing steps; also re-run after a VACUUM, which may renumber steps rowids.
+INSERT INTO steps_fts(steps_fts) VALUES ('rebuild');
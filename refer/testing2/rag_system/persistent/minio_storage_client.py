@@ -1,43 +1,176 @@
+import asyncio
+import functools
 import io
-import os
-from typing import Dict, Union, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
 
+import aiohttp
 from chainlit.data.storage_clients.base import BaseStorageClient
 from chainlit.logger import logger
 from minio import Minio
+from minio.error import S3Error
 
 import rag_system.utils.settings as settings
+
+# Presigned URLs are reused until this many seconds before they expire
+URL_EXPIRY_MARGIN = 60
+# Upper bound of cached presigned URLs; expired entries are pruned when it is reached
+MAX_CACHED_URLS = 10000
+
+
+class _ResponseReader:
+    """Blocking file-like view of an aiohttp response body for the Minio SDK.
+
+    read() is called from an SDK worker thread and awaits the next chunk on the
+    event loop, so only the part currently being uploaded is held in memory.
+    """
+
+    def __init__(self, response: aiohttp.ClientResponse, loop: asyncio.AbstractEventLoop):
+        self._response = response
+        self._loop = loop
+
+    def read(self, size: int = -1) -> bytes:
+        return asyncio.run_coroutine_threadsafe(self._response.content.read(size), self._loop).result()
+
+
 class MinioStorageClient(BaseStorageClient):
+    """Async Minio/S3 storage for chainlit elements.
 
-    def __init__(self):
+    Blocking SDK calls run in a bounded thread pool. Files and URLs are streamed
+    into multipart uploads part by part instead of being read into memory, and
+    presigned read URLs are cached until shortly before they expire. The
+    connection defaults come from settings; pass them explicitly to point the
+    client at a local S3-compatible server (see minio_docker.sh).
+    """
+
+    def __init__(
+            self,
+            endpoint: Optional[str] = None,
+            access_key: Optional[str] = None,
+            secret_key: Optional[str] = None,
+            bucket_name: Optional[str] = None,
+            secure: Optional[bool] = None,
+            max_workers: Optional[int] = None,
+            part_size: Optional[int] = None,
+            url_expiry: Optional[int] = None,
+    ):
+        configuration = settings.configuration
+        self.bucket_name = bucket_name or configuration.minio_bucket_name
+        self.part_size = part_size or configuration.minio_part_size
+        self.url_expiry = timedelta(seconds=url_expiry or configuration.minio_url_expiry)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or configuration.minio_upload_workers,
+            thread_name_prefix="minio",
+        )
+        self._urls: Dict[str, Tuple[float, str]] = {}  # object_key -> (reuse deadline, presigned url)
+        self._bucket_ready = False
         try:
-            self.client = Minio(endpoint=settings.configuration.minio_endpoint,
-                                access_key=settings.configuration.minio_access_key,
-                                secret_key=settings.configuration.minio_secret_key,
-                                secure=False)   # 如果使用https，则secure=True，否则为False
+            self.client = Minio(endpoint=endpoint or configuration.minio_endpoint,
+                                access_key=access_key or configuration.minio_access_key,
+                                secret_key=secret_key or configuration.minio_secret_key,
+                                secure=configuration.minio_secure if secure is None else secure)   # 如果使用https，则secure=True，否则为False
             logger.info("MinioStorageClient initialized")
         except Exception as e:
             logger.warn(f"MinioStorageClient initialization error: {e}")
 
-    async def upload_file(self, object_key: str, data: Union[bytes, str], mime: str = 'application/octet-stream',
-                          overwrite: bool = True) -> Dict[str, Any]:
+    async def _run(self, func: Callable, *args, **kwargs):
+        """Run a blocking SDK call in the client's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _ensure_bucket(self):
+        if self._bucket_ready:
+            return
+        if not await self._run(self.client.bucket_exists, bucket_name=self.bucket_name):
+            try:
+                await self._run(self.client.make_bucket, bucket_name=self.bucket_name)
+            except S3Error as e:
+                if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                    raise
+        self._bucket_ready = True
+
+    async def _exists(self, object_key: str) -> bool:
+        try:
+            await self._run(self.client.stat_object, bucket_name=self.bucket_name, object_name=object_key)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    async def _upload(self, object_key: str, overwrite: bool, put: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """Shared upload flow: ensure the bucket, honour overwrite, run put, return key and read url."""
         try:
-            if isinstance(data, str):
-                data = io.BytesIO(data.encode('utf-8'))
-            else:
-                data = io.BytesIO(data)
-            bucket_name = settings.configuration.minio_bucket_name
-            self.client.put_object(bucket_name=bucket_name, object_name=object_key, data=data, length=len(data.getvalue()), content_type=mime)
-            # get file url from minio
-            url = self.client.get_presigned_url("GET", bucket_name, object_key)
-            return {"object_key": object_key, "url": url}
+            await self._ensure_bucket()
+            if overwrite or not await self._exists(object_key):
+                await put()
+            return {"object_key": object_key, "url": await self.get_read_url(object_key)}
         except Exception as e:
             logger.warn(f"MinioStorageClient, upload_file error: {e}")
             return {}
 
+    async def upload_file(self, object_key: str, data: Union[bytes, str], mime: str = 'application/octet-stream',
+                          overwrite: bool = True) -> Dict[str, Any]:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        async def put():
+            await self._run(self.client.put_object, bucket_name=self.bucket_name, object_name=object_key,
+                            data=io.BytesIO(data), length=len(data), content_type=mime)
+
+        return await self._upload(object_key, overwrite, put)
+
+    async def upload_path(self, object_key: str, path: str, mime: str = 'application/octet-stream',
+                          overwrite: bool = True) -> Dict[str, Any]:
+        """Upload a local file, read from disk one part at a time."""
+
+        async def put():
+            await self._run(self.client.fput_object, bucket_name=self.bucket_name, object_name=object_key,
+                            file_path=path, content_type=mime, part_size=self.part_size)
+
+        return await self._upload(object_key, overwrite, put)
+
+    async def upload_url(self, object_key: str, url: str, mime: str = 'application/octet-stream',
+                         overwrite: bool = True) -> Dict[str, Any]:
+        """Download a URL and upload it while it is being received."""
+
+        async def put():
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    # aiohttp decompresses encoded bodies, so Content-Length is only usable without encoding
+                    encoded = response.headers.get("Content-Encoding")
+                    length = response.content_length if response.content_length and not encoded else -1
+                    reader = _ResponseReader(response, asyncio.get_running_loop())
+                    await self._run(self.client.put_object, bucket_name=self.bucket_name, object_name=object_key,
+                                    data=reader, length=length, content_type=mime, part_size=self.part_size)
+
+        return await self._upload(object_key, overwrite, put)
+
     async def delete_file(self, object_key: str) -> bool:
-        pass
+        try:
+            await self._run(self.client.remove_object, bucket_name=self.bucket_name, object_name=object_key)
+            self._urls.pop(object_key, None)
+            return True
+        except Exception as e:
+            logger.warn(f"MinioStorageClient, delete_file error: {e}")
+            return False
 
     async def get_read_url(self, object_key: str) -> str:
-        pass
+        entry = self._urls.get(object_key)
+        now = time.monotonic()
+        if entry and entry[0] > now:
+            return entry[1]
+        url = await self._run(self.client.get_presigned_url, "GET", bucket_name=self.bucket_name,
+                              object_name=object_key, expires=self.url_expiry)
+        if len(self._urls) >= MAX_CACHED_URLS:
+            self._urls = {key: value for key, value in self._urls.items() if value[0] > now}
+            if len(self._urls) >= MAX_CACHED_URLS:
+                self._urls.clear()
+        self._urls[object_key] = (now + max(self.url_expiry.total_seconds() - URL_EXPIRY_MARGIN, 0), url)
+        return url
 
+    async def close(self):
+        self._executor.shutdown(wait=False)
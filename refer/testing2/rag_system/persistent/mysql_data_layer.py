@@ -1,5 +1,7 @@
+import asyncio
 import json
 import ssl
+import time
 import uuid
 from abc import ABC
 from dataclasses import asdict
@@ -23,15 +25,33 @@ from chainlit.types import (
     ThreadFilter,
 )
 from chainlit.user import PersistedUser, User
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.elements import TextClause
+
+from rag_system.persistent.step_buffer import StepWriteBuffer
 
 if TYPE_CHECKING:
     from chainlit.element import Element, ElementDict
     from chainlit.step import StepDict
 
+# The ngram FULLTEXT index over steps.output is created by mysql_chainlit.sql,
+# or by migrations/002_steps_search_index_mysql.sql on existing databases.
+# Seconds before a missing search index is looked up again, so applying the
+# migration takes effect without a restart
+SEARCH_INDEX_RECHECK_SECONDS = 300
+
+# Rows per multi-row INSERT when flushing buffered steps
+STEP_UPSERT_BATCH_SIZE = 100
+
+
+def _like_pattern(keyword: str) -> str:
+    """Escape LIKE wildcards with '!' and wrap the keyword for a substring match."""
+    escaped = keyword.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
 
 class MySqlDataLayer(BaseDataLayer, ABC):
     def __init__(
@@ -41,10 +61,15 @@ class MySqlDataLayer(BaseDataLayer, ABC):
             storage_provider: Optional[BaseStorageClient] = None,
             user_thread_limit: Optional[int] = 1000,
             show_logger: Optional[bool] = False,
+            step_flush_interval: float = 0.5,
     ):
         self._conninfo = conninfo
         self.user_thread_limit = user_thread_limit
         self.show_logger = show_logger
+        # Step writes are buffered and flushed in batches, see StepWriteBuffer
+        self._step_buffer = StepWriteBuffer(self._upsert_steps, flush_interval=step_flush_interval)
+        self._steps_fulltext_ready = False
+        self._steps_fulltext_checked_at: Optional[float] = None
         ssl_args = {}
         if ssl_require:
             # Create an SSL context to require an SSL connection
@@ -71,9 +96,9 @@ class MySqlDataLayer(BaseDataLayer, ABC):
 
     ###### SQL Helpers ######
     async def execute_sql(
-            self, query: str, parameters: dict
+            self, query: Union[str, TextClause], parameters: dict
     ) -> Union[List[Dict[str, Any]], int, None]:
-        parameterized_query = text(query)
+        parameterized_query = text(query) if isinstance(query, str) else query
         async with self.async_session() as session:
             try:
                 await session.begin()
@@ -167,13 +192,26 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         print('get_thread', thread_id)
         if self.show_logger:
             logger.info(f"SQLAlchemy: get_thread, thread_id={thread_id}")
-        user_threads: Optional[List[ThreadDict]] = await self.get_all_user_threads(
-            thread_id=thread_id
+        await self._step_buffer.flush()
+        # Single-thread fast path: primary key lookup, then hydrate just this thread
+        thread_query = """
+            SELECT
+                id AS thread_id,
+                createdAt AS thread_createdat,
+                name AS thread_name,
+                userId AS user_id,
+                userIdentifier AS user_identifier,
+                tags AS thread_tags,
+                metadata AS thread_metadata
+            FROM threads
+            WHERE id = :thread_id
+        """
+        threads = await self.execute_sql(
+            query=thread_query, parameters={"thread_id": thread_id}
         )
-        if user_threads:
-            return user_threads[0]
-        else:
+        if not isinstance(threads, list) or not threads:
             return None
+        return (await self._hydrate_threads(threads))[0]
 
     async def update_thread(
             self,
@@ -223,6 +261,7 @@ class MySqlDataLayer(BaseDataLayer, ABC):
     async def delete_thread(self, thread_id: str):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_thread, thread_id={thread_id}")
+        await self._step_buffer.flush()
         # Delete feedbacks/elements/steps/thread
         feedbacks_query = "DELETE FROM feedbacks WHERE forId IN (SELECT id FROM steps WHERE threadId = :id)"
         elements_query = "DELETE FROM elements WHERE threadId = :id"
@@ -243,45 +282,56 @@ class MySqlDataLayer(BaseDataLayer, ABC):
             )
         if not filters.userId:
             raise ValueError("userId is required")
-        all_user_threads: List[ThreadDict] = (
-                await self.get_all_user_threads(user_id=filters.userId) or []
-        )
-
-        search_keyword = filters.search.lower() if filters.search else None
-        feedback_value = int(filters.feedback) if filters.feedback else None
-
-        filtered_threads = []
-        for thread in all_user_threads:
-            keyword_match = True
-            feedback_match = True
-            if search_keyword or feedback_value is not None:
-                if search_keyword:
-                    keyword_match = any(
-                        search_keyword in step["output"].lower()
-                        for step in thread["steps"]
-                        if "output" in step
-                    )
-                if feedback_value is not None:
-                    feedback_match = False  # Assume no match until found
-                    for step in thread["steps"]:
-                        feedback = step.get("feedback")
-                        if feedback and feedback.get("value") == feedback_value:
-                            feedback_match = True
-                            break
-            if keyword_match and feedback_match:
-                filtered_threads.append(thread)
-
-        start = 0
+        await self._step_buffer.flush()
+        conditions = ["t.userId = :user_id"]
+        parameters: Dict[str, Any] = {
+            "user_id": filters.userId,
+            "limit": pagination.first + 1,
+        }
         if pagination.cursor:
-            for i, thread in enumerate(filtered_threads):
-                if (
-                        thread["id"] == pagination.cursor
-                ):  # Find the start index using pagination.cursor
-                    start = i + 1
-                    break
-        end = start + pagination.first
-        paginated_threads = filtered_threads[start:end] or []
-        has_next_page = len(filtered_threads) > end
+            # Keyset pagination on (createdAt, id): continue right after the cursor thread
+            cursor_threads = await self.execute_sql(
+                query="""SELECT COALESCE(createdAt, '') AS created_at FROM threads WHERE id = :id""",
+                parameters={"id": pagination.cursor},
+            )
+            if isinstance(cursor_threads, list) and cursor_threads:
+                conditions.append(
+                    """(COALESCE(t.createdAt, '') < :cursor_created_at
+                    OR (COALESCE(t.createdAt, '') = :cursor_created_at AND t.id < :cursor_id))"""
+                )
+                parameters["cursor_created_at"] = cursor_threads[0]["created_at"]
+                parameters["cursor_id"] = pagination.cursor
+        if filters.search:
+            conditions.append(await self._search_condition(filters.search, parameters))
+        if filters.feedback is not None:
+            conditions.append(
+                """EXISTS (
+                    SELECT 1 FROM feedbacks f JOIN steps s ON s.id = f.forId
+                    WHERE s.threadId = t.id AND f.value = :feedback
+                )"""
+            )
+            parameters["feedback"] = int(filters.feedback)
+
+        threads_query = f"""
+            SELECT
+                t.id AS thread_id,
+                t.createdAt AS thread_createdat,
+                t.name AS thread_name,
+                t.userId AS user_id,
+                t.userIdentifier AS user_identifier,
+                t.tags AS thread_tags,
+                t.metadata AS thread_metadata
+            FROM threads t
+            WHERE {" AND ".join(conditions)}
+            ORDER BY COALESCE(t.createdAt, '') DESC, t.id DESC
+            LIMIT :limit
+        """
+        user_threads = await self.execute_sql(query=threads_query, parameters=parameters)
+        if not isinstance(user_threads, list):
+            user_threads = []
+        # One extra row was fetched to tell whether another page exists
+        has_next_page = len(user_threads) > pagination.first
+        paginated_threads = await self._hydrate_threads(user_threads[: pagination.first])
         start_cursor = paginated_threads[0]["id"] if paginated_threads else None
         end_cursor = paginated_threads[-1]["id"] if paginated_threads else None
         return PaginatedResponse(
@@ -293,6 +343,49 @@ class MySqlDataLayer(BaseDataLayer, ABC):
             data=paginated_threads,
         )
 
+    async def _search_condition(self, keyword: str, parameters: Dict[str, Any]) -> str:
+        """Build the thread condition for a keyword search over step outputs.
+
+        Uses the ngram FULLTEXT index on steps.output; keywords shorter than an
+        ngram token, or databases where the index has not been migrated in, fall back to LIKE.
+        """
+        phrase = keyword.replace('"', " ").strip()
+        if len(phrase) >= 2 and await self._has_steps_fulltext():
+            parameters["search"] = f'"{phrase}"'
+            return """t.id IN (
+                SELECT s.threadId FROM steps s
+                WHERE MATCH(s.output) AGAINST(:search IN BOOLEAN MODE)
+            )"""
+        parameters["search"] = _like_pattern(keyword.lower())
+        return """EXISTS (
+            SELECT 1 FROM steps s
+            WHERE s.threadId = t.id AND LOWER(s.output) LIKE :search ESCAPE '!'
+        )"""
+
+    async def _has_steps_fulltext(self) -> bool:
+        """Check whether the FULLTEXT index exists; it is only created by the schema and migration scripts."""
+        now = time.monotonic()
+        if self._steps_fulltext_ready or (
+            self._steps_fulltext_checked_at is not None
+            and now - self._steps_fulltext_checked_at < SEARCH_INDEX_RECHECK_SECONDS
+        ):
+            return self._steps_fulltext_ready
+        self._steps_fulltext_checked_at = now
+        existing = await self.execute_sql(
+            query="""
+                SELECT 1 FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'steps' AND index_name = 'steps_output_ft'
+            """,
+            parameters={},
+        )
+        self._steps_fulltext_ready = isinstance(existing, list) and bool(existing)
+        if not self._steps_fulltext_ready:
+            logger.warn(
+                "SQLAlchemy: steps_output_ft not found, thread search falls back to LIKE; "
+                "apply migrations/002_steps_search_index_mysql.sql"
+            )
+        return self._steps_fulltext_ready
+
     ###### Steps ######
     @queue_until_user_message()
     async def create_step(self, step_dict: "StepDict"):
@@ -312,18 +405,7 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         }
         parameters["metadata"] = json.dumps(step_dict.get("metadata", {}))
         parameters["generation"] = json.dumps(step_dict.get("generation", {}))
-        columns = ", ".join(f'{key}' for key in parameters.keys())
-        values = ", ".join(f":{key}" for key in parameters.keys())
-        updates = ", ".join(
-            f'{key} = :{key}' for key in parameters.keys() if key != "id"
-        )
-        query = f"""
-            INSERT INTO steps ({columns})
-            VALUES ({values})
-            ON DUPLICATE KEY UPDATE
-            {updates};
-        """
-        await self.execute_sql(query=query, parameters=parameters)
+        self._step_buffer.add(parameters)
 
     @queue_until_user_message()
     async def update_step(self, step_dict: "StepDict"):
@@ -335,6 +417,7 @@ class MySqlDataLayer(BaseDataLayer, ABC):
     async def delete_step(self, step_id: str):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_step, step_id={step_id}")
+        await self._step_buffer.flush()
         # Delete feedbacks/elements/steps
         feedbacks_query = "DELETE FROM feedbacks WHERE forId = :id"
         elements_query = "DELETE FROM elements WHERE forId = :id"
@@ -344,6 +427,40 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         await self.execute_sql(query=elements_query, parameters=parameters)
         await self.execute_sql(query=steps_query, parameters=parameters)
 
+    async def flush_steps(self):
+        """Write buffered steps now, e.g. when the assistant message is complete."""
+        await self._step_buffer.flush()
+
+    async def close(self) -> None:
+        await self._step_buffer.close()
+        await self.engine.dispose()
+
+    async def _upsert_steps(self, rows: List[Dict[str, Any]]):
+        """Write buffered steps in one transaction, one multi-row upsert per column set."""
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+        async with self.async_session() as session:
+            async with session.begin():
+                for keys, group in groups.items():
+                    columns = ", ".join(f'{key}' for key in keys)
+                    updates = ", ".join(
+                        f'{key} = VALUES({key})' for key in keys if key != "id"
+                    )
+                    for start in range(0, len(group), STEP_UPSERT_BATCH_SIZE):
+                        values = []
+                        parameters: Dict[str, Any] = {}
+                        for i, row in enumerate(group[start : start + STEP_UPSERT_BATCH_SIZE]):
+                            values.append("(" + ", ".join(f":{key}_{i}" for key in keys) + ")")
+                            parameters.update({f"{key}_{i}": row[key] for key in keys})
+                        query = f"""
+                            INSERT INTO steps ({columns})
+                            VALUES {", ".join(values)}
+                            ON DUPLICATE KEY UPDATE
+                            {updates};
+                        """
+                        await session.execute(text(query), parameters)
+
     ###### Feedback ######
     async def upsert_feedback(self, feedback: Feedback) -> str:
         if self.show_logger:
@@ -391,24 +508,8 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         if not element.for_id:
             return
 
-        content: Optional[Union[bytes, str]] = None
-
-        if element.path:
-            async with aiofiles.open(element.path, "rb") as f:
-                content = await f.read()
-        elif element.url:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(element.url) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                    else:
-                        content = None
-        elif element.content:
-            content = element.content
-        else:
+        if not (element.path or element.url or element.content):
             raise ValueError("Element url, path or content must be provided")
-        if content is None:
-            raise ValueError("Content is None, cannot upload file")
 
         context_user = context.session.user
 
@@ -420,9 +521,7 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         if not element.mime:
             element.mime = "application/octet-stream"
 
-        uploaded_file = await self.storage_provider.upload_file(
-            object_key=file_object_key, data=content, mime=element.mime, overwrite=True
-        )
+        uploaded_file = await self._upload_element(element, file_object_key)
         if not uploaded_file:
             raise ValueError(
                 "SQLAlchemy Error: create_element, Failed to persist data in storage_provider"
@@ -439,12 +538,43 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         query = f"INSERT INTO elements ({columns}) VALUES ({placeholders})"
         await self.execute_sql(query=query, parameters=element_dict_cleaned)
 
+    async def _upload_element(self, element: "Element", object_key: str) -> Dict[str, Any]:
+        """Upload element content; paths and URLs are streamed when the storage client supports it."""
+        storage = self.storage_provider
+        if element.path and hasattr(storage, "upload_path"):
+            return await storage.upload_path(object_key=object_key, path=element.path, mime=element.mime)
+        if not element.path and element.url and hasattr(storage, "upload_url"):
+            return await storage.upload_url(object_key=object_key, url=element.url, mime=element.mime)
+
+        content: Optional[Union[bytes, str]] = None
+        if element.path:
+            async with aiofiles.open(element.path, "rb") as f:
+                content = await f.read()
+        elif element.url:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(element.url) as response:
+                    if response.status == 200:
+                        content = await response.read()
+        else:
+            content = element.content
+        if content is None:
+            raise ValueError("Content is None, cannot upload file")
+        return await storage.upload_file(
+            object_key=object_key, data=content, mime=element.mime, overwrite=True
+        )
+
     @queue_until_user_message()
     async def delete_element(self, element_id: str, thread_id: Optional[str] = None):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_element, element_id={element_id}")
         query = "DELETE FROM elements WHERE id = :id"
         parameters = {"id": element_id}
+        if self.storage_provider:
+            elements = await self.execute_sql(
+                query="""SELECT objectKey FROM elements WHERE id = :id""", parameters=parameters
+            )
+            if isinstance(elements, list) and elements and elements[0].get("objectKey"):
+                await self.storage_provider.delete_file(object_key=elements[0]["objectKey"])
         await self.execute_sql(query=query, parameters=parameters)
 
     async def delete_user_session(self, id: str) -> bool:
@@ -456,6 +586,7 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         """Fetch all user threads up to self.user_thread_limit, or one thread by id if thread_id is provided."""
         if self.show_logger:
             logger.info(f"SQLAlchemy: get_all_user_threads")
+        await self._step_buffer.flush()
         user_threads_query = """
             SELECT
                 id AS thread_id,
@@ -480,14 +611,30 @@ class MySqlDataLayer(BaseDataLayer, ABC):
         )
         if not isinstance(user_threads, list):
             return None
+        return await self._hydrate_threads(user_threads)
+
+    @staticmethod
+    def _bind_thread_ids(query: str) -> Union[str, TextClause]:
+        """Bind :thread_ids as an expanding IN parameter when the query uses it."""
+        if ":thread_ids" not in query:
+            return query
+        return text(query).bindparams(bindparam("thread_ids", expanding=True))
+
+    async def _hydrate_threads(
+            self, user_threads: List[Dict[str, Any]]
+    ) -> List[ThreadDict]:
+        """Load steps, feedbacks and elements for the given thread rows only."""
         if not user_threads:
             return []
+        thread_ids = [thread["thread_id"] for thread in user_threads]
+        if len(thread_ids) == 1:
+            # Resuming a single thread: plain equality on the (threadId, createdAt) index
+            thread_filter = "= :thread_id"
+            parameters = {"thread_id": thread_ids[0]}
         else:
-            thread_ids = (
-                    "('"
-                    + "','".join(map(str, [thread["thread_id"] for thread in user_threads]))
-                    + "')"
-            )
+            # Expanded into one bound parameter per id, see _bind_thread_ids
+            thread_filter = "IN :thread_ids"
+            parameters = {"thread_ids": thread_ids}
 
         steps_feedbacks_query = f"""
             SELECT
@@ -513,12 +660,9 @@ class MySqlDataLayer(BaseDataLayer, ABC):
                 f.value AS feedback_value,
                 f.comment AS feedback_comment
             FROM steps s LEFT JOIN feedbacks f ON s.id = f.forId
-            WHERE s.threadId IN {thread_ids}
+            WHERE s.threadId {thread_filter}
             ORDER BY s.createdAt ASC
         """
-        steps_feedbacks = await self.execute_sql(
-            query=steps_feedbacks_query, parameters={}
-        )
 
         elements_query = f"""
             SELECT
@@ -536,9 +680,16 @@ class MySqlDataLayer(BaseDataLayer, ABC):
                 e.forId AS element_forid,
                 e.mime AS element_mime
             FROM elements e
-            WHERE e.threadId IN {thread_ids}
+            WHERE e.threadId {thread_filter}
         """
-        elements = await self.execute_sql(query=elements_query, parameters={})
+        steps_feedbacks, elements = await asyncio.gather(
+            self.execute_sql(
+                query=self._bind_thread_ids(steps_feedbacks_query), parameters=parameters
+            ),
+            self.execute_sql(
+                query=self._bind_thread_ids(elements_query), parameters=parameters
+            ),
+        )
 
         thread_dicts = {}
         for thread in user_threads:
@@ -62,3 +62,10 @@ CREATE TABLE IF NOT EXISTS feedbacks (
     "value" INT NOT NULL,
     "comment" TEXT
 );
+
+CREATE INDEX IF NOT EXISTS steps_thread_created_idx ON steps ("threadId", "createdAt");
+CREATE INDEX IF NOT EXISTS elements_thread_idx ON elements ("threadId");
+CREATE INDEX IF NOT EXISTS feedbacks_for_idx ON feedbacks ("forId");
+
+CREATE INDEX IF NOT EXISTS steps_output_tsv_idx
+ON steps USING GIN (to_tsvector('simple', COALESCE("output", '')));
@@ -65,3 +65,25 @@ CREATE TABLE IF NOT EXISTS feedbacks (
     "comment" TEXT,
     FOREIGN KEY ("threadId") REFERENCES threads("id") ON DELETE CASCADE
 );
+
+CREATE INDEX IF NOT EXISTS steps_thread_created_idx ON steps ("threadId", "createdAt");
+CREATE INDEX IF NOT EXISTS elements_thread_idx ON elements ("threadId");
+CREATE INDEX IF NOT EXISTS feedbacks_for_idx ON feedbacks ("forId");
+
+-- Keyword search over step outputs (list_threads); the trigram tokenizer needs SQLite >= 3.34
+CREATE VIRTUAL TABLE IF NOT EXISTS steps_fts USING fts5(
+    "output", content='steps', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_ai AFTER INSERT ON steps BEGIN
+    INSERT INTO steps_fts(rowid, "output") VALUES (new.rowid, new."output");
+END;
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_ad AFTER DELETE ON steps BEGIN
+    INSERT INTO steps_fts(steps_fts, rowid, "output") VALUES ('delete', old.rowid, old."output");
+END;
+
+CREATE TRIGGER IF NOT EXISTS steps_fts_au AFTER UPDATE OF "output" ON steps BEGIN
+    INSERT INTO steps_fts(steps_fts, rowid, "output") VALUES ('delete', old.rowid, old."output");
+    INSERT INTO steps_fts(rowid, "output") VALUES (new.rowid, new."output");
+END;
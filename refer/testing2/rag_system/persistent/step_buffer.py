@@ -0,0 +1,112 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from chainlit.logger import logger
+
+
+class StepWriteBuffer:
+    """Write-behind buffer for chainlit steps.
+
+    create_step/update_step only merge the step columns into an in-memory dict
+    keyed by step id, so the many updates of a streamed step collapse into one
+    row. A background task hands the pending rows to ``writer`` every
+    ``flush_interval`` seconds, as soon as a step ends (``end`` is set), or when
+    ``max_size`` distinct steps are pending. Callers flush explicitly before
+    reading or deleting steps and on shutdown.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        flush_interval: float = 0.5,
+        max_size: int = 200,
+    ):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.enqueued = 0  # step updates received
+        self.coalesced = 0  # updates merged into an already pending step
+        self.written = 0  # rows written
+        self.failed = 0  # rows lost to failed writes
+        self.flushes = 0
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None or self._task.done():
+            self._event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the background task and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def add(self, row: Dict[str, Any]):
+        """Merge a step row into the buffer; later values win column by column."""
+        if self._task is None or self._task.done():
+            self.start()
+        self.enqueued += 1
+        pending = self._pending.get(row["id"])
+        if pending is None:
+            self._pending[row["id"]] = dict(row)
+        else:
+            pending.update(row)
+            self.coalesced += 1
+        if row.get("end") or len(self._pending) >= self.max_size:
+            self._event.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+            # Do not interrupt a write in progress when the task is cancelled
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write all pending steps; waits for a flush already in progress."""
+        async with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = list(self._pending.values()), {}
+            try:
+                await self.writer(rows)
+                self.written += len(rows)
+            except Exception as e:
+                if len(rows) == 1:
+                    self.failed += 1
+                    logger.error(f"Step write-behind flush failed, step {rows[0]['id']} lost: {e!r}")
+                else:
+                    # Isolate the offending rows instead of losing the whole batch
+                    logger.warning(f"Step write-behind batch of {len(rows)} failed, retrying per step: {e!r}")
+                    for row in rows:
+                        try:
+                            await self.writer([row])
+                            self.written += 1
+                        except Exception as e:
+                            self.failed += 1
+                            logger.error(f"Step write-behind flush failed, step {row['id']} lost: {e!r}")
+            self.flushes += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
@@ -1,9 +1,13 @@
+import asyncio
+import os
 from abc import abstractmethod
 from llama_index.core import VectorStoreIndex, load_index_from_storage
 from llama_index.core.indices.base import BaseIndex
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.schema import BaseNode
 from llama_index.core.storage.storage_context import DEFAULT_PERSIST_DIR, StorageContext
 from llama_index.vector_stores.milvus import MilvusVectorStore
+from rag_system.rag.incremental import MANIFEST_FILE, IndexManifest, assign_node_ids
 import rag_system.utils.settings as settings
 
 # pip install llama-index-vector-stores-milvus
@@ -13,48 +17,95 @@ class BaseRAG:
     @abstractmethod
     async def load_data(self):
         """加载数据"""
+
+    async def sync_nodes(self, manifest: IndexManifest, node_parser: NodeParser) -> tuple[list[BaseNode], list[str]]:
+        """
+        对比索引清单，只加载、切分新增或内容变化的文件
+        节点ID由文件路径和节点内容哈希确定，变化文件中内容未变的节点保持原ID，不需要重新嵌入
+        :param manifest: 索引清单，调用后更新为当前文件列表的状态
+        :param node_parser: 节点切分器
+        :return: (需要嵌入并写入的节点, 需要从向量库删除的节点ID)
+        """
+        changed, removed = manifest.diff_files(self.files)
+        stale_ids = []
+        for file in removed:
+            stale_ids.extend(manifest.node_ids(file))
+            manifest.remove(file)
+
+        # 每个文件单独加载，便于把节点对应到文件
+        results = await asyncio.gather(*(self.__class__(files=[file]).load_data() for file in changed))
+        new_nodes = []
+        for file, documents in zip(changed, results):
+            if not documents:
+                # 加载失败的文件保留原有节点，下次重新尝试
+                print(f"文件未解析出内容，跳过索引更新: {file}")
+                continue
+            nodes = node_parser.get_nodes_from_documents(documents)
+            node_hashes = assign_node_ids(file, nodes)
+            old_ids = manifest.node_ids(file)
+            stale_ids.extend(node_id for node_id in old_ids if node_id not in node_hashes)
+            new_nodes.extend(node for node in nodes if node.node_id not in old_ids)
+            manifest.update(file, node_hashes)
+
+        print(f"索引增量更新: 变化文件 {len(changed)} 个，移除文件 {len(removed)} 个，"
+              f"新增节点 {len(new_nodes)} 个，删除节点 {len(stale_ids)} 个")
+        return new_nodes, stale_ids
     async def create_local_index(self, persist_dir=DEFAULT_PERSIST_DIR) -> BaseIndex:
         """
         创建本地索引，该函数是数据嵌入的重点优化模块
         入库优化：数据清洗优化--》分块优化
         参考LLmaindex的分块策略：https://docs.llamaindex.ai/en/stable/api_reference/node_parsers/
+        已有索引时按索引清单增量更新：只嵌入新增或变化的节点，删除已移除的节点
         :param persist_dir: 本地持久化路径
         :return: BaseIndex
         """
-        # 加载数据
-        data = await self.load_data()
+        manifest = IndexManifest(os.path.join(persist_dir, MANIFEST_FILE))
         # 创建一个句子分割器
         node_splitter = SentenceSplitter.from_defaults(separator="。", chunk_size=512)
-        # 从文档中获取节点
-        nodes = node_splitter.get_nodes_from_documents(data, show_progress=True)
+        # 加载数据并获取变化的节点
+        nodes, stale_ids = await self.sync_nodes(manifest, node_splitter)
         # 创建向量存储索引，该部分需要用到嵌入模型，当前嵌入模型的设置在utils/settings.py中
-
-        index = VectorStoreIndex(nodes, show_progress=True)
-        # index = VectorStoreIndex.from_documents(data, show_progress=True)
+        if manifest.exists:
+            index = load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir))
+            if stale_ids:
+                index.delete_nodes(stale_ids, delete_from_docstore=True)
+            if nodes:
+                index.insert_nodes(nodes, show_progress=True)
+        else:
+            # 没有清单的索引无法对应节点，全量重建
+            index = VectorStoreIndex(nodes, show_progress=True)
         # 对向量数据库做持久化
         index.storage_context.persist(persist_dir=persist_dir)
+        manifest.save()
         # 返回创建的索引
         return index
 
     async def create_remote_index(self, collection_name="default") -> BaseIndex:
         """
         创建远程索引
+        集合已有索引清单时增量更新，否则重建集合
         :param collection_name: 不能包含中文
         :return:
         """
-        # 加载数据
-        data = await self.load_data()
+        manifest = IndexManifest(os.path.join(settings.configuration.index_manifest_dir, f"{collection_name}.json"))
         # 创建一个句子分割器
         node_parser = SentenceSplitter.from_defaults(chunk_size=512)
-        # 从文档中获取节点
-        nodes = node_parser.get_nodes_from_documents(data)
+        # 加载数据并获取变化的节点
+        nodes, stale_ids = await self.sync_nodes(manifest, node_parser)
         # 创建向量存储索引
         vector_store = MilvusVectorStore(
             uri=settings.configuration.milvus_uri,
-            collection_name=collection_name, dim=settings.configuration.embedding_model_dim, overwrite=True
+            collection_name=collection_name, dim=settings.configuration.embedding_model_dim,
+            overwrite=not manifest.exists
         )
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        index = VectorStoreIndex(nodes, storage_context=storage_context)
+        index = VectorStoreIndex.from_vector_store(vector_store=vector_store)
+        # Milvus插入不会覆盖相同主键，先删除再插入实现upsert
+        delete_ids = stale_ids + [node.node_id for node in nodes] if manifest.exists else []
+        if delete_ids:
+            vector_store.delete_nodes(node_ids=delete_ids)
+        if nodes:
+            index.insert_nodes(nodes)
+        manifest.save()
 
         return index
 
@@ -3,9 +3,19 @@ from vanna.milvus import Milvus_VectorStore
 from vanna.openai import OpenAI_Chat
 from rag_system.utils import settings
 from vanna.deepseek import DeepSeekChat
+from rag_system.rag.sql_cache import QueryResultCache, SQLGenerationCache
 
 class DQuestionMilvus(Milvus_VectorStore, OpenAI_Chat):
+    # connect_to_* 赋值的数据库执行函数，见 run_sql
+    _run_sql = None
+
     def __init__(self, config=None):
+        # 问题 -> SQL 的两级缓存，以及 run_sql 的结果缓存
+        self.sql_cache = SQLGenerationCache(max_entries=settings.configuration.sql_cache_max_entries,
+                                            ttl=settings.configuration.sql_cache_ttl,
+                                            similarity_threshold=settings.configuration.sql_cache_similarity)
+        self.result_cache = QueryResultCache(ttl=settings.configuration.run_sql_cache_ttl,
+                                             max_entries=settings.configuration.run_sql_cache_max_entries)
         if config is None:
             milvus_client = MilvusClient(uri=settings.configuration.milvus_uri)
             config = {'model': settings.configuration.llm_model_name,
@@ -17,6 +27,71 @@ class DQuestionMilvus(Milvus_VectorStore, OpenAI_Chat):
         Milvus_VectorStore.__init__(self, config=config)
         OpenAI_Chat.__init__(self, client=settings.openai_llm(), config=config)
 
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs) -> str:
+        """
+        先查精确缓存和语义缓存，未命中时再走向量检索 + LLM 生成，生成的合法SQL写入缓存
+        """
+        version = self.sql_cache.version
+        sql = self.sql_cache.get_exact(question)
+        if sql is not None:
+            return sql
+        embedding = None
+        if self.sql_cache.semantic_enabled:
+            embedding = self.embedding_function.encode_queries([question])[0]
+            hit = self.sql_cache.get_semantic(question, embedding)
+            if hit is not None:
+                return hit[0]
+        sql = super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+        if sql and self.is_sql_valid(sql):
+            self.sql_cache.put(question, sql, version, embedding)
+        return sql
+
+    # 训练数据变化后，已缓存的SQL可能不再正确，递增版本号使其失效
+    def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
+        id = super().add_question_sql(question, sql, **kwargs)
+        self.sql_cache.bump_version()
+        return id
+
+    def add_ddl(self, ddl: str, **kwargs) -> str:
+        id = super().add_ddl(ddl, **kwargs)
+        self.sql_cache.bump_version()
+        return id
+
+    def add_documentation(self, documentation: str, **kwargs) -> str:
+        id = super().add_documentation(documentation, **kwargs)
+        self.sql_cache.bump_version()
+        return id
+
+    def remove_training_data(self, id: str, **kwargs) -> bool:
+        removed = super().remove_training_data(id, **kwargs)
+        self.sql_cache.bump_version()
+        return removed
+
+    @property
+    def run_sql(self):
+        """
+        带结果缓存的 run_sql。Vanna 的 connect_to_* 通过 self.run_sql = ... 设置数据库执行函数，
+        由 setter 保存到 _run_sql
+        """
+        return self._cached_run_sql
+
+    @run_sql.setter
+    def run_sql(self, func):
+        self._run_sql = func
+
+    def _cached_run_sql(self, sql: str, **kwargs):
+        if self._run_sql is None:
+            raise Exception("请先调用 connect_to_* 连接数据库")
+        if not self.result_cache.cacheable(sql):
+            # 写操作可能改变数据，清空已缓存的结果
+            self.result_cache.clear()
+            return self._run_sql(sql, **kwargs)
+        df = self.result_cache.get(sql)
+        if df is None:
+            df = self._run_sql(sql, **kwargs)
+            self.result_cache.put(sql, df)
+        return df
+
 
 class SQLiteDatabase(DQuestionMilvus):
     def __init__(self, **kwargs):
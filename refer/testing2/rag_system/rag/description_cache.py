@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from PIL import Image
+
+# 感知哈希按位切分的段数。汉明距离不超过 PHASH_BANDS-1 的两个哈希至少有一段完全相同，
+# 因此近似查找只需比较与查询哈希有相同分段的候选
+PHASH_BANDS = 5
+
+
+def image_dhash(file_path, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的差异哈希（dHash），用于识别近似重复的图片（缩放、轻微压缩等）
+    :return: 64位整数哈希，图片无法解析时返回None
+    """
+    try:
+        with Image.open(file_path) as img:
+            img = img.convert("L").resize((hash_size + 1, hash_size))
+            pixels = list(img.getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    # SQLite的INTEGER为有符号64位
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+
+def _phash_bands(phash: int) -> List[int]:
+    """将64位哈希切分为PHASH_BANDS段，返回各段的值"""
+    value = phash & ((1 << 64) - 1)
+    width = -(-64 // PHASH_BANDS)
+    return [(value >> (band * width)) & ((1 << width) - 1) for band in range(PHASH_BANDS)]
+
+
+class DescriptionCache:
+    """
+    图片/表格描述的持久化缓存
+
+    缓存键由 图片内容SHA256 + 模型名称 + 提示词 组成，默认只有内容完全相同的图片才会命中。
+    感知哈希匹配需显式开启：开启后内容不同但dHash足够接近的图片（同一logo、页眉图片的不同导出版本）
+    也会复用描述，但近乎空白的图片、版式相同的图表同样可能被判为近似，只适合图片以logo、截图为主的文档。
+    近似查找通过分段索引完成，不扫描全部条目。缓存保存在SQLite文件中，按最近访问时间淘汰，
+    总大小不超过max_bytes。
+
+    get/put 为同步方法，在事件循环中应使用 aget/aput，在线程中完成文件哈希和SQLite读写。
+    """
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024,
+                 use_perceptual_hash: bool = False, max_hamming_distance: int = 4):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.use_perceptual_hash = use_perceptual_hash
+        self.max_hamming_distance = max_hamming_distance
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS descriptions (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                phash INTEGER,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_descriptions_scope ON descriptions (scope, phash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_descriptions_access ON descriptions (last_access)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS description_phash_bands (
+                scope TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (scope, band, value, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_phash_bands_key ON description_phash_bands (key)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_scope(model: str, prompt: str) -> str:
+        """模型名称 + 提示词的摘要，不同模型或提示词的描述互不复用"""
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_sha256(file_path) -> str:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def get(self, file_path, model: str, prompt: str, perceptual: bool = True) -> Optional[Any]:
+        """
+        查询缓存，先按内容哈希精确匹配，开启感知哈希时再查找近似图片
+        :param perceptual: 是否允许近似匹配；表格等内容敏感的图片应关闭
+        :return: 缓存的描述，未命中返回None
+        """
+        scope = self.make_scope(model, prompt)
+        key = f"{scope}:{self.file_sha256(file_path)}"
+        phash = None
+        if perceptual and self.use_perceptual_hash:
+            phash = image_dhash(file_path)
+        with self._lock:
+            row = self._conn.execute("SELECT key, value FROM descriptions WHERE key = ?", (key,)).fetchone()
+            if row is None and phash is not None:
+                row = self._find_similar(scope, phash)
+                if row is not None:
+                    self.perceptual_hits += 1
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE descriptions SET last_access = ? WHERE key = ?", (time.time(), row[0]))
+            self._conn.commit()
+            return json.loads(row[1])
+
+    def _find_similar(self, scope: str, phash: int) -> Optional[tuple]:
+        """查找汉明距离不超过max_hamming_distance的条目，返回 (key, value)"""
+        if self.max_hamming_distance < PHASH_BANDS:
+            # 只比较至少有一段相同的候选
+            conditions = " OR ".join(["(b.band = ? AND b.value = ?)"] * PHASH_BANDS)
+            params = [scope]
+            for band, value in enumerate(_phash_bands(phash)):
+                params += [band, value]
+            candidates = self._conn.execute(
+                f"SELECT DISTINCT d.key, d.phash, d.value FROM description_phash_bands b "
+                f"JOIN descriptions d ON d.key = b.key WHERE b.scope = ? AND ({conditions})", params)
+        else:
+            candidates = self._conn.execute(
+                "SELECT key, phash, value FROM descriptions WHERE scope = ? AND phash IS NOT NULL", (scope,))
+        for candidate_key, candidate_hash, value in candidates:
+            if _hamming(phash, candidate_hash) <= self.max_hamming_distance:
+                return candidate_key, value
+        return None
+
+    def put(self, file_path, model: str, prompt: str, value: Any) -> None:
+        """写入缓存并按LRU淘汰超出大小上限的条目"""
+        scope = self.make_scope(model, prompt)
+        key = f"{scope}:{self.file_sha256(file_path)}"
+        phash = image_dhash(file_path) if self.use_perceptual_hash else None
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8")) + len(key)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO descriptions (key, scope, phash, value, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, phash, data, size, time.time())
+            )
+            self._conn.execute("DELETE FROM description_phash_bands WHERE key = ?", (key,))
+            if phash is not None:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO description_phash_bands (scope, band, value, key) VALUES (?, ?, ?, ?)",
+                    [(scope, band, band_value, key) for band, band_value in enumerate(_phash_bands(phash))]
+                )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM descriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM descriptions ORDER BY last_access").fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM descriptions WHERE key = ?", expired)
+        self._conn.executemany("DELETE FROM description_phash_bands WHERE key = ?", expired)
+
+    async def aget(self, file_path, model: str, prompt: str, perceptual: bool = True) -> Optional[Any]:
+        """get的异步版本，文件哈希和SQLite查询在线程中执行，不阻塞事件循环"""
+        return await asyncio.to_thread(self.get, file_path, model, prompt, perceptual)
+
+    async def aput(self, file_path, model: str, prompt: str, value: Any) -> None:
+        """put的异步版本"""
+        await asyncio.to_thread(self.put, file_path, model, prompt, value)
+
+    def stats(self) -> dict:
+        """命中/未命中统计及当前缓存大小"""
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM descriptions").fetchone()
+        return {
+            "hits": self.hits,
+            "perceptual_hits": self.perceptual_hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total,
+        }
@@ -1,12 +1,16 @@
+import asyncio
+import hashlib
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 import fitz
 from llama_index.core import SimpleDirectoryReader, Document
-from llama_index.core.async_utils import run_jobs
 
 from rag_system.rag.base import BaseRAG
 import rag_system.rag.utils as utils
+import rag_system.utils.settings as settings
 # pip install pymupdf
 
 class DocumentRAGV1(BaseRAG):
@@ -34,7 +38,23 @@ class DocumentRAGV1(BaseRAG):
 
 class DocumentRAGV2(BaseRAG):
     @staticmethod
-    def parse_all_tables(filename, page, pagenum, text_blocks, ongoing_tables):
+    def reference_dir(kind, pdf_file):
+        """
+        表格/图像引用文件的保存目录，每个源文件单独一个目录。
+        多个PDF并发处理时，同页码的表格、图像不会互相覆盖，模型描述也不会对应到其他文档。
+
+        :param kind: table_references 或 image_references
+        :param pdf_file: PDF 文件路径
+        :return: 已创建的目录路径
+        """
+        stem = os.path.splitext(os.path.basename(pdf_file))[0]
+        path_hash = hashlib.sha1(os.path.abspath(pdf_file).encode("utf-8")).hexdigest()[:8]
+        ref_dir = os.path.join(os.getcwd(), "vectorstore", kind, f"{stem}-{path_hash}")
+        os.makedirs(ref_dir, exist_ok=True)
+        return ref_dir
+
+    @staticmethod
+    def parse_all_tables(filename, page, pagenum, text_blocks, ongoing_tables, ref_dir=None):
         """
         从PDF页面中提取表格并处理成文档。
         该函数在给定的PDF页面上识别表格，将表格转换为pandas DataFrame，并将其保存为Excel文件，
@@ -47,9 +67,10 @@ class DocumentRAGV2(BaseRAG):
         - pagenum: 页面编号。
         - text_blocks: 页面上的文本块列表。
         - ongoing_tables: 正在处理的表格列表。
+        - ref_dir: 表格文件的保存目录，默认为 reference_dir("table_references", filename)。
 
         返回值:
-        - table_docs: 包含所有表格文档的列表。
+        - table_docs: 待描述的表格列表（表格内容和解释由build_table_doc在模型调用后补全）。
         - table_bboxes: 包含所有表格边界框的列表。
         - ongoing_tables: 更新后的正在处理的表格列表。
         """
@@ -64,9 +85,8 @@ class DocumentRAGV2(BaseRAG):
                     # 将表格转换为pandas DataFrame
                     pandas_df = tab.to_pandas()
 
-                    # 创建存储表格引用的目录
-                    tablerefdir = os.path.join(os.getcwd(), "vectorstore/table_references")
-                    os.makedirs(tablerefdir, exist_ok=True)
+                    # 存储表格引用的目录
+                    tablerefdir = ref_dir or DocumentRAGV2.reference_dir("table_references", filename)
 
                     # 保存表格为Excel文件
                     df_xlsx_path = os.path.join(tablerefdir, f"table{len(table_docs)+1}-page{pagenum}.xlsx")
@@ -83,8 +103,6 @@ class DocumentRAGV2(BaseRAG):
                     table_img = page.get_pixmap(clip=bbox)
                     table_img_path = os.path.join(tablerefdir, f"table{len(table_docs)+1}-page{pagenum}.jpg")
                     table_img.save(table_img_path)
-                    # 获取表格内容及描述
-                    content, description = utils.process_table(table_img_path)
                     # 构建表格的标题
                     caption = before_text.replace("\n", " ") + " ".join(tab.header.names) + after_text.replace("\n", " ")
 
@@ -98,11 +116,10 @@ class DocumentRAGV2(BaseRAG):
                         "page_num": pagenum
                     }
                     # 获取所有列名
-                    all_cols = ", ".join(list(pandas_df.columns.values))
+                    all_cols = ", ".join(str(col) for col in pandas_df.columns.values)
 
-                    # 构建文档对象
-                    doc = Document(text=f"这是一个表格，标题是: {caption}\n表格的内容是：{content}\n表格的列名是： {all_cols}\n表格的解释是：{description}", metadata=table_metadata)
-                    table_docs.append(doc)
+                    # 表格内容及描述需要调用模型，这里只记录待处理的表格
+                    table_docs.append({"caption": caption, "columns": all_cols, "metadata": table_metadata})
         except Exception as e:
             # 处理表格提取过程中出现的异常
             print(f"Error during table extraction: {e}")
@@ -110,7 +127,13 @@ class DocumentRAGV2(BaseRAG):
         return table_docs, table_bboxes, ongoing_tables
 
     @staticmethod
-    def parse_all_images(filename, page, pagenum, text_blocks):
+    async def build_table_doc(table):
+        """调用模型获取表格内容及描述，构建表格文档"""
+        content, description = await utils.aprocess_table(table["metadata"]["image"])
+        return Document(text=f"这是一个表格，标题是: {table['caption']}\n表格的内容是：{content}\n表格的列名是： {table['columns']}\n表格的解释是：{description}", metadata=table["metadata"])
+
+    @staticmethod
+    def parse_all_images(filename, page, pagenum, text_blocks, ref_dir=None):
         """
         从PDF页面中提取所有图像，并生成包含图像及其元数据的文档列表。
 
@@ -119,8 +142,9 @@ class DocumentRAGV2(BaseRAG):
         - page (fitz.Page): 当前处理的PDF页面对象。
         - pagenum (int): 页面编号。
         - text_blocks (list): 页面上的文本块列表。
+        - ref_dir (str): 图像文件的保存目录，默认为 reference_dir("image_references", filename)。
         返回:
-        - image_docs (list): 包含提取的图像及其元数据的文档列表。
+        - image_docs (list): 待描述的图像列表（图像描述由build_image_doc在模型调用后补全）。
         """
 
         image_docs = []  # 初始化存储图像文档的列表
@@ -140,8 +164,7 @@ class DocumentRAGV2(BaseRAG):
 
             extracted_image = page.parent.extract_image(xref)  # 提取图像数据
             image_data = extracted_image["image"]  # 获取图像的二进制数据
-            imgrefpath = os.path.join(os.getcwd(), "vectorstore/image_references")  # 图像保存路径
-            os.makedirs(imgrefpath, exist_ok=True)  # 创建保存路径目录
+            imgrefpath = ref_dir or DocumentRAGV2.reference_dir("image_references", filename)  # 图像保存路径
             image_path = os.path.join(imgrefpath, f"image{xref}-page{pagenum}.png")  # 图像文件名
 
             # 图片上传到minio 文件服务器
@@ -149,8 +172,6 @@ class DocumentRAGV2(BaseRAG):
                 img_file.write(image_data)  # 将图像数据写入文件
 
             before_text, after_text = utils.extract_text_around_item(text_blocks, img_bbox, page.rect.height)  # 获取图像周围的文本
-            # 1、可以借助多模态模型进行图像描述，2、借助orc识别描述，3、尝试多维度描述该图片
-            image_description = utils.describe_image(image_path)
             caption = before_text.replace("\n", " ")
 
             image_metadata = {
@@ -160,35 +181,34 @@ class DocumentRAGV2(BaseRAG):
                 "type": "image",  # 图像类型
                 "page_num": pagenum  # 图像所在页码
             }
-            image_docs.append(Document(text="这是一张图像，标题是： " + caption + f"\n图像的描述是：{before_text}\n" + image_description + f"\n{after_text}", metadata=image_metadata))  # 添加图像文档到列表
+            image_docs.append({"caption": caption, "before_text": before_text, "after_text": after_text, "metadata": image_metadata})
 
-        return image_docs  # 返回包含图像及其元数据的文档列表
+        return image_docs  # 返回待描述的图像列表
 
     @staticmethod
-    def process_pdf_file(pdf_file):
-        """
-        处理 PDF 文件并提取文本、表格和图像。
-        该函数读取一个 PDF 文件，从每一页中提取所有文本块、表格和图像，并将它们作为 Document 对象列表返回。
-        它会避免提取页面的页眉和页脚。
+    async def build_image_doc(image):
+        """调用多模态模型描述图像，构建图像文档"""
+        # 1、可以借助多模态模型进行图像描述，2、借助orc识别描述，3、尝试多维度描述该图片
+        image_description = await utils.adescribe_image(image["metadata"]["image"])
+        return Document(text="这是一张图像，标题是： " + image["caption"] + f"\n图像的描述是：{image['before_text']}\n" + image_description + f"\n{image['after_text']}", metadata=image["metadata"])
 
-        :param pdf_file: 表示要处理的 PDF 文件的文件对象。
-        :return: 包含提取信息的 Document 对象列表。
+    @staticmethod
+    def extract_pdf_pages(pdf_file, page_numbers):
         """
-        # 初始化一个列表来存储所有提取的 Document 对象
-        all_pdf_documents = []
-        # 初始化一个字典来跟踪跨页的持续表格
-        ongoing_tables = {}
-
-        # 尝试打开 PDF 文件
-        try:
-            f = fitz.open(filename=pdf_file, filetype="pdf")
-        except Exception as e:
-            print(f"pdf文件打开发生错误: {e}")
-            return []
+        解析 PDF 的指定页面，提取文本块、表格和图像（不调用模型）。
+        该函数在进程池中执行，返回可序列化的页面解析结果，会避免提取页面的页眉和页脚。
 
+        :param pdf_file: PDF 文件路径。
+        :param page_numbers: 需要解析的页码列表。
+        :return: [(页码, 表格列表, 图像列表, 文本 Document 列表)]
+        """
+        results = []
+        f = fitz.open(filename=pdf_file, filetype="pdf")
         file_name = os.path.basename(pdf_file)
-        # 遍历 PDF 的每一页
-        for i in range(len(f)):
+        table_dir = DocumentRAGV2.reference_dir("table_references", pdf_file)
+        image_dir = DocumentRAGV2.reference_dir("image_references", pdf_file)
+        ongoing_tables = {}
+        for i in page_numbers:
             page = f[i]
             # 从页面中提取文本块，排除可能的页眉和页脚
             text_blocks = [block for block in page.get_text("blocks", sort=True)
@@ -197,14 +217,14 @@ class DocumentRAGV2(BaseRAG):
             grouped_text_blocks = utils.process_text_blocks(text_blocks)
 
             # 从页面中解析表格，必要时更新持续表格
-            table_docs, table_bboxes, ongoing_tables = DocumentRAGV2.parse_all_tables(file_name, page, i, text_blocks, ongoing_tables)
-            all_pdf_documents.extend(table_docs)
+            tables, table_bboxes, ongoing_tables = DocumentRAGV2.parse_all_tables(file_name, page, i, text_blocks, ongoing_tables,
+                                                                                 ref_dir=table_dir)
 
             # 从页面中解析图像
-            image_docs = DocumentRAGV2.parse_all_images(file_name, page, i, text_blocks)
-            all_pdf_documents.extend(image_docs)
+            images = DocumentRAGV2.parse_all_images(file_name, page, i, text_blocks, ref_dir=image_dir)
 
             # 遍历组织后的文本块
+            text_docs = []
             for text_block_ctr, (heading_block, content) in enumerate(grouped_text_blocks, 1):
                 heading_bbox = fitz.Rect(heading_block[:4])
                 # 检查标题框是否与任何表格框相交
@@ -221,14 +241,59 @@ class DocumentRAGV2(BaseRAG):
                         },
                         id_=f"{file_name[:-4]}-page{i}-block{text_block_ctr}"
                     )
-                    all_pdf_documents.append(text_doc)
+                    text_docs.append(text_doc)
+            results.append((i, tables, images, text_docs))
 
         # 关闭 PDF 文件
         f.close()
-        return all_pdf_documents
+        return results
 
     @staticmethod
-    def process_ppt_file(ppt_file):
+    async def process_pdf_file(pdf_file, pages_per_task: int = 8):
+        """
+        处理 PDF 文件并提取文本、表格和图像。
+        页面渲染与表格/图像检测分批在进程池中并行执行，表格和图像的模型调用通过异步客户端并发执行
+        （并发数、速率和重试由 utils.model_limiter 控制），最后按页码顺序重新组装。
+
+        :param pdf_file: 表示要处理的 PDF 文件的路径。
+        :param pages_per_task: 每个进程池任务解析的页数。
+        :return: 包含提取信息的 Document 对象列表。
+        """
+        # 尝试打开 PDF 文件获取页数
+        try:
+            with fitz.open(filename=pdf_file, filetype="pdf") as f:
+                page_count = len(f)
+        except Exception as e:
+            print(f"pdf文件打开发生错误: {e}")
+            return []
+
+        # 将页面分批提交到进程池
+        loop = asyncio.get_running_loop()
+        executor = get_pdf_executor()
+        batch_size = max(1, min(pages_per_task, math.ceil(page_count / settings.configuration.pdf_process_workers)))
+        batches = [list(range(start, min(start + batch_size, page_count))) for start in range(0, page_count, batch_size)]
+        batch_results = await asyncio.gather(*[
+            loop.run_in_executor(executor, DocumentRAGV2.extract_pdf_pages, pdf_file, batch) for batch in batches
+        ])
+
+        async def build_page(tables, images, text_docs):
+            table_docs = await asyncio.gather(*[DocumentRAGV2.build_table_doc(table) for table in tables], return_exceptions=True)
+            image_docs = await asyncio.gather(*[DocumentRAGV2.build_image_doc(image) for image in images], return_exceptions=True)
+            page_docs = []
+            for doc in [*table_docs, *image_docs]:
+                if isinstance(doc, Exception):
+                    print(f"表格/图像描述失败: {doc}")
+                else:
+                    page_docs.append(doc)
+            return page_docs + text_docs
+
+        # 所有页面的模型调用并发执行，gather保证结果按页码顺序返回
+        pages = [page for batch in batch_results for page in batch]
+        page_docs = await asyncio.gather(*[build_page(tables, images, text_docs) for _, tables, images, text_docs in pages])
+        return [doc for docs in page_docs for doc in docs]
+
+    @staticmethod
+    async def process_ppt_file(ppt_file):
         """
         处理PowerPoint文件。
         参数:
@@ -238,22 +303,24 @@ class DocumentRAGV2(BaseRAG):
         - list: 包含处理后的数据列表，每个元素是一个Document对象。
         """
         # 将PPT文件转换为PDF文件
-        pdf_path = utils.convert_ppt_to_pdf(ppt_file)
+        pdf_path = await asyncio.to_thread(utils.convert_ppt_to_pdf, ppt_file)
 
         # 将PDF文件的每一页转换为图像
-        images_data = utils.convert_pdf_to_images(pdf_path)
+        images_data = await asyncio.to_thread(utils.convert_pdf_to_images, pdf_path)
 
         # 从PPT文件中提取每张幻灯片的文本和备注
         slide_texts = utils.extract_text_and_notes_from_ppt(ppt_file)
 
+        # 并发描述所有幻灯片图像
+        descriptions = await asyncio.gather(*[utils.adescribe_image(image_path) for image_path, _ in images_data])
+
         processed_data = []
 
         # 遍历每张幻灯片的图像和文本信息
-        for (image_path, page_num), (slide_text, notes) in zip(images_data, slide_texts):
+        for (image_path, page_num), (slide_text, notes), image_description in zip(images_data, slide_texts, descriptions):
             if notes:
                 notes = "\n\nThe speaker notes for this slide are: " + notes
 
-            image_description = utils.describe_image(image_path)
             # 构建图像元数据
             image_metadata = {
                 "source": f"{os.path.basename(ppt_file)}",
@@ -270,46 +337,44 @@ class DocumentRAGV2(BaseRAG):
 
     async def load_data(self) -> list[Document]:
         """Load and process multiple file types."""
-        documents = []
         tasks = []
         for file_path in self.files:
             file_name = os.path.basename(file_path)
             file_extension = os.path.splitext(file_name.lower())[1]
             if file_extension in ('.png', '.jpg', '.jpeg'):
-                async def process_image(image_path):
+                async def process_image(image_path, file_name=file_name):
                     # 借助多模态大模型获取图片的解读
                     # 建议多维度描述该图片，可以尝试多次调用
-                    image_text = utils.describe_image(image_path)
-                    doc = Document(text=image_text, metadata={"source": file_name, "type": "image", "image": image_path})
-                    documents.append(doc)
-                task = process_image(file_path)
-                tasks.append(task)
+                    image_text = await utils.adescribe_image(image_path)
+                    return [Document(text=image_text, metadata={"source": file_name, "type": "image", "image": image_path})]
+                tasks.append(process_image(file_path))
             elif file_extension == '.pdf':
-                try:
-                    async def process_pdf(pdf_path):
-                        pdf_documents = DocumentRAGV2.process_pdf_file(pdf_path)
-                        documents.extend(pdf_documents)
-                    task = process_pdf(file_path)
-                    tasks.append(task)
-                except Exception as e:
-                    print(f"Error processing PDF {file_name}: {e}")
+                tasks.append(DocumentRAGV2.process_pdf_file(file_path))
             elif file_extension in ('.ppt', '.pptx'):
-                try:
-                    async def process_ppt(ppt_path):
-                        ppt_documents = DocumentRAGV2.process_ppt_file(utils.save_uploaded_file(ppt_path))
-                        documents.extend(ppt_documents)
-                    task = process_ppt(file_path)
-                    tasks.append(task)
-                except Exception as e:
-                    print(f"Error processing PPT {file_name}: {e}")
+                tasks.append(DocumentRAGV2.process_ppt_file(utils.save_uploaded_file(file_path)))
             else:
-                async def process_text():
+                async def process_text(file_path=file_path):
                     with open(file_path, "rb") as file:
                         text = file.read().decode("utf-8")
-                        doc = Document(text=text, metadata={"source": file.name, "type": "text"})
-                        documents.append(doc)
-                task = process_text()
-                tasks.append(task)
-        # await asyncio.gather(*tasks)
-        await run_jobs(tasks, show_progress=True, workers=3)
+                        return [Document(text=text, metadata={"source": file.name, "type": "text"})]
+                tasks.append(process_text())
+        # 模型调用的并发由utils.model_limiter统一限制，这里所有文件同时处理，结果按文件顺序组装
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        documents = []
+        for file_path, result in zip(self.files, results):
+            if isinstance(result, Exception):
+                print(f"Error processing {os.path.basename(file_path)}: {result}")
+                continue
+            documents.extend(result)
         return documents
+
+
+_pdf_executor = None
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """获取PDF页面解析共享的进程池"""
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(max_workers=settings.configuration.pdf_process_workers)
+    return _pdf_executor
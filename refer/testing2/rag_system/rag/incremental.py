@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+from llama_index.core.schema import BaseNode, MetadataMode, RelatedNodeInfo
+
+MANIFEST_FILE = "index_manifest.json"
+
+
+def file_sha256(file_path) -> str:
+    """分块计算文件内容的SHA256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def node_sha256(node: BaseNode) -> str:
+    """节点参与嵌入的内容（文本 + 嵌入元数据）的哈希，内容不变则向量不变"""
+    return hashlib.sha256(node.get_content(metadata_mode=MetadataMode.EMBED).encode("utf-8")).hexdigest()
+
+
+def assign_node_ids(file_path: str, nodes: List[BaseNode]) -> Dict[str, str]:
+    """
+    根据 文件路径 + 节点内容哈希 为节点生成确定性的ID，并修正节点之间的前后关系
+    同一文件中内容相同的分块按出现顺序区分
+    :return: {节点ID: 节点哈希}
+    """
+    hashes = {}
+    id_mapping = {}
+    occurrences = {}
+    for node in nodes:
+        node_hash = node_sha256(node)
+        occurrence = occurrences.get(node_hash, 0)
+        occurrences[node_hash] = occurrence + 1
+        node_id = hashlib.sha256(f"{file_path}\n{node_hash}\n{occurrence}".encode("utf-8")).hexdigest()
+        id_mapping[node.node_id] = node_id
+        node.id_ = node_id
+        hashes[node_id] = node_hash
+    for node in nodes:
+        for relation, info in node.relationships.items():
+            if isinstance(info, RelatedNodeInfo) and info.node_id in id_mapping:
+                info.node_id = id_mapping[info.node_id]
+    return hashes
+
+
+class IndexManifest:
+    """
+    索引清单，记录索引中每个文件的内容哈希及其节点ID/节点哈希，用于增量更新索引
+    {"files": {文件路径: {"hash": 文件哈希, "nodes": {节点ID: 节点哈希}}}}
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        self._file_hashes: Dict[str, str] = {}
+        self.exists = os.path.exists(path)
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def diff_files(self, files: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        对比当前文件列表与清单
+        :return: (新增或内容变化的文件, 已移除的文件)
+        """
+        self._file_hashes = {file: file_sha256(file) for file in files}
+        changed = [file for file in files
+                   if self.files.get(file, {}).get("hash") != self._file_hashes[file]]
+        removed = [file for file in self.files if file not in files]
+        return changed, removed
+
+    def node_ids(self, file_path: str) -> Dict[str, str]:
+        return self.files.get(file_path, {}).get("nodes", {})
+
+    def update(self, file_path: str, node_hashes: Dict[str, str]) -> None:
+        file_hash = self._file_hashes.get(file_path) or file_sha256(file_path)
+        self.files[file_path] = {"hash": file_hash, "nodes": node_hashes}
+
+    def remove(self, file_path: str) -> None:
+        self.files.pop(file_path, None)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,211 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rag_system.utils.embedding_cache import normalize_text
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.。？！]+$")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_READ_ONLY_SQL = re.compile(r"^\s*(select|with|show|describe|desc|explain|pragma)\b", re.IGNORECASE)
+# 只读开头的语句仍可能写数据：WITH ... DELETE/UPDATE（可写CTE）、SELECT ... INTO、多条语句中夹带的写操作
+_WRITE_KEYWORD = re.compile(r"\b(insert|update|delete|merge|into|create|drop|alter|truncate)\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize_question(question: str) -> str:
+    """
+    规范化问题：NFKC归一化、合并空白、转小写、去掉结尾标点
+
+    :param question: 原始问题
+    :return: 规范化后的问题
+    """
+    return _TRAILING_PUNCTUATION.sub("", normalize_text(question).lower())
+
+
+class SQLGenerationCache:
+    """
+    text-to-SQL 两级缓存
+
+    - 精确缓存：规范化后的问题 -> SQL，命中时不需要嵌入、检索和LLM调用
+    - 语义缓存：问题向量与已缓存问题的余弦相似度不低于阈值、且问题中的数字完全一致时复用其SQL，
+      数字检查用于避免“2023年销量”复用“2024年销量”的SQL
+
+    条目记录生成时的训练数据版本，train / remove_training_data 后版本号递增，旧条目全部失效；
+    生成期间版本发生变化的结果不会写入缓存。版本号只在本进程内递增，多进程部署时其他进程最迟在TTL后刷新。
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl: float = 86400, similarity_threshold: float = 0.97):
+        """
+        :param max_entries: 最大缓存条数，超出时淘汰最久未使用的条目
+        :param ttl: 条目有效期（秒）
+        :param similarity_threshold: 语义缓存的相似度阈值，<=0 时关闭语义缓存
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.version = 0
+        # 规范化问题 -> (版本, 过期时间, 单位化向量或None, SQL)
+        self._entries: "OrderedDict[str, Tuple[int, float, Optional[np.ndarray], str]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # 带向量条目的向量矩阵，按需重建
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def bump_version(self):
+        """训练数据变化时调用，使所有条目失效"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._matrix = None
+
+    def get_exact(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == self.version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[3]
+            if not self.semantic_enabled:
+                self.misses += 1
+        return None
+
+    def get_semantic(self, question: str, embedding: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        查找语义相近的已缓存问题
+
+        :param question: 原始问题
+        :param embedding: 问题向量
+        :return: (SQL, 相似度)，未命中时返回 None
+        """
+        numbers = _NUMBER.findall(normalize_question(question))
+        query = _unit(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._matrix_keys:
+                self.misses += 1
+                return None
+            scores = self._matrix @ query
+            now = time.monotonic()
+            for index in np.argsort(-scores):
+                score = float(scores[index])
+                if score < self.similarity_threshold:
+                    break
+                key = self._matrix_keys[index]
+                entry = self._entries.get(key)
+                if not entry or entry[0] != self.version or entry[1] <= now:
+                    continue
+                if _NUMBER.findall(key) != numbers:
+                    continue
+                self._entries.move_to_end(key)
+                self.semantic_hits += 1
+                return entry[3], score
+            self.misses += 1
+            return None
+
+    def put(self, question: str, sql: str, version: int, embedding: Optional[np.ndarray] = None):
+        """
+        写入缓存
+
+        :param question: 原始问题
+        :param sql: 生成的SQL
+        :param version: 开始生成时的训练数据版本，与当前版本不一致时丢弃
+        :param embedding: 问题向量，为 None 时只写入精确缓存
+        """
+        key = normalize_question(question)
+        vector = _unit(embedding) if embedding is not None else None
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (version, time.monotonic() + self.ttl, vector, sql)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _rebuild_matrix(self):
+        keys = [key for key, entry in self._entries.items() if entry[2] is not None]
+        self._matrix_keys = keys
+        self._matrix = np.stack([self._entries[key][2] for key in keys]) if keys else np.empty((0, 0))
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
+
+
+class QueryResultCache:
+    """
+    run_sql 结果的短期缓存，键为去掉首尾空白的SQL原文
+
+    不做NFKC归一化或合并空白：字符串字面量中的全角字符、连续空格会改变查询结果。
+    只缓存只读语句的结果；执行其他语句时清空缓存，避免读到自己刚修改前的数据。
+    返回的是副本，调用方修改DataFrame不会影响缓存。
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 128, max_rows: int = 10000):
+        """
+        :param ttl: 结果有效期（秒），<=0 时关闭缓存
+        :param max_entries: 最大缓存条数
+        :param max_rows: 超过该行数的结果不缓存
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._results: "OrderedDict[str, Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cacheable(sql: str) -> bool:
+        """以只读关键字开头，且去掉字符串字面量后不含写操作关键字"""
+        return bool(_READ_ONLY_SQL.match(sql)) and not _WRITE_KEYWORD.search(_STRING_LITERAL.sub("''", sql))
+
+    def get(self, sql: str) -> Optional[pd.DataFrame]:
+        if self.ttl <= 0:
+            return None
+        key = sql.strip()
+        with self._lock:
+            entry = self._results.get(key)
+            if not entry:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry[1].copy()
+
+    def put(self, sql: str, df: pd.DataFrame):
+        if self.ttl <= 0 or not isinstance(df, pd.DataFrame) or len(df) > self.max_rows:
+            return
+        key = sql.strip()
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, df.copy())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
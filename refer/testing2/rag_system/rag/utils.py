@@ -1,6 +1,9 @@
+import asyncio
 import base64
 import os
+import random
 import subprocess
+import time
 from io import BytesIO
 from pathlib import Path
 
@@ -9,6 +12,19 @@ from PIL import Image
 from pptx import Presentation
 
 import rag_system.utils.settings as settings
+from rag_system.rag.description_cache import DescriptionCache
+
+TABLE_PROMPT = ("你的职责是解释表格。"
+                "你是将线性化表格转换成简单中文文本供大型语言模型（LLMs）使用的专家。"
+                "请解释以下线性化表格： {content}")
+
+description_cache = DescriptionCache(settings.configuration.description_cache_path,
+                                     max_bytes=settings.configuration.description_cache_max_bytes,
+                                     use_perceptual_hash=settings.configuration.description_cache_perceptual)
+
+
+def _table_model_name():
+    return f"moonshot-file-extract|{settings.configuration.deepseek_model_name}"
 
 def extract_text_from_llm(file_path) -> str:
     """
@@ -34,11 +50,13 @@ def process_table(file):
     :param file:
     :return: 表格内容及对表格的描述信息
     """
+    cached = description_cache.get(file, _table_model_name(), TABLE_PROMPT, perceptual=False)
+    if cached is not None:
+        return tuple(cached)
     content = extract_text_from_llm(file)
     llm = settings.deepseek_llm()
-    response = llm.complete(f"你的职责是解释表格。"
-                            f"你是将线性化表格转换成简单中文文本供大型语言模型（LLMs）使用的专家。"
-                            f"请解释以下线性化表格： {content}")
+    response = llm.complete(TABLE_PROMPT.format(content=content))
+    description_cache.put(file, _table_model_name(), TABLE_PROMPT, [content, response.text])
     return content, response.text
 
 def get_b64_image_from_content(image_content):
@@ -52,6 +70,9 @@ def get_b64_image_from_content(image_content):
 
 def describe_image(file_path, prompt:str="请尽可能详细的描述你在图片中看到的所有内容"):
     """Generate a description of an image using VLLM API，借助LLM生成几个相关的问题，多角度获取图片中的内容，自行完成"""
+    cached = description_cache.get(file_path, settings.configuration.vllm_model_name, prompt)
+    if cached is not None:
+        return cached
 
     image_b64 = get_b64_image_from_path(file_path)
     client = settings.vllm()
@@ -82,8 +103,109 @@ def describe_image(file_path, prompt:str="请尽可能详细的描述你在图
         seed=0, top_p=0.70, stream=False
     )
     # 返回多个问题汇总后的答案描述
+    description = completion.choices[0].message.content
+    description_cache.put(file_path, settings.configuration.vllm_model_name, prompt, description)
+    return description
+
+class AsyncModelLimiter:
+    """
+    模型调用限流器：并发上限 + 每秒请求数限制 + 失败指数退避重试
+    """
+    def __init__(self, max_concurrency: int = 4, requests_per_second: float = 2, max_retries: int = 3):
+        self.max_concurrency = max_concurrency
+        self.min_interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.max_retries = max_retries
+        self._semaphore = None
+        self._rate_lock = None
+        self._next_slot = 0.0
+
+    async def _wait_rate_slot(self):
+        if self.min_interval <= 0:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def run(self, func, *args, **kwargs):
+        """在并发和速率限制下执行协程函数，失败时按指数退避重试"""
+        # 延迟创建，保证绑定到调用时的事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._rate_lock = asyncio.Lock()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await self._wait_rate_slot()
+                    return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 30) + random.random()
+                print(f"模型调用失败，{delay:.1f}秒后重试({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+
+
+model_limiter = AsyncModelLimiter(max_concurrency=settings.configuration.model_max_concurrency,
+                                  requests_per_second=settings.configuration.model_requests_per_second,
+                                  max_retries=settings.configuration.model_max_retries)
+
+
+async def aextract_text_from_llm(file_path) -> str:
+    """extract_text_from_llm的异步版本"""
+    client = settings.async_moonshot_llm()
+    file_object = await client.files.create(file=Path(file_path), purpose="file-extract")
+    file_content = await client.files.content(file_id=file_object.id)
+    return file_content.json().get("content")
+
+
+async def aprocess_table(file):
+    """
+    process_table的异步版本，模型调用经过model_limiter限流
+    :param file: 表格图片路径
+    :return: 表格内容及对表格的描述信息
+    """
+    cached = await description_cache.aget(file, _table_model_name(), TABLE_PROMPT, perceptual=False)
+    if cached is not None:
+        return tuple(cached)
+    content = await model_limiter.run(aextract_text_from_llm, file)
+    llm = settings.deepseek_llm()
+    response = await model_limiter.run(llm.acomplete, TABLE_PROMPT.format(content=content))
+    await description_cache.aput(file, _table_model_name(), TABLE_PROMPT, [content, response.text])
+    return content, response.text
+
+
+async def _adescribe_image(file_path, prompt):
+    image_b64 = get_b64_image_from_path(file_path)
+    client = settings.async_vllm()
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_b64}"}}
+            ]
+        }
+    ]
+    completion = await client.chat.completions.create(
+        model=settings.configuration.vllm_model_name,
+        messages=messages, temperature=0.5,
+        seed=0, top_p=0.70, stream=False
+    )
     return completion.choices[0].message.content
 
+
+async def adescribe_image(file_path, prompt: str = "请尽可能详细的描述你在图片中看到的所有内容"):
+    """describe_image的异步版本，模型调用经过model_limiter限流，相同的图片（开启感知哈希时包括近似图片）直接返回缓存的描述"""
+    cached = await description_cache.aget(file_path, settings.configuration.vllm_model_name, prompt)
+    if cached is not None:
+        return cached
+    description = await model_limiter.run(_adescribe_image, file_path, prompt)
+    await description_cache.aput(file_path, settings.configuration.vllm_model_name, prompt, description)
+    return description
+
 def extract_text_around_item(text_blocks, bbox, page_height, threshold_percentage=0.1):
     """从页面上的给定边界框提取上方和下方的文本。"""
     before_text, after_text = "", ""  # 初始化上方和下方文本为空字符串
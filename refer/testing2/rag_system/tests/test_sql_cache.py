@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from rag_system.rag.sql_cache import QueryResultCache, SQLGenerationCache
+
+
+def test_exact_hit_ignores_case_whitespace_and_trailing_punctuation():
+    cache = SQLGenerationCache(similarity_threshold=0)
+    cache.put("Top 4 customers by sales?", "SELECT 1", cache.version)
+
+    assert cache.get_exact("  top 4   customers by SALES？") == "SELECT 1"
+    assert cache.get_exact("top 5 customers by sales") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_version_bump_invalidates_entries():
+    cache = SQLGenerationCache()
+    started = cache.version
+    cache.put("销量最高的产品", "SELECT a", started, embedding=np.ones(4))
+    cache.bump_version()
+
+    assert cache.get_exact("销量最高的产品") is None
+    assert cache.get_semantic("销量最高的产品", np.ones(4)) is None
+    # 生成期间训练数据变化，结果不写入缓存
+    cache.put("销量最高的产品", "SELECT b", started)
+    assert cache.stats()["entries"] == 0
+
+
+def test_semantic_hit_requires_same_numbers():
+    cache = SQLGenerationCache(similarity_threshold=0.9)
+    cache.put("2023年的销量", "SELECT 2023", cache.version, embedding=np.array([1.0, 0.0, 0.0]))
+
+    sql, score = cache.get_semantic("2023年销量是多少", np.array([0.99, 0.05, 0.0]))
+    assert sql == "SELECT 2023" and score >= 0.9
+    assert cache.get_semantic("2024年的销量", np.array([1.0, 0.0, 0.0])) is None
+    assert cache.get_semantic("2023年的销量", np.array([0.0, 1.0, 0.0])) is None
+
+
+def test_expired_entry_is_not_returned():
+    cache = SQLGenerationCache(ttl=-1, similarity_threshold=0)
+    cache.put("q", "SELECT 1", cache.version)
+
+    assert cache.get_exact("q") is None
+
+
+def test_result_cache_keys_on_raw_sql():
+    cache = QueryResultCache()
+    cache.put("SELECT * FROM t WHERE name = 'a  b'", pd.DataFrame({"n": [1]}))
+
+    assert cache.get("  SELECT * FROM t WHERE name = 'a  b'\n")["n"].tolist() == [1]
+    assert cache.get("SELECT * FROM t WHERE name = 'a b'") is None
+    assert cache.get("SELECT * FROM t WHERE name = 'ａ  b'") is None
+
+
+def test_result_cache_returns_copies_and_skips_large_results():
+    cache = QueryResultCache(max_rows=2)
+    cache.put("SELECT 1", pd.DataFrame({"n": [1]}))
+    cache.get("SELECT 1").loc[0, "n"] = 99
+    cache.put("SELECT 2", pd.DataFrame({"n": [1, 2, 3]}))
+
+    assert cache.get("SELECT 1")["n"].tolist() == [1]
+    assert cache.get("SELECT 2") is None
+
+
+def test_cacheable_rejects_writes():
+    assert QueryResultCache.cacheable("select * from t")
+    assert QueryResultCache.cacheable("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert QueryResultCache.cacheable("SELECT * FROM logs WHERE msg = 'delete from t'")
+    assert not QueryResultCache.cacheable("UPDATE t SET a = 1")
+    assert not QueryResultCache.cacheable("WITH gone AS (DELETE FROM t RETURNING *) SELECT count(*) FROM gone")
+    assert not QueryResultCache.cacheable("with x as (update t set a = 1 returning a) select * from x")
+    assert not QueryResultCache.cacheable("SELECT * INTO backup FROM t")
+    assert not QueryResultCache.cacheable("SELECT 1; DROP TABLE t")
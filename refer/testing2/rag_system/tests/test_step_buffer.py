@@ -0,0 +1,105 @@
+import asyncio
+
+from rag_system.persistent.step_buffer import StepWriteBuffer
+
+
+class RecordingWriter:
+    """Records every batch; rows whose id is in ``bad_ids`` make the batch fail."""
+
+    def __init__(self, bad_ids=()):
+        self.batches = []
+        self.bad_ids = set(bad_ids)
+
+    async def __call__(self, rows):
+        if any(row["id"] in self.bad_ids for row in rows):
+            raise RuntimeError("write failed")
+        self.batches.append([dict(row) for row in rows])
+
+
+def test_updates_of_one_step_are_coalesced():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = StepWriteBuffer(writer, flush_interval=60)
+        buffer.add({"id": "s1", "output": "Hel", "name": "answer"})
+        buffer.add({"id": "s1", "output": "Hello"})
+        buffer.add({"id": "s2", "output": "other"})
+        await buffer.close()
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.batches == [[{"id": "s1", "output": "Hello", "name": "answer"}, {"id": "s2", "output": "other"}]]
+    assert buffer.stats() == {"pending": 0, "enqueued": 3, "coalesced": 1, "written": 2, "failed": 0, "flushes": 1}
+
+
+def test_step_end_and_max_size_trigger_flush():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = StepWriteBuffer(writer, flush_interval=60, max_size=2)
+        buffer.add({"id": "s1", "output": "partial"})
+        await asyncio.sleep(0.01)
+        assert writer.batches == []
+
+        buffer.add({"id": "s1", "output": "done", "end": "2024-01-01T00:00:00Z"})
+        await asyncio.sleep(0.01)
+        assert writer.batches == [[{"id": "s1", "output": "done", "end": "2024-01-01T00:00:00Z"}]]
+
+        buffer.add({"id": "s2"})
+        buffer.add({"id": "s3"})
+        await asyncio.sleep(0.01)
+        assert writer.batches[-1] == [{"id": "s2"}, {"id": "s3"}]
+        await buffer.close()
+
+    asyncio.run(scenario())
+
+
+def test_interval_flush():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = StepWriteBuffer(writer, flush_interval=0.01)
+        buffer.add({"id": "s1"})
+        await asyncio.sleep(0.1)
+        assert writer.batches == [[{"id": "s1"}]]
+        await buffer.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_retried_per_step():
+    async def scenario():
+        writer = RecordingWriter(bad_ids={"s2"})
+        buffer = StepWriteBuffer(writer, flush_interval=60)
+        for step_id in ("s1", "s2", "s3"):
+            buffer.add({"id": step_id})
+        await buffer.flush()
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.batches == [[{"id": "s1"}], [{"id": "s3"}]]
+    stats = buffer.stats()
+    assert (stats["written"], stats["failed"], stats["pending"]) == (2, 1, 0)
+
+
+def test_flush_waits_for_flush_in_progress():
+    async def scenario():
+        release = asyncio.Event()
+        written = []
+
+        async def slow_writer(rows):
+            await release.wait()
+            written.extend(row["id"] for row in rows)
+
+        buffer = StepWriteBuffer(slow_writer, flush_interval=60)
+        buffer.add({"id": "s1"})
+        first = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        buffer.add({"id": "s2"})
+        second = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        assert written == [] and not second.done()
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert written == ["s1", "s2"]
+        await buffer.close()
+
+    asyncio.run(scenario())
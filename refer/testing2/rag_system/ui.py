@@ -1,3 +1,4 @@
+import os
 import random
 from typing import Optional, List
 import chainlit as cl
@@ -127,8 +128,11 @@ async def main(message: cl.Message):
                 files.append(element.path)
 
         if len(files) > 0:
+            # 会话内累计上传的文件共用一个本地索引，新消息只增量嵌入新增的文件
+            files = cl.user_session.get("rag_files", []) + files
+            cl.user_session.set("rag_files", files)
             rag = DocumentRAGV2(files=files)
-            index = await rag.create_local_index()
+            index = await rag.create_local_index(persist_dir=os.path.join("storage", "sessions", cl.user_session.get("id")))
             chat_engine = index.as_chat_engine(chat_mode=ChatMode.CONTEXT, similarity_top_k=3)
             cl.user_session.set("chat_engine", chat_engine)
     elif chat_mode == "数据库对话":
@@ -28,4 +28,41 @@ class Configuration(BaseModel):
     mysql_user: str = Field(default=os.getenv("MYSQL_USER"), description="MySQL user")
     mysql_password: str = Field(default=os.getenv("MYSQL_PASSWORD"), description="MySQL password")
     mysql_db: str = Field(default=os.getenv("MYSQL_DB"), description="MySQL database")
-    mysql_port: int = Field(default=os.getenv("MYSQL_PORT"), description="MySQL port")
\ No newline at end of file
+    mysql_port: int = Field(default=os.getenv("MYSQL_PORT"), description="MySQL port")
+
+    # 文档解析中的模型调用并发控制
+    model_max_concurrency: int = Field(default=int(os.getenv("MODEL_MAX_CONCURRENCY", 4)), description="Max concurrent model calls")
+    model_requests_per_second: float = Field(default=float(os.getenv("MODEL_REQUESTS_PER_SECOND", 2)), description="Model call rate limit, <=0 disables it")
+    model_max_retries: int = Field(default=int(os.getenv("MODEL_MAX_RETRIES", 3)), description="Max retries for a failed model call")
+    pdf_process_workers: int = Field(default=int(os.getenv("PDF_PROCESS_WORKERS", os.cpu_count() or 1)), description="Worker processes for PDF page parsing")
+
+    # 图片/表格描述缓存
+    description_cache_path: str = Field(default=os.getenv("DESCRIPTION_CACHE_PATH", "vectorstore/description_cache.sqlite3"), description="Description cache file")
+    description_cache_max_bytes: int = Field(default=int(os.getenv("DESCRIPTION_CACHE_MAX_BYTES", 256 * 1024 * 1024)), description="Max description cache size in bytes")
+    description_cache_perceptual: bool = Field(default=os.getenv("DESCRIPTION_CACHE_PERCEPTUAL", "false").lower() == "true", description="Also reuse descriptions of near-duplicate images by perceptual hash (opt-in)")
+
+    # 远程索引清单目录，记录每个集合中文件和节点的哈希，用于增量更新
+    index_manifest_dir: str = Field(default=os.getenv("INDEX_MANIFEST_DIR", "vectorstore/index_manifests"), description="Index manifest directory")
+
+    # 嵌入向量缓存目录
+    embedding_cache_dir: str = Field(default=os.getenv("EMBEDDING_CACHE_DIR", "vectorstore/embedding_cache"), description="Embedding cache directory")
+
+    # 本地嵌入服务
+    local_embedding_backend: str = Field(default=os.getenv("LOCAL_EMBEDDING_BACKEND", "torch"), description="torch, torch-int8 or onnx")
+    local_embedding_onnx_file: str = Field(default=os.getenv("LOCAL_EMBEDDING_ONNX_FILE"), description="ONNX model file, e.g. onnx/model_qint8_avx512_vnni.onnx")
+    local_embedding_workers: int = Field(default=int(os.getenv("LOCAL_EMBEDDING_WORKERS", 2)), description="Embedding inference worker threads")
+    local_embedding_batch_size: int = Field(default=int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", 32)), description="Max texts per embedding batch")
+    local_embedding_max_wait_ms: float = Field(default=float(os.getenv("LOCAL_EMBEDDING_MAX_WAIT_MS", 5)), description="Max time to wait for filling a batch")
+
+    # Minio 对象存储客户端（chainlit 元素上传）
+    minio_secure: bool = Field(default=os.getenv("MINIO_SECURE", "false").lower() == "true", description="Use https for Minio")
+    minio_upload_workers: int = Field(default=int(os.getenv("MINIO_UPLOAD_WORKERS", 8)), description="Threads running blocking Minio SDK calls")
+    minio_part_size: int = Field(default=int(os.getenv("MINIO_PART_SIZE", 8 * 1024 * 1024)), description="Multipart upload part size in bytes, at least 5 MiB")
+    minio_url_expiry: int = Field(default=int(os.getenv("MINIO_URL_EXPIRY", 3600)), description="Presigned URL lifetime in seconds")
+
+    # Text-to-SQL 生成缓存和查询结果缓存
+    sql_cache_ttl: int = Field(default=int(os.getenv("SQL_CACHE_TTL", 86400)), description="Generated SQL cache lifetime in seconds")
+    sql_cache_max_entries: int = Field(default=int(os.getenv("SQL_CACHE_MAX_ENTRIES", 2000)), description="Max cached questions")
+    sql_cache_similarity: float = Field(default=float(os.getenv("SQL_CACHE_SIMILARITY", 0.97)), description="Cosine similarity for reusing the SQL of a similar question, <=0 disables it")
+    run_sql_cache_ttl: float = Field(default=float(os.getenv("RUN_SQL_CACHE_TTL", 30)), description="run_sql result cache lifetime in seconds, <=0 disables it")
+    run_sql_cache_max_entries: int = Field(default=int(os.getenv("RUN_SQL_CACHE_MAX_ENTRIES", 128)), description="Max cached run_sql results")
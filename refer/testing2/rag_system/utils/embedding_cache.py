@@ -0,0 +1,274 @@
+"""
+嵌入向量持久化缓存
+
+同一份文档在不同分块策略、多次演示运行和重复查询中会产生大量相同的文本块，每次都要重新做模型推理。
+本模块提供一个包装任意BaseEmbedding的缓存层：
+1. 以 模型名称 + 规范化文本哈希 作为缓存键，查询向量与文档向量分开缓存
+2. 向量以float16存储在按模型划分的二进制文件中，读取时通过内存映射访问
+3. 索引文件按行记录文本哈希，行号即向量所在行，追加写入
+4. 未命中的文本批量调用被包装的模型，结果写回缓存
+
+backend/my/embedding_cache.py 直接复用本模块，只替换默认缓存目录。
+
+使用方法:
+```python
+from rag_system.utils.embedding_cache import CachedEmbedding
+Settings.embed_model = CachedEmbedding(HuggingFaceEmbedding(model_name="BAAI/bge-small-zh-v1.5"))
+```
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_CACHE_DIR = "vectorstore/embedding_cache"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化文本：Unicode NFKC归一化、合并连续空白、去除首尾空白
+
+    :param text: 原始文本
+    :return: 规范化后的文本
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_key(text: str, kind: str) -> str:
+    """
+    计算缓存键
+
+    :param text: 文本
+    :param kind: "query" 或 "text"，部分模型对查询和文档使用不同的指令前缀
+    :return: 十六进制摘要
+    """
+    return hashlib.sha256(f"{kind}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    单个模型的向量存储
+
+    目录结构：
+    - meta.json: 模型名称和向量维度
+    - vectors.f16: 按行追加的float16向量
+    - index.txt: 每行一个缓存键，第N行对应vectors.f16的第N个向量
+    - .lock: 跨进程文件锁
+
+    追加写入时持有 .lock 上的排他锁，并先读入其他进程追加的行、对齐两个文件的行数，
+    多个进程可以共享同一个缓存目录。不支持fcntl的平台上只在本进程内加锁。
+    """
+
+    def __init__(self, directory: str, model_key: str):
+        self.directory = directory
+        self.model_key = model_key
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._row_count = 0  # 已读入的行数（包括重复键占用的行）
+        self._index_offset = 0  # index.txt中已读入部分的字节数
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._vectors_path = os.path.join(directory, "vectors.f16")
+        self._index_path = os.path.join(directory, "index.txt")
+        self._lock_path = os.path.join(directory, ".lock")
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """跨进程文件锁：写入时排他，读取其他进程追加的行时共享"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """读入其他进程追加的行，需持有文件锁"""
+        if self.dim is None:
+            if not os.path.exists(self._meta_path):
+                return
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        vector_rows = os.path.getsize(self._vectors_path) // (self.dim * 2) if os.path.exists(self._vectors_path) else 0
+        if vector_rows <= self._row_count or not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                # 中断写入时索引和向量可能不一致，只保留两者都完整的行
+                if self._row_count >= vector_rows or not line.endswith(b"\n"):
+                    break
+                self._rows.setdefault(line.decode("utf-8").strip(), self._row_count)
+                self._row_count += 1
+                self._index_offset += len(line)
+
+    def _align_files(self):
+        """截掉中断写入留下的多余行，使两个文件的行数一致，需持有排他锁"""
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != self._row_count * self.dim * 2:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(self._row_count * self.dim * 2)
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path) != self._index_offset:
+            with open(self._index_path, "r+b") as f:
+                f.truncate(self._index_offset)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _vectors(self) -> np.memmap:
+        """按当前行数映射向量文件，新写入的行需要重新映射"""
+        rows = self._row_count
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def get_many(self, keys: List[str]) -> List[Optional[Embedding]]:
+        """批量读取向量，未命中的位置为None；有未命中时先读入其他进程追加的行"""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+            if not self._rows:
+                return [None] * len(keys)
+            vectors = self._vectors()
+            return [
+                vectors[self._rows[key]].astype(np.float32).tolist() if key in self._rows else None
+                for key in keys
+            ]
+
+    def put_many(self, keys: List[str], embeddings: List[Embedding]):
+        """批量追加向量，已存在的键会被跳过"""
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            if self.dim is None:
+                self.dim = len(embeddings[0])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_key, "dim": self.dim}, f, ensure_ascii=False)
+            new_keys, new_vectors, pending = [], [], set()
+            for key, embedding in zip(keys, embeddings):
+                if key in self._rows or key in pending:
+                    continue
+                pending.add(key)
+                new_keys.append(key)
+                new_vectors.append(embedding)
+            if not new_keys:
+                return
+            self._align_files()
+            # 先写向量再写索引，读取时以两者中较短的一方为准
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.asarray(new_vectors, dtype=np.float16).tobytes())
+            data = "".join(f"{key}\n" for key in new_keys).encode("utf-8")
+            with open(self._index_path, "ab") as f:
+                f.write(data)
+            for key in new_keys:
+                self._rows[key] = self._row_count
+                self._row_count += 1
+            self._index_offset += len(data)
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    带持久化缓存的嵌入模型包装器
+
+    可以包装任意BaseEmbedding，用法与被包装的模型一致。命中缓存时不调用模型，
+    hits/misses记录文本条数。
+    """
+
+    embed_model: BaseEmbedding = Field(description="被包装的嵌入模型")
+    cache_dir: str = Field(default=DEFAULT_CACHE_DIR, description="缓存目录")
+
+    hits: int = Field(default=0, description="缓存命中的文本条数")
+    misses: int = Field(default=0, description="缓存未命中的文本条数")
+
+    _store: EmbeddingStore = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache_dir: str = DEFAULT_CACHE_DIR, **kwargs):
+        """
+        初始化缓存包装器
+
+        Args:
+            embed_model: 被包装的嵌入模型
+            cache_dir: 缓存根目录，每个模型使用其中的一个子目录
+        """
+        kwargs.setdefault("embed_batch_size", embed_model.embed_batch_size)
+        super().__init__(
+            embed_model=embed_model,
+            cache_dir=cache_dir,
+            model_name=embed_model.model_name,
+            **kwargs
+        )
+        model_key = f"{embed_model.class_name()}:{embed_model.model_name}"
+        directory = os.path.join(cache_dir, hashlib.sha256(model_key.encode("utf-8")).hexdigest()[:16])
+        self._store = EmbeddingStore(directory, model_key)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, texts: List[str], kind: str):
+        keys = [text_key(text, kind) for text in texts]
+        embeddings = self._store.get_many(keys)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return keys, embeddings, missing
+
+    def _save(self, keys, embeddings, missing, computed) -> List[Embedding]:
+        for i, embedding in zip(missing, computed):
+            embeddings[i] = embedding
+        self._store.put_many([keys[i] for i in missing], computed)
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        keys, embeddings, missing = self._lookup([query], "query")
+        if missing:
+            return self._save(keys, embeddings, missing, [self.embed_model.get_query_embedding(query)])[0]
+        return embeddings[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        keys, embeddings, missing = self._lookup([query], "query")
+        if missing:
+            return self._save(keys, embeddings, missing, [await self.embed_model.aget_query_embedding(query)])[0]
+        return embeddings[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, missing = self._lookup(texts, "text")
+        if not missing:
+            return embeddings
+        computed = self.embed_model.get_text_embedding_batch([texts[i] for i in missing])
+        return self._save(keys, embeddings, missing, computed)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, embeddings, missing = self._lookup(texts, "text")
+        if not missing:
+            return embeddings
+        computed = await self.embed_model.aget_text_embedding_batch([texts[i] for i in missing])
+        return self._save(keys, embeddings, missing, computed)
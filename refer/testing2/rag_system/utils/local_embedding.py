@@ -0,0 +1,258 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from sentence_transformers import SentenceTransformer
+
+# bge中文模型检索查询使用的指令前缀
+BGE_ZH_QUERY_INSTRUCTION = "为这个句子生成表示以用于检索相关文章："
+
+
+class _Request:
+    """一次encode调用，可能被拆分到多个批次中"""
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+
+    def set_result(self, index: int, embedding: np.ndarray):
+        with self.lock:
+            self.embeddings[index] = embedding
+            self.remaining -= 1
+            done = self.remaining == 0
+        if done and not self.future.done():
+            self.future.set_result(self.embeddings)
+
+    def set_exception(self, error: Exception):
+        with self.lock:
+            if not self.future.done():
+                self.future.set_exception(error)
+
+
+class LocalEmbeddingService:
+    """
+    进程内共享的本地嵌入服务，模型只加载一次
+
+    - 动态批处理：调度线程在max_wait_ms内收集所有请求的文本，按长度排序后切分批次，减少padding
+    - 分词在调度线程中串行完成（fast tokenizer不支持多线程共用），前向计算由多个工作线程并行执行
+    - backend可选 torch / torch-int8（动态量化Linear层）/ onnx（需要安装optimum，可指定量化后的onnx文件）
+    - 定期打印吞吐量（chunks/sec），stats()返回累计统计
+    """
+    def __init__(self, model_name: str, device: str = "cpu", backend: str = "torch",
+                 onnx_file: Optional[str] = None, workers: int = 2, max_batch_size: int = 32,
+                 max_wait_ms: float = 5, normalize: bool = True, cache_folder: Optional[str] = None,
+                 log_interval: float = 30):
+        self.model_name = model_name
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.normalize = normalize
+        self.log_interval = log_interval
+
+        if backend == "onnx":
+            model_kwargs = {"file_name": onnx_file} if onnx_file else None
+            self.model = SentenceTransformer(model_name, device=device, backend="onnx",
+                                             model_kwargs=model_kwargs, cache_folder=cache_folder)
+        else:
+            self.model = SentenceTransformer(model_name, device=device, cache_folder=cache_folder)
+            if backend == "torch-int8":
+                self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model.eval()
+        self.dim = self.model.get_sentence_embedding_dimension()
+        if device == "cpu":
+            # 每个工作线程分到的计算线程数，避免线程数超过CPU核心数
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.workers))
+
+        self.chunks = 0
+        self.batches = 0
+        self._completed = deque(maxlen=4096)
+        self._stats_lock = threading.Lock()
+        self._last_log = time.monotonic()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+        self._scheduler = threading.Thread(target=self._schedule, name="embedding-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """提交一组文本，返回Future，结果为与输入顺序一致的向量列表"""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: List[str]) -> List[np.ndarray]:
+        return self.submit(texts).result()
+
+    async def aencode(self, texts: List[str]) -> List[np.ndarray]:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _schedule(self):
+        while True:
+            requests = [self._queue.get()]
+            pending = len(requests[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            # 在等待窗口内继续收集请求，凑满所有工作线程的批次后立即调度
+            while pending < self.max_batch_size * self.workers:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                pending += len(request.texts)
+
+            items = [(request, index, text) for request in requests for index, text in enumerate(request.texts)]
+            items.sort(key=lambda item: len(item[2]))
+            for start in range(0, len(items), self.max_batch_size):
+                batch = items[start:start + self.max_batch_size]
+                try:
+                    features = self.model.tokenize([text for _, _, text in batch])
+                except Exception as e:
+                    for request, _, _ in batch:
+                        request.set_exception(e)
+                    continue
+                self._executor.submit(self._run_batch, features, batch)
+
+    def _run_batch(self, features, batch):
+        started = time.monotonic()
+        try:
+            features = {key: value.to(self.model.device) if isinstance(value, torch.Tensor) else value
+                        for key, value in features.items()}
+            with torch.inference_mode():
+                output = self.model(features)["sentence_embedding"]
+                if self.normalize:
+                    output = F.normalize(output, p=2, dim=1)
+                embeddings = output.float().cpu().numpy()
+        except Exception as e:
+            for request, _, _ in batch:
+                request.set_exception(e)
+            return
+        for (request, index, _), embedding in zip(batch, embeddings):
+            request.set_result(index, embedding)
+        self._record(len(batch), started)
+
+    def _record(self, count: int, started: float):
+        now = time.monotonic()
+        with self._stats_lock:
+            self.chunks += count
+            self.batches += 1
+            self._completed.append((started, now, count))
+            should_log = now - self._last_log >= self.log_interval
+            if should_log:
+                self._last_log = now
+        if should_log:
+            print(f"本地嵌入服务吞吐: {self.throughput():.1f} chunks/sec，累计 {self.chunks} 个文本块")
+
+    def throughput(self, window: float = 60) -> float:
+        """最近window秒内完成的批次的吞吐量（chunks/sec）"""
+        now = time.monotonic()
+        with self._stats_lock:
+            recent = [item for item in self._completed if now - item[1] <= window]
+        if not recent:
+            return 0.0
+        span = max(max(end for _, end, _ in recent) - min(start for start, _, _ in recent), 1e-3)
+        return sum(count for _, _, count in recent) / span
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "avg_batch_size": self.chunks / self.batches if self.batches else 0,
+            "chunks_per_sec": self.throughput(),
+        }
+
+
+_service: Optional[LocalEmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service(**kwargs) -> LocalEmbeddingService:
+    """获取进程内共享的本地嵌入服务，参数见LocalEmbeddingService，只在首次调用时生效"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = LocalEmbeddingService(**kwargs)
+    return _service
+
+
+class LocalServiceEmbedding(BaseEmbedding):
+    """
+    通过共享的本地嵌入服务生成向量的LlamaIndex嵌入模型
+
+    embed_batch_size默认为 max_batch_size * workers：LlamaIndex按该大小逐批同步调用，
+    批次太小时服务凑不满一个批次，也只会用到一个工作线程
+    """
+
+    query_instruction: str = Field(default=BGE_ZH_QUERY_INSTRUCTION, description="查询文本的指令前缀")
+    text_instruction: str = Field(default="", description="文档文本的指令前缀")
+
+    _service: LocalEmbeddingService = PrivateAttr()
+
+    def __init__(self, service: LocalEmbeddingService, **kwargs):
+        name = service.model_name if service.backend == "torch" else f"{service.model_name}@{service.backend}"
+        kwargs.setdefault("model_name", name)
+        # BaseEmbedding限制embed_batch_size不超过2048
+        kwargs.setdefault("embed_batch_size", min(service.max_batch_size * service.workers, 2048))
+        super().__init__(**kwargs)
+        self._service = service
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalServiceEmbedding"
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._service.encode([self.query_instruction + query])[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return (await self._service.aencode([self.query_instruction + query]))[0].tolist()
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return [e.tolist() for e in self._service.encode([self.text_instruction + t for t in texts])]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return [e.tolist() for e in await self._service.aencode([self.text_instruction + t for t in texts])]
+
+
+class LocalServiceEmbeddingFunction:
+    """
+    与pymilvus SentenceTransformerEmbeddingFunction接口一致的嵌入函数（vanna的Milvus_VectorStore使用），
+    复用共享的本地嵌入服务，不再单独加载一份模型
+    """
+    def __init__(self, service: LocalEmbeddingService):
+        self._service = service
+
+    @property
+    def dim(self) -> int:
+        return self._service.dim
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        return self._service.encode(texts)
+
+    def encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        return self._service.encode(queries)
+
+    def encode_documents(self, documents: List[str]) -> List[np.ndarray]:
+        return self._service.encode(documents)
@@ -3,15 +3,15 @@
 # pip install llama-index-embeddings-instructor
 # pip install llama-index-embeddings-ollama
 # pip install pymilvus[model]
+# pip install sentence-transformers  (onnx后端: pip install optimum[onnxruntime])
 # pip install llama-index-vector-stores-milvus
 """
 
 from typing import Dict
 from llama_index.llms.openai import OpenAI as LLamaIndexOpenAI
-from pymilvus import model
 
 from .config import Configuration
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from llama_index.llms.deepseek import DeepSeek
 configuration = Configuration()
 
@@ -45,22 +45,35 @@ def openai_llm(**kwargs):
 def vllm(**kwargs):
     return OpenAI(api_key=configuration.vllm_api_key, base_url=configuration.vllm_base_url, **kwargs)
 
+def async_moonshot_llm(**kwargs):
+    return AsyncOpenAI(api_key=configuration.moonshot_api_key,
+                       base_url="https://api.moonshot.cn/v1", **kwargs)
+
+def async_vllm(**kwargs):
+    return AsyncOpenAI(api_key=configuration.vllm_api_key, base_url=configuration.vllm_base_url, **kwargs)
+
 # ------------------------Embedding Settings------------------------
 
+def local_embedding_service():
+    """进程内共享的本地嵌入服务，LlamaIndex和pymilvus/vanna共用同一份模型"""
+    from .local_embedding import get_embedding_service
+    return get_embedding_service(model_name=configuration.local_embedding_model_name,    # 'BAAI/bge-small-zh-v1.5'
+                                 device='cpu', # Specify the device to use, e.g., 'cpu' or 'cuda:0'
+                                 backend=configuration.local_embedding_backend,
+                                 onnx_file=configuration.local_embedding_onnx_file,
+                                 workers=configuration.local_embedding_workers,
+                                 max_batch_size=configuration.local_embedding_batch_size,
+                                 max_wait_ms=configuration.local_embedding_max_wait_ms,
+                                 cache_folder=r"C:\Users\86134\.cache\huggingface\hub")
+
 def pymilvus_bge_small_embedding_function(**kwargs):
-    return model.dense.SentenceTransformerEmbeddingFunction(
-        model_name=configuration.local_embedding_model_name,    # 'BAAI/bge-small-zh-v1.5'
-        device='cpu', # Specify the device to use, e.g., 'cpu' or 'cuda:0'
-    )
+    from .local_embedding import LocalServiceEmbeddingFunction
+    return LocalServiceEmbeddingFunction(local_embedding_service())
 
 # 本地嵌入模型
 def local_bge_small_embed_model(**kwargs):
-    #终端执行： pip install llama-index-embeddings-huggingface llama-index-embeddings-instructor
-    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-    embed_model = HuggingFaceEmbedding(model_name=configuration.local_embedding_model_name,
-                                       cache_folder=r"C:\Users\86134\.cache\huggingface\hub",
-                                       **kwargs)
-    return embed_model
+    from .local_embedding import LocalServiceEmbedding
+    return LocalServiceEmbedding(local_embedding_service(), **kwargs)
 
 # 在线嵌入模型
 def ollama_nomic_embed_model(**kwargs):
@@ -76,7 +89,9 @@ def ollama_nomic_embed_model(**kwargs):
 
 # -------------------------Setting Default LLM Start------------------------
 from llama_index.core import Settings
-Settings.embed_model = local_bge_small_embed_model()
+from .embedding_cache import CachedEmbedding
+# 重复的文本块和查询直接读取嵌入缓存，不再调用模型
+Settings.embed_model = CachedEmbedding(local_bge_small_embed_model(), cache_dir=configuration.embedding_cache_dir)
 Settings.llm = deepseek_llm()
 
 # -------------------------Setting Default LLM End------------------------
\ No newline at end of file